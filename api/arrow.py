@@ -0,0 +1,148 @@
+"""
+Arrow IPC stream responses for columnar clients.
+
+Clients that send `Accept: application/vnd.apache.arrow.stream` get /books
+pages and /analytics/price-buckets histograms as an Arrow IPC stream, which
+pyarrow, polars and pandas read straight into a table, instead of JSON rows
+they would decode and pivot back into columns. Columns are filled from the
+attributes of the Book records the query already produced, with no BookOut
+models or per-row dicts in between. Needs the optional pyarrow package;
+without it clients get JSON, or 406 if they accept nothing else.
+"""
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from api.models import Book
+
+MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+class ArrowUnavailable(RuntimeError):
+    """Raised when a client accepts only Arrow and pyarrow is not installed."""
+    pass
+
+
+def available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _ratings(accept: str) -> Dict[str, float]:
+    ratings: Dict[str, float] = {}
+    for part in accept.split(","):
+        media, _, params = part.partition(";")
+        media = media.strip().lower()
+        if not media:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ratings[media] = q
+    return ratings
+
+
+def _quality(ratings: Dict[str, float], media: str) -> Optional[float]:
+    """q-value of the most specific range matching media, or None if nothing matches."""
+    kind = media.split("/", 1)[0]
+    for candidate in (media, f"{kind}/*", "*/*"):
+        if candidate in ratings:
+            return ratings[candidate]
+    return None
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    Pick the response format for an Accept header.
+
+    JSON stays the default: Arrow is chosen only when the client rates it above
+    application/json, so `*/*` and missing headers keep getting JSON.
+
+    Returns:
+        "arrow" or "json"
+
+    Raises:
+        ArrowUnavailable: If Arrow is preferred and JSON not acceptable, but pyarrow is missing
+    """
+    if not accept:
+        return "json"
+    ratings = _ratings(accept)
+    arrow_q = _quality(ratings, MEDIA_TYPE) or 0.0
+    json_q = _quality(ratings, "application/json") or 0.0
+    if arrow_q <= json_q:
+        return "json"
+    if available():
+        return "arrow"
+    if json_q > 0:
+        return "json"
+    raise ArrowUnavailable(f"{MEDIA_TYPE} responses require the pyarrow package")
+
+
+def book_schema(metadata: Optional[Dict[str, str]] = None):
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.string()),
+        ("title", pa.string()),
+        ("url", pa.string()),
+        ("price", pa.float64()),
+        ("availability", pa.string()),
+    ], metadata=metadata)
+
+
+def book_batch(books: Sequence[Book], schema=None):
+    """One record batch holding books, a column per field."""
+    import pyarrow as pa
+
+    return pa.record_batch([
+        [b.id for b in books],
+        [b.title for b in books],
+        [b.url for b in books],
+        [b.price for b in books],
+        [b.availability for b in books],
+    ], schema=schema or book_schema())
+
+
+def _stream(batches: Iterable[Any], schema) -> bytes:
+    import pyarrow as pa
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def books_stream(result: Dict[str, Any]) -> bytes:
+    """
+    Encode a /books result as an Arrow stream.
+
+    The page's rows are the record batch; `total` and the facet counts, which
+    aren't rows, travel as JSON in the schema metadata.
+    """
+    schema = book_schema({
+        "total": str(result["total"]),
+        "facets": json.dumps(result.get("facets")),
+    })
+    return _stream([book_batch(result["items"], schema)], schema)
+
+
+def price_buckets_stream(result: Dict[str, List[Dict[str, Any]]]) -> bytes:
+    """Encode a /analytics/price-buckets result as an Arrow stream with lower, upper and count columns."""
+    import pyarrow as pa
+
+    buckets = result["buckets"]
+    schema = pa.schema([("lower", pa.float64()), ("upper", pa.float64()), ("count", pa.int64())])
+    batch = pa.record_batch([
+        [b["lower"] for b in buckets],
+        [b["upper"] for b in buckets],
+        [b["count"] for b in buckets],
+    ], schema=schema)
+    return _stream([batch], schema)
@@ -0,0 +1,151 @@
+"""
+In-process result caches.
+
+Results are keyed by everything that determines them - the normalised filter
+and any endpoint parameters - and tagged with the dataset version they were
+computed from; a new version empties the cache. Concurrent misses for the same
+key are coalesced so only one of them runs the query.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from api import metrics
+
+
+class _Flight:
+    """One in-progress computation that other callers can wait on."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class ResultCache:
+    """Bounded LRU of computed results with a time-to-live and single-flight misses."""
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        ttl: float,
+        max_bytes: Optional[int] = None,
+        weigh: Optional[Callable[[Any], int]] = None,
+    ):
+        """
+        Args:
+            name: Label for the cache metrics
+            maxsize: Maximum number of entries
+            ttl: Seconds an entry stays fresh
+            max_bytes: Optional bound on the summed weight of all entries
+            weigh: Estimated size in bytes of a result; required with max_bytes
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.weigh = weigh or (lambda value: 0)
+        self.bytes = 0
+        self._version: Any = None
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], version: Any = None) -> Any:
+        """
+        Return the cached result for key, computing and storing it on a miss.
+
+        Args:
+            key: Hashable cache key
+            compute: Builds the result; exceptions propagate to every waiting caller and nothing is stored
+            version: Dataset version the result depends on; a different version clears the cache
+
+        Returns:
+            The cached or freshly computed result
+        """
+        now = time.monotonic()
+        with self._lock:
+            if version != self._version:
+                self._clear_locked()
+                self._version = version
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                metrics.record_cache(self.name, True)
+                return entry[2]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            metrics.CACHE_REQUESTS.inc(self.name, "coalesced")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        metrics.record_cache(self.name, False)
+        try:
+            value = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            flight.value = value
+            self._store(key, value, version)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def get(self, key: Hashable, version: Any = None) -> Any:
+        """The cached result for key, or None; for results produced outside get_or_compute."""
+        now = time.monotonic()
+        with self._lock:
+            if version != self._version:
+                self._clear_locked()
+                self._version = version
+            entry = self._entries.get(key)
+            hit = entry is not None and entry[0] > now
+            if hit:
+                self._entries.move_to_end(key)
+        metrics.record_cache(self.name, hit)
+        return entry[2] if hit else None
+
+    def put(self, key: Hashable, value: Any, version: Any = None) -> None:
+        """Store a result computed for version; dropped if the dataset has moved on since."""
+        self._store(key, value, version)
+
+    def _store(self, key: Hashable, value: Any, version: Any) -> None:
+        size = self.weigh(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if version != self._version:
+                # The dataset moved on while this was computed
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self.bytes += size
+            while len(self._entries) > self.maxsize or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+
+    def _clear_locked(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear_locked()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,317 @@
+"""
+Response compression with Accept-Encoding negotiation.
+
+gzip is always available; brotli ("br") and zstd are offered when the
+optional brotli and zstandard packages are installed. The server prefers
+br, then zstd, then gzip among the codings a client accepts with the same
+q-value.
+
+Two paths use it:
+
+- CompressionMiddleware compresses dynamic responses, and streams export
+  responses chunk by chunk, at fast levels.
+- Payload holds a cached response body together with its compressed
+  variants. A variant is made the first time a client asks for its coding,
+  at the fast level so that response isn't held up, then remade at a higher
+  level once the response has been sent. Serving a cache hit is then a byte
+  copy. PayloadResponse picks the variant for each request.
+"""
+import zlib
+from typing import Callable, Dict, Mapping, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api import config
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+# Bodies in these formats are already compressed
+INCOMPRESSIBLE_TYPES = ("application/vnd.apache.parquet", "application/gzip", "application/zstd")
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush()
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._c = brotli.Compressor(quality=quality)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+class _Zstd:
+    def __init__(self, level: int):
+        self._c = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+# coding -> (streaming compressor factory, level for dynamic responses, level for stored payloads)
+CODINGS: Dict[str, Tuple[Callable, int, int]] = {}
+if brotli is not None:
+    CODINGS["br"] = (_Brotli, 4, 9)
+if zstandard is not None:
+    CODINGS["zstd"] = (_Zstd, 3, 12)
+CODINGS["gzip"] = (_Gzip, 6, 9)
+
+_ALIASES = {"x-gzip": "gzip"}
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the coding for an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Header value, e.g. "gzip, deflate, br;q=0.9"
+
+    Returns:
+        The available coding the client rates highest, ties broken by server
+        preference, or None for an uncompressed response
+    """
+    if not accept_encoding:
+        return None
+    ratings: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ratings[_ALIASES.get(name, name)] = q
+
+    best, best_q = None, 0.0
+    for coding in CODINGS:
+        q = ratings.get(coding, ratings.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(data: bytes, coding: str, stored: bool = False) -> bytes:
+    """Compress a whole body; stored=True uses the slower, smaller levels for cached payloads."""
+    factory, fast, slow = CODINGS[coding]
+    compressor = factory(slow if stored else fast)
+    return compressor.chunk(data) + compressor.finish()
+
+
+def _compressible(media_type: Optional[str]) -> bool:
+    return not media_type or not media_type.startswith(INCOMPRESSIBLE_TYPES)
+
+
+class Payload:
+    """A response body stored with the compressed variants clients have asked for."""
+
+    __slots__ = ("body", "media_type", "encoded", "compressible", "_final")
+
+    def __init__(self, body: bytes, media_type: str):
+        self.body = body
+        self.media_type = media_type
+        self.encoded: Dict[str, bytes] = {}
+        self.compressible = len(body) >= config.COMPRESS_MIN_BYTES and _compressible(media_type)
+        # Codings already at the stored level, or that don't make the body smaller
+        self._final: Set[str] = set()
+
+    @property
+    def size(self) -> int:
+        """
+        Bytes held once every variant is made: variants are made after the
+        payload is cached, and each is kept only if smaller than the body.
+        """
+        return len(self.body) * (1 + len(CODINGS)) if self.compressible else len(self.body)
+
+    def ready(self, coding: str) -> bool:
+        """Whether encode(coding) would return without compressing."""
+        return coding in self.encoded or coding in self._final
+
+    def final(self, coding: str) -> bool:
+        """Whether the coding's variant is already as small as it will get."""
+        return coding in self._final
+
+    def encode(self, coding: str, stored: bool = False) -> Optional[bytes]:
+        """
+        The body in coding, compressed on first use.
+
+        Args:
+            coding: One of CODINGS
+            stored: Remake the variant at the slower, smaller stored level
+
+        Returns:
+            The compressed body, or None if compressing doesn't make it smaller
+        """
+        if coding in self._final or (coding in self.encoded and not stored):
+            return self.encoded.get(coding)
+        packed = compress(self.body, coding, stored=stored)
+        if len(packed) < len(self.body):
+            self.encoded[coding] = packed
+        else:
+            self._final.add(coding)
+        if stored:
+            self._final.add(coding)
+        return self.encoded.get(coding)
+
+    def precompress(self) -> None:
+        """Make every variant at the stored level, for payloads built off the request path."""
+        if self.compressible:
+            for coding in CODINGS:
+                self.encode(coding, stored=True)
+
+    def coding(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """The coding to send for an Accept-Encoding header, or None for the plain body."""
+        return negotiate(accept_encoding) if self.compressible else None
+
+    def variant(self, accept_encoding: Optional[str]) -> Tuple[Optional[str], bytes]:
+        """The coding and body to send for an Accept-Encoding header."""
+        coding = self.coding(accept_encoding)
+        packed = self.encode(coding) if coding else None
+        return (coding, packed) if packed is not None else (None, self.body)
+
+
+class PayloadResponse(Response):
+    """Sends the variant of a Payload that the request's Accept-Encoding asks for."""
+
+    def __init__(self, payload: Payload, headers: Optional[Mapping[str, str]] = None):
+        self.payload = payload
+        self.extra_headers = dict(headers or {})
+        super().__init__(content=payload.body, media_type=payload.media_type, headers=headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        payload = self.payload
+        coding = payload.coding(Headers(scope=scope).get("accept-encoding"))
+        body = None
+        if coding is not None:
+            body = payload.encoded.get(coding) if payload.ready(coding) else await run_in_threadpool(payload.encode, coding)
+        if body is None:
+            coding, body = None, payload.body
+        headers = dict(self.extra_headers)
+        if payload.compressible:
+            headers["Vary"] = ", ".join(filter(None, (headers.get("Vary"), "Accept-Encoding")))
+        if coding:
+            headers["Content-Encoding"] = coding
+        response = Response(content=body, status_code=self.status_code, media_type=payload.media_type, headers=headers)
+        await response(scope, receive, send)
+        if coding and not payload.final(coding):
+            # The client has its response; shrink the stored variant for later hits
+            await run_in_threadpool(payload.encode, coding, True)
+
+
+class CompressionMiddleware:
+    """
+    Compress responses for clients that accept it.
+
+    Responses that already carry a Content-Encoding (such as PayloadResponse)
+    pass through untouched. So do bodies under COMPRESS_MIN_BYTES and formats
+    that are already compressed. Streaming responses are compressed chunk by
+    chunk, flushing after each one so the client keeps receiving data.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+        minimum_size = config.COMPRESS_MIN_BYTES if self.minimum_size is None else self.minimum_size
+        await _Responder(self.app, coding, minimum_size)(scope, receive, send)
+
+
+class _Responder:
+    def __init__(self, app: ASGIApp, coding: str, minimum_size: int):
+        self.app = app
+        self.coding = coding
+        self.minimum_size = minimum_size
+        self.start: Optional[Message] = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Held until the first body chunk shows whether to compress
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers or not _compressible(headers.get("content-type"))
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+        if self.passthrough:
+            if self.start is not None:
+                await self.send(self.start)
+                self.start = None
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=start["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if not more and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            factory, level, _ = CODINGS[self.coding]
+            self.compressor = factory(level)
+            if not more:
+                packed = self.compressor.chunk(body) + self.compressor.finish()
+                if len(packed) < len(body):
+                    headers["Content-Encoding"] = self.coding
+                    headers["Content-Length"] = str(len(packed))
+                    message = {"type": "http.response.body", "body": packed, "more_body": False}
+                await self.send(start)
+                await self.send(message)
+                return
+            headers["Content-Encoding"] = self.coding
+            del headers["Content-Length"]
+            await self.send(start)
+
+        data = self.compressor.chunk(body) if body else b""
+        if not more:
+            data += self.compressor.finish()
+        if data or not more:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more})
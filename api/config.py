@@ -0,0 +1,70 @@
+"""
+Runtime settings for API features, read from the environment.
+
+Storage settings (USE_MONGO, MONGODB_*) live alongside the database layer in api.db.
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Slow-query log
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+
+# POST /books/batch
+BATCH_LOOKUP_MAX_KEYS = int(os.getenv("BATCH_LOOKUP_MAX_KEYS", "5000"))
+
+# Approximate analytics: how long Mongo mode reuses the stored sketches
+SKETCH_REFRESH_S = float(os.getenv("SKETCH_REFRESH_S", "300"))
+
+# Analytics result cache, keyed by dataset version, endpoint and normalised filter
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "512"))
+ANALYTICS_CACHE_TTL_S = float(os.getenv("ANALYTICS_CACHE_TTL_S", "60"))
+
+# /books result cache; concurrent identical misses share one query
+BOOKS_CACHE_SIZE = int(os.getenv("BOOKS_CACHE_SIZE", "2048"))
+BOOKS_CACHE_TTL_S = float(os.getenv("BOOKS_CACHE_TTL_S", "30"))
+BOOKS_CACHE_MAX_MB = float(os.getenv("BOOKS_CACHE_MAX_MB", "64"))
+
+# /books/suggest: how long Mongo mode reuses the autocomplete index
+SUGGEST_REFRESH_S = float(os.getenv("SUGGEST_REFRESH_S", "300"))
+
+# /books?match=fuzzy returns at most this many matches
+FUZZY_MAX_RESULTS = int(os.getenv("FUZZY_MAX_RESULTS", "1000"))
+
+# Startup warm-up: seconds before a failed stage (e.g. MongoDB unreachable) is retried;
+# the analytics refresh worker waits as long before retrying a failed result
+WARMUP_RETRY_S = float(os.getenv("WARMUP_RETRY_S", "5"))
+
+# Precomputed unfiltered analytics: recomputed in the background every ANALYTICS_REFRESH_S and
+# within ANALYTICS_REFRESH_POLL_S of a new dataset version; served stale meanwhile
+ANALYTICS_REFRESH_S = float(os.getenv("ANALYTICS_REFRESH_S", "60"))
+ANALYTICS_REFRESH_POLL_S = float(os.getenv("ANALYTICS_REFRESH_POLL_S", "1"))
+ANALYTICS_PRECOMPUTED_MAX_KEYS = int(os.getenv("ANALYTICS_PRECOMPUTED_MAX_KEYS", "64"))
+# Price histogram bucket sizes computed at startup, besides any that clients ask for
+ANALYTICS_PRECOMPUTED_BUCKET_SIZES = [
+    float(size) for size in os.getenv("ANALYTICS_PRECOMPUTED_BUCKET_SIZES", "10").split(",") if size.strip()
+]
+
+# Response compression: bodies smaller than this are sent as they are
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+
+# /books/export result cache, stored precompressed; larger exports are only streamed
+EXPORT_CACHE_SIZE = int(os.getenv("EXPORT_CACHE_SIZE", "16"))
+EXPORT_CACHE_TTL_S = float(os.getenv("EXPORT_CACHE_TTL_S", "300"))
+EXPORT_CACHE_MAX_MB = float(os.getenv("EXPORT_CACHE_MAX_MB", "32"))
+# Largest single export kept; every export in flight holds a copy up to this size until it finishes
+EXPORT_CACHE_ENTRY_MAX_MB = float(os.getenv("EXPORT_CACHE_ENTRY_MAX_MB", "4"))
+
+# Near-duplicate clustering: estimated title similarity (Jaccard over character trigrams) to join a cluster
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.7"))
+
+# Request profiling: share of /books and /analytics requests profiled at random (0 disables),
+# how often the sampler reads stacks, and how many profiles /admin/profiles keeps
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+PROFILE_LOG_SIZE = int(os.getenv("PROFILE_LOG_SIZE", "50"))
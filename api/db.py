@@ -5,24 +5,81 @@ Provides unified interface for loading book data from either MongoDB or local JS
 with support for filtering, sorting, and analytics queries.
 """
 import os
+import sys
 import json
+import logging
+import itertools
 import math
-from typing import List, Dict, Any, Optional, Tuple
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, List, Dict, Any, Iterable, Iterator, Optional, Tuple, Sequence
 from functools import lru_cache
-import pymongo
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from pathlib import Path
-from api.utils import parse_price 
+from api.utils import parse_prices, title_words
+from api.models import Book, BookFilter, NO_FILTER
+from api import config, profiling, shared, slowlog
+from api.sketches import SketchSet
+from api.suggest import SuggestIndex
+from api.fuzzy import TrigramIndex
+from api.dedup import cluster_ids
+from api import metrics
+
+# pymongo is imported when Mongo mode first connects, not at startup
+if TYPE_CHECKING:
+    import pymongo
+    from pymongo.read_preferences import _ServerMode
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Configuration constants
-USE_MONGO = os.getenv("USE_MONGO", "true").lower() == "true"
+# USE_SQLITE serves the feed from an embedded SQLite file and takes precedence over USE_MONGO
+USE_SQLITE = os.getenv("USE_SQLITE", "false").lower() == "true"
+USE_MONGO = os.getenv("USE_MONGO", "true").lower() == "true" and not USE_SQLITE
 DATA_PATH = (Path(__file__).resolve().parents[1] / "data" / "sample_run.json")
+SQLITE_PATH = Path(os.getenv("SQLITE_PATH") or DATA_PATH.with_suffix(".sqlite"))
 MONGO_URI = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DB_NAME = os.getenv("MONGODB_DB", "books_db")
 COLLECTION_NAME = os.getenv("MONGODB_COLLECTION", "books")
+SHARED_DATASET_DIR = os.getenv("SHARED_DATASET_DIR", "")
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+SKETCH_COLLECTION = os.getenv("MONGODB_SKETCH_COLLECTION", "analytics_sketches")
+# Counter the scraper pipeline bumps after each crawl; read at most every MONGODB_VERSION_POLL_S
+VERSION_COLLECTION = os.getenv("MONGODB_VERSION_COLLECTION", "dataset_versions")
+VERSION_POLL_S = float(os.getenv("MONGODB_VERSION_POLL_S", "5"))
+
+# MongoDB connection pool and timeouts
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_MS = int(os.getenv("MONGODB_MAX_IDLE_MS", "300000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "2000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "30000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "2000"))
+# Connections opened per read route at startup
+MONGO_WARMUP_CONNECTIONS = int(os.getenv("MONGODB_WARMUP_CONNECTIONS", "4"))
+
+# Read routing on replica sets. "listing" serves /books, "analytics" serves
+# aggregations and full-collection scans; anything else reads the primary.
+# Tags are comma-separated key:value pairs, e.g. "nodeType:ANALYTICS".
+MONGO_READ_ROUTES = {
+    "listing": {
+        "mode": os.getenv("MONGODB_LISTING_READ_PREFERENCE", "nearest"),
+        "tags": os.getenv("MONGODB_LISTING_TAGS", ""),
+        "max_staleness": int(os.getenv("MONGODB_LISTING_MAX_STALENESS_S", "90")),
+    },
+    "analytics": {
+        "mode": os.getenv("MONGODB_ANALYTICS_READ_PREFERENCE", "secondaryPreferred"),
+        "tags": os.getenv("MONGODB_ANALYTICS_TAGS", "nodeType:ANALYTICS"),
+        "max_staleness": int(os.getenv("MONGODB_ANALYTICS_MAX_STALENESS_S", "-1")),
+    },
+}
 
 # Custom exceptions
 class DataLoadError(RuntimeError):
@@ -30,33 +87,118 @@ class DataLoadError(RuntimeError):
     pass
 
 # Database connection functions
+def read_preference(route: str) -> "_ServerMode":
+    """
+    Read preference for a read route in MONGO_READ_ROUTES.
+    
+    A tagged route falls back to the other eligible members only as its mode
+    allows, e.g. secondaryPreferred reads the primary when no tagged secondary
+    is up. Unknown routes read the primary.
+    
+    Raises:
+        ValueError: If the route's mode is not a MongoDB read preference name
+    """
+    from pymongo import read_preferences
+
+    settings = MONGO_READ_ROUTES.get(route)
+    if settings is None:
+        return read_preferences.Primary()
+    modes = {
+        "primary": read_preferences.Primary,
+        "primaryPreferred": read_preferences.PrimaryPreferred,
+        "secondary": read_preferences.Secondary,
+        "secondaryPreferred": read_preferences.SecondaryPreferred,
+        "nearest": read_preferences.Nearest,
+    }
+    mode = modes.get(settings["mode"])
+    if mode is None:
+        raise ValueError(f"Unknown read preference {settings['mode']!r} for {route} reads")
+    if mode is read_preferences.Primary:
+        return mode()
+    tags = dict(pair.split(":", 1) for pair in settings["tags"].split(",") if pair.strip())
+    tags = {k.strip(): v.strip() for k, v in tags.items()}
+    return mode(tag_sets=[tags] if tags else None, max_staleness=settings["max_staleness"])
+
 @lru_cache(maxsize=1)
-def get_collection():
+def get_client() -> "pymongo.MongoClient":
     """
-    Get MongoDB collection with connection caching.
+    Get the shared MongoClient, configured from the MONGODB_* pool and timeout settings.
     
-    Returns:
-        pymongo.Collection: The books collection
-        
     Raises:
         DataLoadError: If connection to MongoDB fails
     """
-    try: 
-        client = pymongo.MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000)
+    import pymongo
+
+    try:
+        client = pymongo.MongoClient(
+            MONGO_URI,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_MS,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            event_listeners=[metrics.MongoCommandListener()],
+        )
         client.admin.command("ping")
-        db = client[DB_NAME]
-        return db[COLLECTION_NAME]
+        return client
     except Exception as e:
         raise DataLoadError(f"Could not connect to MongoDB: {e}") from e
+
+@lru_cache(maxsize=None)
+def get_collection(route: str = "primary"):
+    """
+    Get the books collection, reading through the given route.
+    
+    Args:
+        route: "listing" for /books reads, "analytics" for aggregations and
+            full scans, anything else for the primary
+    
+    Returns:
+        pymongo.Collection: The books collection with the route's read preference
+        
+    Raises:
+        DataLoadError: If connection to MongoDB fails or the route is misconfigured
+    """
+    client = get_client()
+    try:
+        pref = read_preference(route)
+    except ValueError as e:
+        raise DataLoadError(str(e)) from e
+    return client[DB_NAME].get_collection(COLLECTION_NAME, read_preference=pref)
+
+def warm_up_mongo(connections: int = MONGO_WARMUP_CONNECTIONS) -> None:
+    """
+    Open pooled connections before the first request.
+    
+    Runs `connections` concurrent reads on every route, so each route's
+    servers have that many sockets ready instead of opening them under load.
+    
+    Raises:
+        DataLoadError: If MongoDB cannot be reached
+    """
+    from pymongo.errors import PyMongoError
+
+    routes = list(MONGO_READ_ROUTES)
+    with ThreadPoolExecutor(max(1, connections)) as pool:
+        for route in routes:
+            coll = get_collection(route)
+            reads = [pool.submit(coll.find_one, {}, {"_id": 1}) for _ in range(max(1, connections))]
+            try:
+                for read in reads:
+                    read.result()
+            except PyMongoError as e:
+                raise DataLoadError(f"Could not warm up MongoDB {route} reads: {e}") from e
         
 
 # Data loading functions
-def _load_from_file() -> List[Dict[str, Any]]:
+def _load_from_file() -> List[Book]:
     """
     Load book data from local JSON file.
     
     Returns:
-        List[Dict]: Normalized book data
+        List[Book]: Normalized book data
         
     Raises:
         DataLoadError: If file cannot be read or parsed
@@ -66,13 +208,13 @@ def _load_from_file() -> List[Dict[str, Any]]:
         data = json.loads(text)
         if not isinstance(data, list):
             raise DataLoadError("Books data is not in a list")
-        return [_normalise_item(raw) for raw in data]
+        return _normalise_items(data)
     except FileNotFoundError as e:
         raise DataLoadError(f"Data File not found: {DATA_PATH}") from e
     except json.JSONDecodeError as e:
         raise DataLoadError(f"Invalid JSON in {DATA_PATH}: {e}") from e
     
-def _normalise_item(raw: Dict[str, Any]) -> Dict[str, Any]:
+def _normalise_item(raw: Dict[str, Any]) -> Book:
     """
     Normalise raw book data into consistent format.
     
@@ -80,24 +222,47 @@ def _normalise_item(raw: Dict[str, Any]) -> Dict[str, Any]:
         raw: Raw book data from database or file
         
     Returns:
-        Dict: Normalised book data with consistent fields
+        Book: Normalised book record with consistent fields
     """
-    _id_fallback = str(raw.get("_id") or "").strip()
-    price_num = raw.get("price_num")
-    return {
-        "id": (raw.get("id") or raw.get("url") or _id_fallback).strip(),
-        "title": (raw.get("title") or "").strip(),
-        "url": (raw.get("url") or "").strip(),
-        "price": price_num if isinstance(price_num, (int, float)) else parse_price(raw.get("price")),
-        "availability": (raw.get("availability") or "").strip()
-    }
+    return _normalise_items([raw])[0]
 
-@lru_cache(maxsize=1)
-def load_books() -> List[Dict[str, Any]]:
-    """Load all books from configured data source (MongoDB or file)."""
+def _normalise_items(raws: List[Dict[str, Any]]) -> List[Book]:
+    """
+    Normalise a batch of raw book data, parsing the price column in one pass.
+    
+    Availability labels are interned, since a catalogue only has a handful of them.
+    
+    Args:
+        raws: Raw book data from database or file
+        
+    Returns:
+        List[Book]: Normalised book records, in input order
+    """
+    with profiling.phase("normalise"):
+        prices, missing = parse_prices(
+            raw.get("price_num") if isinstance(raw.get("price_num"), (int, float)) else raw.get("price")
+            for raw in raws
+        )
+        intern = sys.intern
+        items = []
+        for raw, price, is_missing in zip(raws, prices, missing):
+            _id_fallback = str(raw.get("_id") or "").strip()
+            items.append(Book(
+                id=(raw.get("id") or raw.get("url") or _id_fallback).strip(),
+                title=(raw.get("title") or "").strip(),
+                url=(raw.get("url") or "").strip(),
+                price=None if is_missing else price,
+                availability=intern((raw.get("availability") or "").strip()),
+            ))
+        return items
+
+def load_books_from_source() -> List[Book]:
+    """Load all books from configured data source (MongoDB, SQLite or file)."""
+    if USE_SQLITE:
+        return load_books_sqlite()
     if USE_MONGO:
         try: 
-            coll = get_collection()
+            coll = get_collection("analytics")
             docs = list(
                 coll.find(
                     {}, 
@@ -109,14 +274,168 @@ def load_books() -> List[Dict[str, Any]]:
                     "availability" : 1},
                 )
             )
-            return [_normalise_item(doc) for doc in docs]
+            return _normalise_items(docs)
         except DataLoadError:
             raise
         except Exception as e:
             raise DataLoadError(f"Failed to load books from MONGODB: {e}")
     else: 
         return _load_from_file()
+
+_dataset_version = 0
+# (monotonic time read, counter) for the collection's stored version
+_mongo_version: Tuple[float, int] = (-math.inf, 0)
+
+def _stored_version_mongo() -> int:
+    global _mongo_version
+    read_at, version = _mongo_version
+    if time.monotonic() - read_at < VERSION_POLL_S:
+        return version
+    try:
+        coll = get_collection("analytics")
+        doc = coll.database[VERSION_COLLECTION].find_one({"_id": COLLECTION_NAME})
+        version = int(doc["version"]) if doc else 0
+    except Exception as e:
+        # Keep serving under the last version seen; the queries themselves report the outage
+        logger.warning("Could not read the dataset version: %s", e)
+    _mongo_version = (time.monotonic(), version)
+    return version
+
+def dataset_version() -> int:
+    """
+    Version of the dataset load_books() currently serves.
+    
+    In shared mode this is the published generation; otherwise it is bumped by
+    reload_books(), and in Mongo mode also by every crawl, which increments a
+    counter in VERSION_COLLECTION that is polled every VERSION_POLL_S.
+    """
+    if SHARED_DATASET_DIR:
+        return shared.current_generation(SHARED_DATASET_DIR) or 0
+    if USE_MONGO:
+        return _dataset_version + _stored_version_mongo()
+    return _dataset_version
+
+def dataset_cache_info():
+    """functools cache statistics for the loaded dataset."""
+    return _load_books.cache_info()
+
+def reload_books() -> None:
+    """Drop the loaded dataset so the next load_books() call reloads it."""
+    global _dataset_version
+    _load_books.cache_clear()
+    _dataset_version += 1
+
+@lru_cache(maxsize=1)
+def _load_books(version: int) -> Sequence[Book]:
+    if SHARED_DATASET_DIR:
+        try:
+            return shared.attach(SHARED_DATASET_DIR, version or None)
+        except (OSError, ValueError) as e:
+            raise DataLoadError(f"Could not attach shared dataset: {e}") from e
+    return load_books_from_source()
+
+def load_books() -> Sequence[Book]:
+    """
+    Load all books, cached per dataset version.
+    
+    With SHARED_DATASET_DIR set, maps the snapshot published by
+    `python -m api.shared publish` instead of loading a private copy, and
+    switches to a newer generation as soon as one is published.
+    """
+    return _load_books(dataset_version())
+    
+_indexes: Dict[str, Tuple[Any, Any]] = {}
+
+def dataset_index(items: Sequence[Book], name: str, build):
+    """
+    Get a derived index over the loaded dataset, building it on first use.
+    
+    Indexes are rebuilt whenever load_books() hands out a different dataset,
+    e.g. after a reload or a new shared generation.
+    
+    Args:
+        items: The dataset, as returned by load_books()
+        name: Index name
+        build: Callable building the index from items
+    """
+    cached = _indexes.get(name)
+    if cached is not None and cached[0] is items:
+        return cached[1]
+    index = build(items)
+    _indexes[name] = (items, index)
+    return index
+
+# Analytics sketches, written by the scraper pipeline at ingest
+def sketches_path() -> Path:
+    """Where file mode keeps the sketches for DATA_PATH: beside the feed."""
+    return DATA_PATH.with_suffix(".sketches.json")
+
+def build_sketches(items: Sequence[Book]) -> SketchSet:
+    """
+    Sketches for a loaded dataset.
+    
+    Uses the sketch file written at ingest when it covers the same number of
+    books, and otherwise builds them from items in one pass.
+    """
+    path = sketches_path()
+    if path.exists():
+        try:
+            sketches = SketchSet.from_dict(json.loads(path.read_text(encoding="utf-8")))
+            if sketches.books == len(items):
+                return sketches
+        except (OSError, ValueError, KeyError):
+            pass
+    return SketchSet.from_books(items)
+
+_mongo_indexes: Dict[str, Tuple[float, int, Any]] = {}
+
+def mongo_index(name: str, build, ttl: float):
+    """
+    Mongo-mode counterpart of dataset_index: a derived structure built from the
+    collection and reused for ttl seconds or until the dataset version changes.
+    
+    Args:
+        name: Index name
+        build: Callable building the index from the books collection, read through the analytics route
+        ttl: Seconds before the collection is read again
+    """
+    cached = _mongo_indexes.get(name)
+    if cached is not None and cached[1] == dataset_version() and time.monotonic() - cached[0] < ttl:
+        return cached[2]
+    index = build(get_collection("analytics"))
+    _mongo_indexes[name] = (time.monotonic(), dataset_version(), index)
+    return index
+
+def _build_sketches_mongo(coll) -> SketchSet:
+    doc = coll.database[SKETCH_COLLECTION].find_one({"_id": COLLECTION_NAME})
+    if doc is not None:
+        stored = SketchSet.from_dict(doc)
+        # A sketch from a partial crawl, or one older than later writes, doesn't cover the collection
+        if stored.books == coll.estimated_document_count():
+            return stored
+    sketches = SketchSet()
+    for d in coll.find({}, {"title": 1, "price_num": 1, "availability": 1}):
+        sketches.update(d.get("title"), d.get("price_num"), d.get("availability"))
+    return sketches
+
+def sketches_mongo() -> SketchSet:
+    """
+    Sketches stored next to the books collection, cached for SKETCH_REFRESH_S.
     
+    Falls back to one scan of the collection when the pipeline has not stored
+    any yet, or when the stored ones cover a different number of books than
+    the collection holds.
+    """
+    return mongo_index("sketches", _build_sketches_mongo, config.SKETCH_REFRESH_S)
+
+def suggest_index_mongo() -> SuggestIndex:
+    """Autocomplete index over the collection's titles, cached for SUGGEST_REFRESH_S."""
+    return mongo_index(
+        "suggest",
+        lambda coll: SuggestIndex(d.get("title") for d in coll.find({}, {"_id": 0, "title": 1})),
+        config.SUGGEST_REFRESH_S,
+    )
+
 # MongoDB query building functions 
 def build_mongo_query(
         q: Optional[str],
@@ -171,19 +490,219 @@ def _mongo_sort(sort: Optional[str]) -> list:
     Returns:
         list: MongoDB sort specification
     """
+    from pymongo import ASCENDING, DESCENDING
+
     if not sort: 
         return []
     if sort == "price_asc":
-        return [("price_num", pymongo.ASCENDING)]
+        return [("price_num", ASCENDING)]
     if sort == "price_desc":
-        return [("price_num", pymongo.DESCENDING)]
+        return [("price_num", DESCENDING)]
     if sort == "title_asc":
-        return [("title", pymongo.ASCENDING)]
+        return [("title", ASCENDING)]
     if sort == "title_desc":
-        return [("title", pymongo.DESCENDING)]
+        return [("title", DESCENDING)]
     return []
 
+# File-mode query functions
+def filter_books(
+        items: Sequence[Book],
+        q: Optional[str],
+        availability: Optional[str],
+        price_min: Optional[float],
+        price_max: Optional[float],
+) -> Sequence[Book]:
+    """
+    Apply the /books filters to in-memory records in a single pass.
+    
+    Matches build_mongo_query: case-insensitive title substring, case-insensitive
+    exact availability, and an inclusive price range that excludes unpriced books.
+    
+    Returns:
+        Sequence[Book]: Matching books in dataset order (items itself if no filter is set)
+    """
+    if not q and not availability and price_min is None and price_max is None:
+        return items
+    if isinstance(items, shared.SharedRows):
+        return items.where(q, availability, price_min, price_max)
+
+    q_l = q.lower() if q else None
+    wanted = availability.strip().lower() if availability else None
+    low = price_min if price_min is not None else -math.inf
+    high = price_max if price_max is not None else math.inf
+    check_price = price_min is not None or price_max is not None
+
+    return [
+        item for item in items
+        if (q_l is None or q_l in item.title.lower())
+        and (wanted is None or item.availability.strip().lower() == wanted)
+        and (not check_price or (item.price is not None and low <= item.price <= high))
+    ]
+
+def fuzzy_books(
+        items: Sequence[Book],
+        q: str,
+        availability: Optional[str],
+        price_min: Optional[float],
+        price_max: Optional[float],
+) -> List[Book]:
+    """
+    Typo-tolerant title search over in-memory records, best match first.
+    
+    Uses a trigram index built once per dataset; the other filters then apply
+    as in filter_books. At most FUZZY_MAX_RESULTS books are returned.
+    """
+    index = dataset_index(items, "trigrams", TrigramIndex.from_books)
+    matched = [items[row] for row in index.search(q)]
+    return list(filter_books(matched, None, availability, price_min, price_max))[:config.FUZZY_MAX_RESULTS]
+
+def book_clusters(items: Sequence[Book]) -> Dict[str, str]:
+    """Near-duplicate cluster id of every book, by book id (see api.dedup)."""
+    return dict(zip((b.id for b in items), cluster_ids((b.id, b.title) for b in items)))
+
+def dedupe_books(items: Sequence[Book], clusters: Dict[str, str]) -> Sequence[Book]:
+    """
+    Keep the first book of each near-duplicate cluster, in dataset order.
+    
+    Args:
+        items: Books, usually already filtered
+        clusters: Cluster id by book id, from book_clusters over the whole dataset
+    """
+    seen = set()
+    keep = []
+    for position, book_id in enumerate(book_column(items, "id")):
+        cluster = clusters.get(book_id, book_id)
+        if cluster not in seen:
+            seen.add(cluster)
+            keep.append(position)
+    if isinstance(items, shared.SharedRows):
+        return items.subset(keep)
+    return [items[position] for position in keep]
+
+def sort_books(items: Sequence[Book], sort: Optional[str]) -> Sequence[Book]:
+    """
+    Sort in-memory records by a /books sort parameter.
+    
+    Price sorts drop unpriced books, as the Mongo path does.
+    """
+    if not sort:
+        return items
+    if isinstance(items, shared.SharedRows):
+        return items.sorted(sort)
+    if sort.startswith("price_"):
+        priced_items = [item for item in items if item.price is not None]
+        return sorted(priced_items, key=lambda x: x.price, reverse=(sort == "price_desc"))
+    if sort.startswith("title_"):
+        return sorted(items, key=lambda x: x.title.lower(), reverse=(sort == "title_desc"))
+    return items
+
+def book_column(items: Sequence[Book], field: str) -> Iterable[Any]:
+    """
+    One field of every book, in order.
+    
+    Shared snapshots read it straight from the mapped column instead of
+    decoding a Book per row.
+    """
+    if isinstance(items, shared.SharedRows):
+        return items.column(field)
+    return (getattr(b, field) for b in items)
+
+def _build_key_index(items: Sequence[Book]) -> Dict[str, int]:
+    """
+    Row number of every id and URL; rows, not Books, so a shared snapshot stays in the page cache.
+    
+    A key shared by several books resolves to the first of them, whether it is an id
+    or a URL, as in lookup_books_mongo.
+    """
+    index = {}
+    for row, item in enumerate(items):
+        if item.url:
+            index.setdefault(item.url, row)
+        if item.id:
+            index.setdefault(item.id, row)
+    return index
+
+def lookup_books(items: Sequence[Book], keys: List[str]) -> Dict[str, Book]:
+    """
+    Resolve book ids or URLs against the in-memory dataset with a hash map.
+    
+    The map is built on the first lookup and only holds row numbers; books
+    are read from items for the keys asked for.
+    
+    Returns:
+        Dict[str, Book]: Found books by key; missing keys are absent
+    """
+    index = dataset_index(items, "keys", _build_key_index)
+    return {key: items[index[key]] for key in keys if key in index}
+
+FACETS = ("availability", "price")
+
+def book_facets(items: Sequence[Book], facets: Sequence[str], bucket_size: float) -> Dict[str, list]:
+    """
+    Facet counts over already-filtered books, one pass per facet.
+    
+    Availability labels are lower-cased as in /analytics/availability. Price
+    ranges are bucket_size wide and aligned to multiples of bucket_size;
+    unpriced books are not counted.
+    
+    Args:
+        items: Books matching the current filter
+        facets: Facet names from FACETS
+        bucket_size: Width of each price range
+    
+    Returns:
+        Dict: {"availability": [{label, count}], "price": [{lower, upper, count}]} for the requested facets
+    """
+    want_availability = "availability" in facets
+    want_price = "price" in facets
+    labels: Counter = Counter()
+    buckets: Counter = Counter()
+    floor = math.floor
+    if want_availability:
+        for availability in book_column(items, "availability"):
+            labels[(availability or "unknown").strip().lower()] += 1
+    if want_price:
+        for price in book_column(items, "price"):
+            if price is not None:
+                buckets[floor(price / bucket_size)] += 1
+
+    out: Dict[str, list] = {}
+    if want_availability:
+        out["availability"] = [{"label": label, "count": count} for label, count in sorted(labels.items())]
+    if want_price:
+        out["price"] = [
+            {"lower": i * bucket_size, "upper": (i + 1) * bucket_size, "count": count}
+            for i, count in sorted(buckets.items())
+        ]
+    return out
+
 # MongoDB data retrieval functions
+BOOK_PROJECTION = {
+    "_id": 1,
+    "id": 1,
+    "title": 1,
+    "url": 1,
+    "availability": 1,
+    "price": 1,
+    "price_num": 1,
+}
+
+def _listing_query(
+        q: Optional[str],
+        availability: Optional[str],
+        price_min: Optional[float],
+        price_max: Optional[float],
+        sort: Optional[str],
+) -> dict:
+    """build_mongo_query, plus skipping unpriced books when sorting by price."""
+    query = build_mongo_query(q, availability, price_min, price_max)
+    
+    if sort in ("price_asc", "price_desc"):
+        price_filter = query.get("price_num", {})
+        price_filter["$ne"] = None
+        query["price_num"] = price_filter
+    return query
+
 def list_books_mongo(
         q: Optional[str], 
         price_min: Optional[float], 
@@ -209,50 +728,251 @@ def list_books_mongo(
         tuple: (total_count, book_list)
     """
     
-    coll = get_collection()
-    query = build_mongo_query(q, availability, price_min, price_max)
-    
-    if sort in ("price_asc", "price_desc"):
-        price_filter = query.get("price_num", {})
-        price_filter["$ne"] = None
-        query["price_num"] = price_filter
+    coll = get_collection("listing")
+    query = _listing_query(q, availability, price_min, price_max, sort)
 
+    slowlog.capture(coll, {"count": query})
     total = coll.count_documents(query)
+    return total, _find_page_mongo(coll, query, limit, offset, sort)
+
+def _find_page_mongo(coll, query: Dict[str, Any], limit: int, offset: int, sort: Optional[str]) -> list:
+    """One page of books through find(), so the sort can walk an index."""
     sort_spec = _mongo_sort(sort)
-    cursor = coll.find(
-        query, 
-        {
-            "_id": 1,
-            "id": 1,
-            "title": 1,
-            "url": 1,
-            "availability": 1,
-            "price": 1,
-            "price_num": 1,
-        },
-    )
+    cursor = coll.find(query, BOOK_PROJECTION)
     if sort_spec:
         cursor = cursor.sort(sort_spec)
 
     cursor = cursor.skip(offset).limit(limit)         
+    find_shape = {"find": query, "skip": offset, "limit": limit}
+    if sort_spec:
+        find_shape["sort"] = dict(sort_spec)
+    slowlog.capture(coll, find_shape)
     
 
     docs = list(cursor)
-    items = [_normalise_item(doc) for doc in docs]
-    return total, items 
+    return _normalise_items(docs)
+
+def list_books_faceted_mongo(
+        q: Optional[str],
+        price_min: Optional[float],
+        price_max: Optional[float],
+        availability: Optional[str],
+        limit: int,
+        offset: int,
+        sort: Optional[str],
+        facets: Sequence[str],
+        bucket_size: float,
+) -> Tuple[int, list, Dict[str, list]]:
+    """
+    list_books_mongo plus facet counts.
+    
+    The filter runs once in $match and a $facet stage counts the total and
+    every requested facet from the matched documents. The page itself comes
+    from find(), as in list_books_mongo: a $sort inside $facet can't use an
+    index and is held to the in-memory sort limit.
+    
+    Returns:
+        tuple: (total_count, book_list, facets) with facets shaped as book_facets()
+    """
+    coll = get_collection("listing")
+    query = build_mongo_query(q, availability, price_min, price_max)
+    listing = _listing_query(q, availability, price_min, price_max, sort)
+    # Price sorts also skip unpriced books, as list_books_mongo does
+    listing_match = [{"$match": {"price_num": {"$ne": None}}}] if listing != query else []
+
+    branches: Dict[str, list] = {"total": listing_match + [{"$count": "n"}]}
+    if "availability" in facets:
+        branches["availability"] = [
+            {"$group": {"_id": {"$toLower": {"$ifNull": ["$availability", "unknown"]}}, "count": {"$sum": 1}}},
+            {"$sort": {"_id": 1}},
+        ]
+    if "price" in facets:
+        branches["price"] = [
+            {"$match": {"price_num": {"$ne": None}}},
+            {"$group": {"_id": {"$floor": {"$divide": ["$price_num", bucket_size]}}, "count": {"$sum": 1}}},
+            {"$sort": {"_id": 1}},
+        ]
+
+    pipeline = [{"$match": query}, {"$facet": branches}]
+    slowlog.capture(coll, {"aggregate": pipeline})
+    result = next(iter(coll.aggregate(pipeline)), {})
+
+    total = result["total"][0]["n"] if result.get("total") else 0
+    items = _find_page_mongo(coll, listing, limit, offset, sort)
+    out: Dict[str, list] = {}
+    if "availability" in facets:
+        out["availability"] = [{"label": r["_id"], "count": int(r["count"])} for r in result.get("availability", [])]
+    if "price" in facets:
+        out["price"] = [
+            {"lower": int(r["_id"]) * bucket_size, "upper": (int(r["_id"]) + 1) * bucket_size, "count": int(r["count"])}
+            for r in result.get("price", [])
+        ]
+    return total, items, out
+
+def _build_trigrams_mongo(coll) -> Tuple[TrigramIndex, List[Any]]:
+    ids, titles = [], []
+    for doc in coll.find({}, {"title": 1}):
+        ids.append(doc["_id"])
+        titles.append(doc.get("title"))
+    return TrigramIndex(titles), ids
+
+def trigram_index_mongo() -> Tuple[TrigramIndex, List[Any]]:
+    """Trigram index over the collection's titles and the matching _ids, cached for SUGGEST_REFRESH_S."""
+    return mongo_index("trigrams", _build_trigrams_mongo, config.SUGGEST_REFRESH_S)
+
+def fuzzy_books_mongo(
+        q: str,
+        availability: Optional[str],
+        price_min: Optional[float],
+        price_max: Optional[float],
+) -> List[Book]:
+    """
+    Typo-tolerant title search in Mongo mode, best match first.
+    
+    Candidates come from an in-memory trigram index over the collection's
+    titles (refreshed like the autocomplete index); the best
+    FUZZY_MAX_RESULTS ids are then fetched with the other filters applied
+    in the same query.
+    """
+    index, ids = trigram_index_mongo()
+    wanted = [ids[row] for row in index.search(q)]
+    if not wanted:
+        return []
+    coll = get_collection("listing")
+    query = build_mongo_query(None, availability, price_min, price_max)
+    rank = {}
+    for i, _id in enumerate(wanted):
+        rank.setdefault(_id, i)
+
+    books: List[Book] = []
+    for start in range(0, len(wanted), EXPORT_BATCH_SIZE):
+        batch = {**query, "_id": {"$in": wanted[start:start + EXPORT_BATCH_SIZE]}}
+        slowlog.capture(coll, {"find": batch})
+        docs = sorted(coll.find(batch, BOOK_PROJECTION), key=lambda d: rank[d["_id"]])
+        books.extend(_normalise_items(docs))
+        if len(books) >= config.FUZZY_MAX_RESULTS:
+            break
+    return books[:config.FUZZY_MAX_RESULTS]
+
+def iter_books_mongo(
+        q: Optional[str], 
+        price_min: Optional[float], 
+        price_max: Optional[float],
+        availability: Optional[str], 
+        sort: Optional[str],
+        batch_size: Optional[int] = None,
+) -> Iterator[List[Book]]:
+    """
+    Stream every matching book from MongoDB in batches, for bulk export.
+    
+    Connects and reads the first batch before returning, so connection and query
+    errors surface as DataLoadError before any response bytes are sent.
+    
+    Args:
+        q, price_min, price_max, availability, sort: Same as list_books_mongo
+        batch_size: Documents fetched per server round trip (default EXPORT_BATCH_SIZE)
+        
+    Returns:
+        Iterator[List[Book]]: Normalised books, one list per cursor batch
+    """
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    coll = get_collection("analytics")
+    query = _listing_query(q, availability, price_min, price_max, sort)
+    sort_spec = _mongo_sort(sort)
+    find_shape = {"find": query}
+    if sort_spec:
+        find_shape["sort"] = dict(sort_spec)
+    slowlog.capture(coll, find_shape)
+
+    from pymongo.errors import PyMongoError
+
+    cursor = coll.find(query, BOOK_PROJECTION, sort=sort_spec or None, batch_size=batch_size)
+    # pymongo only sends the query on the first read; without it an error would cut off a 200 mid-stream
+    try:
+        first = next(cursor, None)
+    except PyMongoError as e:
+        cursor.close()
+        raise DataLoadError(f"Failed to export books from MongoDB: {e}") from e
+    docs = cursor if first is None else itertools.chain([first], cursor)
+
+    def batches() -> Iterator[List[Book]]:
+        with cursor:
+            batch = []
+            for doc in docs:
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    yield _normalise_items(batch)
+                    batch = []
+            if batch:
+                yield _normalise_items(batch)
+
+    return batches()
+
+def lookup_books_mongo(keys: List[str]) -> Dict[str, Book]:
+    """
+    Resolve book ids or URLs with a single `$in` query on the `_id` and `url` indexes.
+    
+    Returns:
+        Dict[str, Book]: Found books by key; missing keys are absent
+    """
+    coll = get_collection("listing")
+    unique = list(dict.fromkeys(keys))
+    query = {"$or": [{"_id": {"$in": unique}}, {"url": {"$in": unique}}]}
+    slowlog.capture(coll, {"find": query})
+    docs = list(coll.find(query, BOOK_PROJECTION))
+
+    wanted = set(unique)
+    found: Dict[str, Book] = {}
+    for doc, book in zip(docs, _normalise_items(docs)):
+        for key in (str(doc.get("_id")), book.url, book.id):
+            if key in wanted:
+                found.setdefault(key, book)
+    return found
 
 # Analytics functions
-def price_stats_mongo() -> Dict[str, Any]:
+def _analytics_match(filters: BookFilter, priced: bool = False) -> dict:
+    """build_mongo_query for an analytics filter, optionally skipping unpriced books."""
+    query = build_mongo_query(filters.q, filters.availability, filters.price_min, filters.price_max)
+    if priced:
+        price_filter = dict(query.get("price_num", {}))
+        price_filter["$ne"] = None
+        query["price_num"] = price_filter
+    return query
+
+def _analytics_stages(filters: BookFilter, priced: bool = False, dedupe: bool = False) -> List[dict]:
+    """
+    Leading pipeline stages selecting the books an analytics query counts.
+    
+    With dedupe, only the first matching book of each near-duplicate cluster
+    (the `cluster_id` set at ingest; a book without one is its own cluster) is
+    kept, before unpriced books are skipped, so clusters are picked as in file mode.
+    """
+    if not dedupe:
+        return [{"$match": _analytics_match(filters, priced)}]
+    stages = [
+        {"$match": _analytics_match(filters)},
+        {"$group": {"_id": {"$ifNull": ["$cluster_id", "$_id"]}, "doc": {"$first": "$$ROOT"}}},
+        {"$replaceRoot": {"newRoot": "$doc"}},
+    ]
+    if priced:
+        stages.append({"$match": {"price_num": {"$ne": None}}})
+    return stages
+
+def price_stats_mongo(filters: BookFilter = NO_FILTER, dedupe: bool = False) -> Dict[str, Any]:
     """
     Calculate price statistics from MongoDB.
     
+    Args:
+        filters: /books filters applied in $match
+        dedupe: Count each near-duplicate cluster once
+    
     Returns:
         Dict: Price statistics (count, min, max, average)
     """
-    coll = get_collection()
+    coll = get_collection("analytics")
     
     pipeline = [
-        {"$match": {"price_num": {"$ne": None }}}, 
+        *_analytics_stages(filters, priced=True, dedupe=dedupe),
         {
             "$group": {
                 "_id": None,
@@ -264,6 +984,7 @@ def price_stats_mongo() -> Dict[str, Any]:
         },
     ]
 
+    slowlog.capture(coll, {"aggregate": pipeline})
     docs = list(coll.aggregate(pipeline))
     if not docs: 
         return {"count": 0, "min": None, "max": None, "average": None}
@@ -277,15 +998,71 @@ def price_stats_mongo() -> Dict[str, Any]:
         "average": float(g["average"]) if g.get("average") is not None else None,
     }
 
-def availability_mongo() -> Dict[str, Any]:
+def price_quantiles_mongo(qs: List[float], filters: BookFilter = NO_FILTER, dedupe: bool = False) -> Dict[str, Any]:
+    """
+    Exact nearest-rank price quantiles from MongoDB.
+    
+    Args:
+        qs: Quantiles between 0 and 1
+        filters: /books filters
+        dedupe: Count each near-duplicate cluster once
+    
+    Returns:
+        Dict: Count of priced books and one {q, price} entry per quantile
+    """
+    coll = get_collection("analytics")
+    if dedupe:
+        # Clusters need a $group, so ranks are found with aggregations instead of find().skip()
+        stages = _analytics_stages(filters, priced=True, dedupe=True)
+        count_pipeline = [*stages, {"$count": "n"}]
+        slowlog.capture(coll, {"aggregate": count_pipeline})
+        count = next(iter(coll.aggregate(count_pipeline)), {}).get("n", 0)
+    else:
+        query = _analytics_match(filters, priced=True)
+        slowlog.capture(coll, {"count": query})
+        count = coll.count_documents(query)
+    quantiles = []
+    for q in qs:
+        if count == 0:
+            quantiles.append({"q": q, "price": None})
+            continue
+        rank = min(count - 1, max(0, math.ceil(q * count) - 1))
+        if dedupe:
+            pipeline = [*stages, {"$sort": {"price_num": 1}}, {"$skip": rank}, {"$limit": 1}, {"$project": {"price_num": 1}}]
+            slowlog.capture(coll, {"aggregate": pipeline})
+            doc = next(iter(coll.aggregate(pipeline)), None)
+        else:
+            slowlog.capture(coll, {"find": query, "sort": {"price_num": 1}, "skip": rank, "limit": 1})
+            doc = next(iter(coll.find(query, {"price_num": 1}).sort("price_num", 1).skip(rank).limit(1)), None)
+        quantiles.append({"q": q, "price": float(doc["price_num"]) if doc else None})
+    return {"count": count, "quantiles": quantiles}
+
+def distinct_titles_mongo(filters: BookFilter = NO_FILTER, dedupe: bool = False) -> int:
+    """Exact number of distinct lower-cased titles in MongoDB matching filters, optionally one book per cluster."""
+    coll = get_collection("analytics")
+    pipeline = [
+        *_analytics_stages(filters, dedupe=dedupe),
+        {"$group": {"_id": {"$toLower": {"$ifNull": ["$title", ""]}}}},
+        {"$count": "distinct"},
+    ]
+    slowlog.capture(coll, {"aggregate": pipeline})
+    rows = list(coll.aggregate(pipeline))
+    return int(rows[0]["distinct"]) if rows else 0
+
+def availability_mongo(filters: BookFilter = NO_FILTER, dedupe: bool = False) -> Dict[str, Any]:
     """
     Get availability distribution from MongoDB.
     
+    Args:
+        filters: /books filters applied in $match
+        dedupe: Count each near-duplicate cluster once
+    
     Returns:
         Dict: Availability buckets with counts and total
     """
-    coll = get_collection()
+    coll = get_collection("analytics")
     pipeline = [
+        *_analytics_stages(filters, dedupe=dedupe),
         {
             "$group": {
                 "_id": {
@@ -299,19 +1076,21 @@ def availability_mongo() -> Dict[str, Any]:
         {"$sort": {"_id": 1}},  
     ]
 
+    slowlog.capture(coll, {"aggregate": pipeline})
     rows = list(coll.aggregate(pipeline))
     buckets = [{"label": r["_id"], "count": int(r["count"])} for r in rows]
     total = sum(b["count"] for b in buckets)
     return {"total": total, "buckets": buckets}
 
 
-def price_buckets_mongo(bucket_size: float) -> Dict[str, Any]: 
-    """Get price distribution buckets."""
-    coll = get_collection()
+def price_buckets_mongo(bucket_size: float, filters: BookFilter = NO_FILTER, dedupe: bool = False) -> Dict[str, Any]: 
+    """Get price distribution buckets for books matching filters, optionally one book per cluster."""
+    coll = get_collection("analytics")
+    stages = _analytics_stages(filters, priced=True, dedupe=dedupe)
 
     # Get price range statistics
     stats_pipeline = [
-        {"$match" : {"price_num": {"$ne" : None}}},
+        *stages,
         {
             "$group" : {
                 "_id" : None, 
@@ -322,6 +1101,7 @@ def price_buckets_mongo(bucket_size: float) -> Dict[str, Any]:
         }
     ]
 
+    slowlog.capture(coll, {"aggregate": stats_pipeline})
     stats_result = list(coll.aggregate(stats_pipeline))
     if not stats_result or stats_result[0]["count"]== 0: 
         return {"buckets": []}
@@ -333,7 +1113,7 @@ def price_buckets_mongo(bucket_size: float) -> Dict[str, Any]:
     
     # Calculate bucket distribution
     bucket_pipeline = [
-        {"$match": {"price_num": {"$ne": None}}},
+        *stages,
         {
             "$addFields": {
                 "bucket_index": {
@@ -355,6 +1135,7 @@ def price_buckets_mongo(bucket_size: float) -> Dict[str, Any]:
         {"$sort": {"_id": 1}}
     ]
     
+    slowlog.capture(coll, {"aggregate": bucket_pipeline})
     bucket_results = list(coll.aggregate(bucket_pipeline))
     bucket_counts = {int(result["_id"]): result["count"] for result in bucket_results}
     
@@ -375,3 +1156,356 @@ def price_buckets_mongo(bucket_size: float) -> Dict[str, Any]:
 
     
 
+
+def title_words_mongo(top_n: int, filters: BookFilter = NO_FILTER, dedupe: bool = False) -> Dict[str, Any]:
+    """
+    Most common title words among books matching filters, optionally one book per cluster.
+    
+    Only titles are fetched; words are counted as in file mode so both modes
+    split titles the same way.
+    """
+    coll = get_collection("analytics")
+    if dedupe:
+        pipeline = [*_analytics_stages(filters, dedupe=True), {"$project": {"_id": 0, "title": 1}}]
+        slowlog.capture(coll, {"aggregate": pipeline})
+        docs = coll.aggregate(pipeline)
+    else:
+        query = _analytics_match(filters)
+        slowlog.capture(coll, {"find": query, "projection": {"title": 1}})
+        docs = coll.find(query, {"_id": 0, "title": 1})
+    counter: Counter = Counter()
+    for doc in docs:
+        counter.update(title_words(doc.get("title") or ""))
+    return {"top": [{"word": word, "count": count} for word, count in counter.most_common(top_n)]}
+
+# SQLite storage functions
+SQLITE_TABLES = """
+CREATE TABLE books (
+    id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    price REAL,
+    availability TEXT NOT NULL,
+    title_key TEXT NOT NULL,
+    availability_key TEXT NOT NULL,
+    cluster_id TEXT NOT NULL
+);
+CREATE TABLE title_words (
+    book INTEGER NOT NULL,
+    word TEXT NOT NULL
+);
+"""
+
+# Created after the bulk insert, which is much faster than maintaining them row by row
+SQLITE_INDEXES = """
+CREATE INDEX books_id ON books (id);
+CREATE INDEX books_url ON books (url);
+CREATE INDEX books_price ON books (price) WHERE price IS NOT NULL;
+CREATE INDEX books_availability_price ON books (availability_key, price);
+CREATE INDEX books_title ON books (title_key);
+CREATE INDEX title_words_word ON title_words (word);
+CREATE INDEX title_words_book ON title_words (book);
+CREATE INDEX books_cluster ON books (cluster_id);
+ANALYZE;
+"""
+
+# Bumped whenever the tables change, so stores built by older versions are rebuilt
+SQLITE_SCHEMA_VERSION = 2
+
+_SQLITE_ORDER = {
+    None: "rowid",
+    "price_asc": "price, rowid",
+    "price_desc": "price DESC, rowid",
+    "title_asc": "title_key, rowid",
+    "title_desc": "title_key DESC, rowid",
+}
+
+def build_sqlite(books: Sequence[Book], path: Path) -> None:
+    """
+    Write books to a new SQLite file with the indexes the listing and analytics queries use.
+    
+    Rows keep dataset order as their rowid, title words are split once here
+    into their own table, and near-duplicate clusters are assigned. The file is built beside path and moved into place,
+    so open readers never see a half-written database.
+    
+    Args:
+        books: Normalised books, in dataset order
+        path: Database file to create or replace
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript(
+            f"PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF; PRAGMA user_version = {SQLITE_SCHEMA_VERSION};"
+            + SQLITE_TABLES
+        )
+        clusters = cluster_ids((b.id, b.title) for b in books)
+        conn.executemany(
+            "INSERT INTO books (rowid, id, title, url, price, availability, title_key, availability_key, cluster_id)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (row, b.id, b.title, b.url, b.price, b.availability, b.title.lower(), b.availability.strip().lower(), cluster)
+                for row, (b, cluster) in enumerate(zip(books, clusters), 1)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO title_words (book, word) VALUES (?, ?)",
+            ((row, word) for row, b in enumerate(books, 1) for word in title_words(b.title)),
+        )
+        conn.commit()
+        conn.executescript(SQLITE_INDEXES)
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+
+_sqlite_local = threading.local()
+_sqlite_build_lock = threading.Lock()
+
+def _sqlite_schema_version(path: Path) -> int:
+    conn = sqlite3.connect(path.resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+def _ensure_sqlite() -> None:
+    """(Re)build SQLITE_PATH from the JSON feed when it is missing, older than the feed or from an older schema."""
+    with _sqlite_build_lock:
+        if SQLITE_PATH.exists() and _sqlite_schema_version(SQLITE_PATH) == SQLITE_SCHEMA_VERSION and (
+            not DATA_PATH.exists() or SQLITE_PATH.stat().st_mtime >= DATA_PATH.stat().st_mtime
+        ):
+            return
+        logger.info("Building SQLite store %s from %s", SQLITE_PATH, DATA_PATH)
+        build_sqlite(_load_from_file(), SQLITE_PATH)
+
+def get_sqlite() -> sqlite3.Connection:
+    """
+    Read-only connection to the SQLite store for the calling thread.
+    
+    A new connection is opened whenever the dataset version or SQLITE_PATH
+    changes, and the store is rebuilt first if the feed is newer.
+    
+    Returns:
+        sqlite3.Connection: Connection owned by the current thread
+        
+    Raises:
+        DataLoadError: If the store cannot be built or opened
+    """
+    key = (dataset_version(), SQLITE_PATH)
+    cached = getattr(_sqlite_local, "conn", None)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    try:
+        _ensure_sqlite()
+        conn = sqlite3.connect(SQLITE_PATH.resolve().as_uri() + "?mode=ro", uri=True)
+    except (OSError, sqlite3.Error) as e:
+        raise DataLoadError(f"Could not open SQLite store {SQLITE_PATH}: {e}") from e
+    if cached is not None:
+        cached[1].close()
+    _sqlite_local.conn = (key, conn)
+    _sqlite_local.shares = None
+    return conn
+
+def _availability_share(conn: sqlite3.Connection, label: str) -> float:
+    """Fraction of books with an availability label, counted once per connection."""
+    shares = _sqlite_local.shares
+    if shares is None:
+        counts = dict(conn.execute("SELECT availability_key, COUNT(*) FROM books GROUP BY availability_key"))
+        total = sum(counts.values()) or 1
+        shares = _sqlite_local.shares = {k: n / total for k, n in counts.items()}
+    return shares.get(label, 0.0)
+
+def _sqlite_where(filters: BookFilter, priced: bool = False, dedupe: bool = False) -> Tuple[str, list]:
+    """
+    The /books filters as a WHERE clause and its parameters.
+    
+    Matches filter_books: title substring and exact availability compared on
+    lower-cased columns, and an inclusive price range that excludes unpriced books.
+    With dedupe, only the first matching row of each near-duplicate cluster is
+    kept, as dedupe_books does.
+    """
+    clauses, params = [], []
+    if filters.q:
+        clauses.append("instr(title_key, ?) > 0")
+        params.append(filters.q.lower())
+    if filters.availability:
+        label = filters.availability.strip().lower()
+        # Without the label's real share the planner assumes every label is rare and
+        # probes the index row by row even for "in stock", which most books share
+        share = _availability_share(get_sqlite(), label)
+        clauses.append(f"likelihood(availability_key = ?, {share:.4f})")
+        params.append(label)
+    if filters.price_min is not None:
+        clauses.append("price >= ?")
+        params.append(filters.price_min)
+    if filters.price_max is not None:
+        clauses.append("price <= ?")
+        params.append(filters.price_max)
+    if dedupe:
+        where, inner = _sqlite_where(filters)
+        clauses.append(f"books.rowid IN (SELECT MIN(rowid) FROM books {where} GROUP BY cluster_id)")
+        params.extend(inner)
+    if priced:
+        clauses.append("price IS NOT NULL")
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+def _book_rows(rows) -> List[Book]:
+    intern = sys.intern
+    return [Book(id=r[0], title=r[1], url=r[2], price=r[3], availability=intern(r[4])) for r in rows]
+
+def load_books_sqlite() -> List[Book]:
+    """Every book in the SQLite store, in dataset order."""
+    rows = get_sqlite().execute("SELECT id, title, url, price, availability FROM books ORDER BY rowid")
+    return _book_rows(rows)
+
+def list_books_sqlite(
+        q: Optional[str],
+        price_min: Optional[float],
+        price_max: Optional[float],
+        availability: Optional[str],
+        limit: int,
+        offset: int,
+        sort: Optional[str],
+) -> Tuple[int, list]:
+    """
+    List books from SQLite with filtering, sorting, and pagination.
+    
+    Ties keep dataset order, and price sorts skip unpriced books as
+    list_books_mongo does.
+    
+    Returns:
+        tuple: (total_count, book_list)
+    """
+    conn = get_sqlite()
+    filters = BookFilter.normalise(q, availability, price_min, price_max)
+    where, params = _sqlite_where(filters, priced=sort in ("price_asc", "price_desc"))
+    total = conn.execute(f"SELECT COUNT(*) FROM books {where}", params).fetchone()[0]
+    rows = conn.execute(
+        f"SELECT id, title, url, price, availability FROM books {where}"
+        f" ORDER BY {_SQLITE_ORDER.get(sort, 'rowid')} LIMIT ? OFFSET ?",
+        [*params, limit, offset],
+    )
+    return total, _book_rows(rows)
+
+def list_books_faceted_sqlite(
+        q: Optional[str],
+        price_min: Optional[float],
+        price_max: Optional[float],
+        availability: Optional[str],
+        limit: int,
+        offset: int,
+        sort: Optional[str],
+        facets: Sequence[str],
+        bucket_size: float,
+) -> Tuple[int, list, Dict[str, list]]:
+    """
+    list_books_sqlite plus facet counts over the filtered books, one GROUP BY per facet.
+    
+    Returns:
+        tuple: (total_count, book_list, facets) with facets shaped as book_facets()
+    """
+    total, items = list_books_sqlite(q, price_min, price_max, availability, limit, offset, sort)
+    conn = get_sqlite()
+    filters = BookFilter.normalise(q, availability, price_min, price_max)
+    out: Dict[str, list] = {}
+    if "availability" in facets:
+        where, params = _sqlite_where(filters)
+        rows = conn.execute(
+            f"SELECT COALESCE(NULLIF(availability_key, ''), 'unknown') AS label, COUNT(*) FROM books {where}"
+            " GROUP BY label ORDER BY label",
+            params,
+        )
+        out["availability"] = [{"label": label, "count": count} for label, count in rows]
+    if "price" in facets:
+        where, params = _sqlite_where(filters, priced=True)
+        # CAST truncates toward zero; step negative non-integer quotients ("-£5" parses) down one to floor them
+        rows = conn.execute(
+            "SELECT CAST(x AS INTEGER) - (x < CAST(x AS INTEGER)) AS i, COUNT(*)"
+            f" FROM (SELECT price / ? AS x FROM books {where}) GROUP BY i ORDER BY i",
+            [bucket_size, *params],
+        )
+        out["price"] = [
+            {"lower": i * bucket_size, "upper": (i + 1) * bucket_size, "count": count} for i, count in rows
+        ]
+    return total, items, out
+
+def price_stats_sqlite(filters: BookFilter = NO_FILTER, dedupe: bool = False) -> Dict[str, Any]:
+    """
+    Calculate price statistics in SQLite.
+    
+    Args:
+        filters: /books filters applied in WHERE
+        dedupe: Count each near-duplicate cluster once
+    
+    Returns:
+        Dict: Price statistics (count, min, max, average)
+    """
+    where, params = _sqlite_where(filters, priced=True, dedupe=dedupe)
+    count, low, high, average = get_sqlite().execute(
+        f"SELECT COUNT(*), MIN(price), MAX(price), AVG(price) FROM books {where}", params
+    ).fetchone()
+    return {"count": count, "min": low, "max": high, "average": average}
+
+def availability_sqlite(filters: BookFilter = NO_FILTER, dedupe: bool = False) -> Dict[str, Any]:
+    """
+    Get availability distribution from SQLite.
+    
+    Args:
+        filters: /books filters applied in WHERE
+        dedupe: Count each near-duplicate cluster once
+    
+    Returns:
+        Dict: Availability buckets with counts and total
+    """
+    where, params = _sqlite_where(filters, dedupe=dedupe)
+    rows = get_sqlite().execute(
+        f"SELECT COALESCE(NULLIF(availability_key, ''), 'unknown') AS label, COUNT(*) FROM books {where}"
+        " GROUP BY label ORDER BY label",
+        params,
+    )
+    buckets = [{"label": label, "count": count} for label, count in rows]
+    return {"total": sum(b["count"] for b in buckets), "buckets": buckets}
+
+def price_buckets_sqlite(bucket_size: float, filters: BookFilter = NO_FILTER, dedupe: bool = False) -> Dict[str, Any]:
+    """Get price distribution buckets for books matching filters, starting at the lowest price."""
+    conn = get_sqlite()
+    where, params = _sqlite_where(filters, priced=True, dedupe=dedupe)
+    min_price, max_price = conn.execute(f"SELECT MIN(price), MAX(price) FROM books {where}", params).fetchone()
+    if min_price is None:
+        return {"buckets": []}
+
+    rows = conn.execute(
+        f"SELECT CAST((price - ?) / ? AS INTEGER) AS i, COUNT(*) FROM books {where} GROUP BY i",
+        [min_price, bucket_size, *params],
+    )
+    counts = dict(rows)
+    buckets = []
+    for i in range(int((max_price - min_price) / bucket_size) + 1):
+        lower = min_price + i * bucket_size
+        buckets.append({"lower": lower, "upper": lower + bucket_size, "count": counts.get(i, 0)})
+    return {"buckets": buckets}
+
+def title_words_sqlite(top_n: int, filters: BookFilter = NO_FILTER, dedupe: bool = False) -> Dict[str, Any]:
+    """
+    Most common title words among books matching filters, from the title_words table.
+    
+    Ties go to the word seen first in dataset order, as Counter.most_common
+    does in file mode.
+    """
+    conn = get_sqlite()
+    if filters.empty and not dedupe:
+        rows = conn.execute(
+            "SELECT word, COUNT(*) AS n FROM title_words GROUP BY word ORDER BY n DESC, MIN(rowid) LIMIT ?",
+            [top_n],
+        )
+    else:
+        where, params = _sqlite_where(filters, dedupe=dedupe)
+        rows = conn.execute(
+            f"SELECT w.word, COUNT(*) AS n FROM books JOIN title_words w ON w.book = books.rowid {where}"
+            " GROUP BY w.word ORDER BY n DESC, MIN(w.rowid) LIMIT ?",
+            [*params, top_n],
+        )
+    return {"top": [{"word": word, "count": count} for word, count in rows]}
@@ -0,0 +1,190 @@
+"""
+Near-duplicate book detection with MinHash and LSH.
+
+Titles are normalised (lower-cased, punctuation dropped, whitespace
+collapsed) and split into character trigrams. A MinHash signature of
+NUM_PERM values, one minimum per hash function, estimates the Jaccard
+similarity of two trigram sets as the fraction of positions where the
+signatures agree.
+
+The signature is cut into BANDS bands of ROWS values, and each band is hashed
+into a table. Titles that agree on any band are near-duplicate candidates:
+with 16 bands of 4 rows, a pair at similarity 0.8 shares a band with
+probability 0.9998 and a pair at 0.3 with probability 0.12. A new title is
+therefore compared only with the few cluster leaders in its own band
+buckets, never with every title seen so far.
+
+Each cluster is named after the first book added to it (its leader), and only
+leaders are indexed. A book joins a cluster when its estimated similarity to
+the leader reaches the threshold, so clusters cannot drift through chains of
+small edits. Memory is about 1 KB per cluster: its signature plus one table
+entry per band. Titles that normalise to the same text skip hashing.
+"""
+import hashlib
+import re
+from array import array
+from operator import eq
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from api import config
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalise_title(title: Optional[str]) -> str:
+    """Lower-cased title words separated by single spaces, without punctuation."""
+    return " ".join(_NON_WORD.sub(" ", (title or "").lower()).split())
+
+
+def shingles(text: str) -> List[str]:
+    """Distinct character trigrams of a normalised title, padded with spaces."""
+    padded = f" {text} "
+    return list({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+class MinHasher:
+    """
+    MinHash signatures of num_perm unsigned 32-bit values.
+
+    Each trigram is hashed once with SHAKE-128 into num_perm values, one per
+    permutation, and cached: a catalogue only has a few thousand distinct
+    trigrams. A signature is then the position-wise minimum over its
+    trigrams, computed without a Python-level loop per permutation.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        self.num_perm = num_perm
+        self._salt = seed.to_bytes(8, "little")
+        self._grams: Dict[str, array] = {}
+
+    def _hashes(self, gram: str) -> array:
+        hashes = self._grams.get(gram)
+        if hashes is None:
+            digest = hashlib.shake_128(self._salt + gram.encode("utf-8")).digest(4 * self.num_perm)
+            hashes = self._grams[gram] = array("I", digest)
+        return hashes
+
+    def signature(self, text: str) -> array:
+        """Signature of a normalised title."""
+        return array("I", map(min, zip(*map(self._hashes, shingles(text)))))
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of the trigram sets behind two signatures."""
+    return sum(map(eq, a, b)) / len(a)
+
+
+class NearDuplicateIndex:
+    """Assigns cluster ids to books as they are ingested, in sub-linear time per book."""
+
+    def __init__(self, threshold: Optional[float] = None, bands: int = BANDS, rows: int = ROWS, seed: int = 1):
+        """
+        Args:
+            threshold: Estimated title similarity at which a book joins a cluster (default DEDUP_THRESHOLD)
+            bands: Number of LSH bands
+            rows: Signature values per band
+            seed: Seed of the MinHash permutations; indexes only agree when built with the same seed
+        """
+        self.threshold = config.DEDUP_THRESHOLD if threshold is None else threshold
+        self.bands = bands
+        self.rows = rows
+        self._hasher = MinHasher(bands * rows, seed)
+        self._tables: List[Dict[int, int]] = [{} for _ in range(bands)]
+        self._signatures = array("I")
+        self._clusters: List[Hashable] = []
+        self._exact: Dict[str, Hashable] = {}
+
+    def __len__(self) -> int:
+        """Number of clusters."""
+        return len(self._clusters)
+
+    def _band_keys(self, sig: array) -> List[int]:
+        r = self.rows
+        return [hash(tuple(sig[i * r:(i + 1) * r])) for i in range(self.bands)]
+
+    def _leader(self, i: int) -> array:
+        n = self._hasher.num_perm
+        return self._signatures[i * n:(i + 1) * n]
+
+    def add(self, key: Hashable, title: Optional[str]) -> Hashable:
+        """
+        Assign a book to the cluster of its closest near-duplicate, or start a new one.
+
+        Args:
+            key: Book id, used as the cluster id when the book starts a cluster
+            title: Raw title
+
+        Returns:
+            The book's cluster id
+        """
+        text = normalise_title(title)
+        if not text:
+            # Nothing to compare; an untitled book is its own cluster
+            return key
+        cluster = self._exact.get(text)
+        if cluster is not None:
+            return cluster
+
+        sig = self._hasher.signature(text)
+        keys = self._band_keys(sig)
+        best, best_score = None, self.threshold
+        checked = set()
+        for table, band in zip(self._tables, keys):
+            leader = table.get(band)
+            if leader is None or leader in checked:
+                continue
+            checked.add(leader)
+            score = similarity(sig, self._leader(leader))
+            if score >= best_score:
+                best, best_score = leader, score
+
+        if best is not None:
+            cluster = self._clusters[best]
+        else:
+            self._add_leader(key, sig, keys)
+            cluster = key
+        self._exact[text] = cluster
+        return cluster
+
+    def seed(self, cluster: Hashable, title: Optional[str]) -> None:
+        """
+        Register the first book of a cluster assigned earlier, e.g. in a previous crawl,
+        so that later near-duplicates join it instead of starting a new cluster.
+
+        Args:
+            cluster: The stored cluster id, i.e. the key of the cluster's first book
+            title: That book's raw title
+        """
+        text = normalise_title(title)
+        if not text or text in self._exact:
+            return
+        sig = self._hasher.signature(text)
+        self._add_leader(cluster, sig, self._band_keys(sig))
+        self._exact[text] = cluster
+
+    def _add_leader(self, cluster: Hashable, sig: array, keys: List[int]) -> None:
+        leader = len(self._clusters)
+        self._clusters.append(cluster)
+        self._signatures.extend(sig)
+        for table, band in zip(self._tables, keys):
+            # The first leader in a bucket keeps it, bounding the candidates per lookup to one per band
+            table.setdefault(band, leader)
+
+
+def cluster_ids(books: Iterable[Tuple[Hashable, Optional[str]]], threshold: Optional[float] = None) -> List[Hashable]:
+    """
+    Cluster ids for (key, title) pairs, in order.
+
+    Args:
+        books: Book keys and titles, in ingest order
+        threshold: As for NearDuplicateIndex
+
+    Returns:
+        One cluster id per book; a cluster is named after its first book
+    """
+    index = NearDuplicateIndex(threshold)
+    return [index.add(key, title) for key, title in books]
@@ -0,0 +1,124 @@
+"""
+Streaming encoders for bulk book export.
+
+Each encoder turns an iterator of Book batches into an iterator of byte
+chunks, one chunk per batch, so a StreamingResponse can send any number of
+books in constant memory. Parquet and Arrow need the optional pyarrow
+package.
+"""
+import csv
+import io
+import json
+from typing import Callable, Dict, Iterable, Iterator, List
+
+from api import arrow
+from api.models import Book
+
+FIELDS = ("id", "title", "url", "price", "availability")
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": arrow.MEDIA_TYPE,
+}
+
+
+class ExportUnavailable(RuntimeError):
+    """Raised when an export format needs an optional dependency that is missing."""
+    pass
+
+
+def encode_ndjson(batches: Iterable[List[Book]]) -> Iterator[bytes]:
+    dumps = json.dumps
+    for batch in batches:
+        yield "".join(
+            dumps({"id": b.id, "title": b.title, "url": b.url, "price": b.price, "availability": b.availability},
+                  ensure_ascii=False) + "\n"
+            for b in batch
+        ).encode("utf-8")
+
+
+def encode_csv(batches: Iterable[List[Book]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    for batch in batches:
+        writer.writerows((b.id, b.title, b.url, "" if b.price is None else b.price, b.availability) for b in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to the generator."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ExportUnavailable("Parquet and Arrow exports require the pyarrow package") from e
+    return pyarrow, pyarrow.parquet
+
+
+def encode_parquet(batches: Iterable[List[Book]]) -> Iterator[bytes]:
+    """One Parquet row group per batch; the footer arrives with the last chunk."""
+    pa, pq = _require_pyarrow()
+    schema = arrow.book_schema()
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in batches:
+            writer.write_batch(arrow.book_batch(batch, schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def encode_arrow(batches: Iterable[List[Book]]) -> Iterator[bytes]:
+    """Arrow IPC stream with one record batch per batch, e.g. per Mongo cursor batch."""
+    pa, _ = _require_pyarrow()
+    schema = arrow.book_schema()
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield sink.drain()
+        for batch in batches:
+            writer.write_batch(arrow.book_batch(batch, schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+ENCODERS: Dict[str, Callable[[Iterable[List[Book]]], Iterator[bytes]]] = {
+    "ndjson": encode_ndjson,
+    "csv": encode_csv,
+    "parquet": encode_parquet,
+    "arrow": encode_arrow,
+}
+
+
+def check_available(fmt: str) -> None:
+    """Raise ExportUnavailable up front, before a response has started."""
+    if fmt in ("parquet", "arrow"):
+        _require_pyarrow()
@@ -0,0 +1,151 @@
+"""
+Typo-tolerant title search with a trigram index.
+
+Titles are lower-cased and padded with spaces, and every trigram maps to the
+sorted rows containing it. A query allowed k typos must share at least
+len(grams) - 3k trigrams with any title it matches (each edit breaks at most
+three trigrams). So a candidate has to appear in at least one of the rarest
+len(grams) - threshold + 1 posting lists. Only those lists are scanned, the
+remaining grams are checked by bisecting their sorted postings, and the
+best-overlapping candidates are then verified with a bounded edit distance to
+the closest substring of the title.
+"""
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+# Verify at most this many candidates with the edit distance
+MAX_CANDIDATES = 2000
+
+
+def _normalise(text: str) -> str:
+    return " " + " ".join(text.lower().split()) + " "
+
+
+def _grams(padded: str) -> List[str]:
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def max_edits(query: str) -> int:
+    """Typos tolerated for a query: none below 3 characters, 1 below 5, then 2."""
+    n = len(query.strip())
+    if n < 3:
+        return 0
+    return 1 if n < 5 else 2
+
+
+def substring_distance(pattern: str, text: str, limit: int) -> Optional[int]:
+    """
+    Edit distance from pattern to its closest substring of text, or None if
+    that is more than limit.
+
+    Uses Myers' bit-parallel algorithm: one column of the Sellers dynamic
+    programme per text character, held in two integers.
+    """
+    m = len(pattern)
+    if m == 0:
+        return 0
+    peq: Dict[str, int] = {}
+    for i, c in enumerate(pattern):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    full = (1 << m) - 1
+    top = 1 << (m - 1)
+    pv, mv, score = full, 0, m
+    best = m
+    for c in text:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & full
+        mh = pv & xh
+        if ph & top:
+            score += 1
+        elif mh & top:
+            score -= 1
+            if score < best:
+                best = score
+                if best == 0:
+                    break
+        ph = (ph << 1) & full
+        mh = (mh << 1) & full
+        pv = (mh | ~(xv | ph)) & full
+        mv = ph & xv
+    return best if best <= limit else None
+
+
+class TrigramIndex:
+    """
+    Trigram postings over a list of titles.
+
+    Identical normalised titles share one entry, so each distinct title is
+    verified once; search results are positions in the original list.
+    """
+
+    def __init__(self, titles: Iterable[str]):
+        entry_of: Dict[str, int] = {}
+        self.titles: List[str] = []
+        self.rows: List[List[int]] = []
+        for row, title in enumerate(titles):
+            key = _normalise(title or "")
+            entry = entry_of.get(key)
+            if entry is None:
+                entry = entry_of[key] = len(self.titles)
+                self.titles.append(key)
+                self.rows.append([])
+            self.rows[entry].append(row)
+
+        postings: Dict[str, List[int]] = {}
+        for entry, title in enumerate(self.titles):
+            for gram in set(_grams(title)):
+                postings.setdefault(gram, []).append(entry)
+        self.postings: Dict[str, array] = {g: array("I", entries) for g, entries in postings.items()}
+
+    @classmethod
+    def from_books(cls, books) -> "TrigramIndex":
+        return cls(b.title for b in books)
+
+    def search(self, query: str) -> List[int]:
+        """
+        Rows whose title contains query within max_edits(query) typos.
+
+        Args:
+            query: Search text
+
+        Returns:
+            Rows, best first: fewest edits, then most shared trigrams, then
+            shortest title. At most MAX_CANDIDATES distinct titles are verified.
+        """
+        text = " ".join(query.lower().split())
+        if not text:
+            return []
+        k = max_edits(text)
+        # Anchor the query at a word start, as users type word beginnings
+        grams = list(dict.fromkeys(_grams(" " + text)))
+        empty = array("I")
+        lists = sorted((self.postings.get(g, empty) for g in grams), key=len)
+        threshold = max(1, len(grams) - 3 * k)
+
+        # Pigeonhole: a match appears in one of the rarest len - threshold + 1 lists
+        shared: Counter = Counter()
+        probe = len(lists) - threshold + 1
+        for entries in lists[:probe]:
+            shared.update(entries)
+        for entries in lists[probe:]:
+            n = len(entries)
+            for entry in shared:
+                i = bisect_left(entries, entry)
+                if i < n and entries[i] == entry:
+                    shared[entry] += 1
+
+        titles = self.titles
+        candidates = [(-count, entry) for entry, count in shared.items() if count >= threshold]
+        candidates = sorted((c, len(titles[entry]), entry) for c, entry in candidates)
+        ranked = []
+        for negative_count, length, entry in candidates[:MAX_CANDIDATES]:
+            title = titles[entry]
+            distance = 0 if text in title else substring_distance(text, title, k)
+            if distance is not None:
+                ranked.append((distance, negative_count, length, entry))
+        ranked.sort()
+        return [row for _, _, _, entry in ranked for row in self.rows[entry]]
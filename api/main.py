@@ -1,30 +1,98 @@
 # Standard Imports
 import logging
-import string
+import math
 from collections import Counter
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import List, Optional
 
 # Third Party Imports
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Header, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
 # Local Imports 
+from api import arrow, config, export, metrics, profiling, slowlog
+from api.cache import ResultCache
+from api.compression import CompressionMiddleware, Payload, PayloadResponse
+from api.refresh import PrecomputedStore
 from api.db import(
     load_books, DataLoadError, list_books_mongo, USE_MONGO, 
-    price_stats_mongo, availability_mongo, price_buckets_mongo
+    price_stats_mongo, availability_mongo, price_buckets_mongo, dataset_cache_info,
+    filter_books, sort_books, iter_books_mongo, EXPORT_BATCH_SIZE,
+    lookup_books, lookup_books_mongo, dataset_index, build_sketches, sketches_mongo,
+    price_quantiles_mongo, distinct_titles_mongo, title_words_mongo, dataset_version, FACETS,
+    suggest_index_mongo, book_facets, list_books_faceted_mongo, fuzzy_books, fuzzy_books_mongo,
+    warm_up_mongo, trigram_index_mongo, book_clusters, dedupe_books, book_column, get_sqlite, USE_SQLITE, list_books_sqlite, list_books_faceted_sqlite, price_stats_sqlite, availability_sqlite,
+    price_buckets_sqlite, title_words_sqlite,
 )
-from api.models import BookOut, BooksResponse, AvailabilityResponse, PriceStats, PriceBucketsResponse, WordsResponse
+from api.models import (
+    BookFilter, NO_FILTER,
+    BookOut, BooksResponse, AvailabilityResponse, PriceStats, PriceBucketsResponse, WordsResponse,
+    BatchLookupRequest, BatchLookupResponse, SlowQueryLogResponse, ProfileLogResponse,
+    PriceQuantilesResponse, DistinctTitlesResponse, SuggestResponse,
+)
+from api.fuzzy import TrigramIndex
+from api.startup import Warmup
+from api.suggest import SuggestIndex
+from api.utils import title_words
 
 """
 Book Analytics Pipeline API
 
 REST API for analyzing book data from web scraping.
-Built with FastAPI and supports MongoDB or JSON file storage.
+Built with FastAPI and supports MongoDB, SQLite or JSON file storage.
 """
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _warmup_stages():
+    """Startup stages for the configured backend; /ready turns green after the last one."""
+    def connect():
+        if USE_MONGO:
+            warm_up_mongo()
+        elif USE_SQLITE:
+            get_sqlite()
+
+    def load():
+        if not USE_MONGO:
+            load_books()
+
+    def indexes():
+        _sketches()
+        if USE_MONGO:
+            suggest_index_mongo()
+            trigram_index_mongo()
+            return
+        items = load_books()
+        dataset_index(items, "suggest", SuggestIndex.from_books)
+        dataset_index(items, "trigrams", TrigramIndex.from_books)
+
+    def caches():
+        # What the dashboard asks for on first load
+        get_books(q=None, price_min=None, price_max=None, availability=None, limit=10, offset=0, sort=None,
+                  facets="availability", facet_bucket_size=10.0, match="substring", accept=None)
+        get_availability(NO_FILTER, approx=False, dedupe=False)
+        get_price_stats(NO_FILTER, approx=False, dedupe=False)
+        for bucket_size in config.ANALYTICS_PRECOMPUTED_BUCKET_SIZES:
+            get_price_buckets(bucket_size, NO_FILTER, approx=False, dedupe=False, accept=None)
+        get_title_words(10, NO_FILTER, approx=False, dedupe=False)
+
+    return [("connect", connect), ("load", load), ("indexes", indexes), ("caches", caches)]
+
+warmup = Warmup(_warmup_stages, config.WARMUP_RETRY_S)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up and keep precomputed analytics fresh in the background; /health answers at once, /ready once warm."""
+    warmup.start()
+    precomputed.start()
+    yield
+    await run_in_threadpool(warmup.stop)
+    await run_in_threadpool(precomputed.stop)
+
 app = FastAPI(
     title="Book Analytics Pipeline API",
     description=(
@@ -33,14 +101,138 @@ app = FastAPI(
         "(availability counts, price stats/buckets, and frequent title words)."
     ),
     version="3.2.0",
+    lifespan=lifespan,
 )
 
+app.add_middleware(CompressionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://localhost:5173"],
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(slowlog.SlowQueryMiddleware)
+app.add_middleware(profiling.ProfilingMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+
+@metrics.REGISTRY.on_collect
+def _collect_dataset_cache():
+    info = dataset_cache_info()
+    metrics.CACHE_REQUESTS.set_total("dataset", "hit", value=info.hits)
+    metrics.CACHE_REQUESTS.set_total("dataset", "miss", value=info.misses)
+
+def _sketches():
+    """Sketches for the dataset currently served."""
+    if USE_MONGO:
+        return sketches_mongo()
+    return dataset_index(load_books(), "sketches", build_sketches)
+
+APPROX_QUERY = Query(
+    False,
+    description="Answer from ingest-time sketches in constant time instead of scanning; ignored when a filter is set",
+)
+
+DEDUPE_QUERY = Query(
+    False,
+    description="Count each cluster of near-duplicate books (similar titles, see `cluster_id`) once",
+)
+
+def book_filter(
+    q: Optional[str] = Query(None, max_length=100),
+    availability: Optional[str] = Query(None, max_length=50),
+    price_min: Optional[float] = Query(None, ge=0),
+    price_max: Optional[float] = Query(None, ge=0),
+) -> BookFilter:
+    """The /books filters, accepted by every analytics endpoint."""
+    return BookFilter.normalise(q, availability, price_min, price_max)
+
+def _filtered_books(filters: BookFilter, dedupe: bool = False):
+    """File mode: the loaded books matching filters, in one pass, optionally one per near-duplicate cluster."""
+    items = load_books()
+    matched = filter_books(items, filters.q, filters.availability, filters.price_min, filters.price_max)
+    if dedupe:
+        matched = dedupe_books(matched, dataset_index(items, "clusters", book_clusters))
+    return matched
+
+analytics_cache = ResultCache("analytics", config.ANALYTICS_CACHE_SIZE, config.ANALYTICS_CACHE_TTL_S)
+
+precomputed = PrecomputedStore(
+    "precomputed",
+    dataset_version,
+    config.ANALYTICS_REFRESH_S,
+    config.ANALYTICS_REFRESH_POLL_S,
+    config.ANALYTICS_PRECOMPUTED_MAX_KEYS,
+    config.WARMUP_RETRY_S,
+)
+
+def _payload(model, result, to_arrow=None) -> Payload:
+    """
+    Serialise a result once; compressed variants are added as clients ask for them, so cache hits send stored bytes.
+
+    The body is model's JSON, or the Arrow stream to_arrow encodes when one is given.
+    """
+    with profiling.phase("serialise"):
+        if to_arrow is not None:
+            return Payload(to_arrow(result), arrow.MEDIA_TYPE)
+        return Payload(model.model_validate(result).model_dump_json().encode("utf-8"), "application/json")
+
+def _computed(compute, model, to_arrow=None) -> Payload:
+    """Answer a cache miss, timing the query and its serialisation as separate phases."""
+    with profiling.phase("db"):
+        result = compute()
+    return _payload(model, result, to_arrow)
+
+# Responses whose format depends on the Accept header
+VARY_ACCEPT = {"Vary": "Accept"}
+
+def _negotiate(accept: Optional[str], to_arrow):
+    """to_arrow if the client prefers an Arrow stream to JSON, else None."""
+    try:
+        return to_arrow if arrow.negotiate(accept) == "arrow" else None
+    except arrow.ArrowUnavailable as e:
+        raise HTTPException(status_code=406, detail=str(e))
+
+def _cached(endpoint: str, filters: BookFilter, params: tuple, compute, model, to_arrow=None, headers=None) -> PayloadResponse:
+    """
+    Analytics results keyed by endpoint, normalised filter and parameters, per dataset version.
+
+    Unfiltered results are precomputed: after the first request the refresh
+    worker keeps them up to date and requests read the stored result. With
+    to_arrow, results are sent as Arrow streams and cached apart from JSON.
+    """
+    key = (USE_MONGO, endpoint if to_arrow is None else f"{endpoint}.arrow", filters, params)
+    if filters.empty:
+        payload = precomputed.get(key)
+        if payload is not None:
+            return PayloadResponse(payload, headers=headers)
+    version = dataset_version()
+    payload = analytics_cache.get_or_compute(key, lambda: _computed(compute, model, to_arrow), version=version)
+    if filters.empty:
+        precomputed.put(key, lambda: _computed(compute, model, to_arrow), payload, version)
+    return PayloadResponse(payload, headers=headers)
+
+books_cache = ResultCache(
+    "books",
+    config.BOOKS_CACHE_SIZE,
+    config.BOOKS_CACHE_TTL_S,
+    max_bytes=int(config.BOOKS_CACHE_MAX_MB * 1024 * 1024),
+    weigh=lambda payload: payload.size,
+)
+
+export_cache = ResultCache(
+    "export",
+    config.EXPORT_CACHE_SIZE,
+    config.EXPORT_CACHE_TTL_S,
+    max_bytes=int(config.EXPORT_CACHE_MAX_MB * 1024 * 1024),
+    weigh=lambda payload: payload.size,
+)
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Allow admin endpoints only when ADMIN_TOKEN is set and presented."""
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if x_admin_token != config.ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
 
 @app.get("/")
 def root():
@@ -60,6 +252,35 @@ def health():
     """
     return {"status": "ok"}
 
+@app.get(
+    "/ready",
+    tags=["System"],
+    summary="Readiness check",
+    description=(
+        "503 until the startup warm-up - connecting, loading the dataset, building indexes and priming "
+        "the result caches - has finished, then 200. Reports how long each stage took."
+    ),
+)
+def ready():
+    """Readiness check for load balancers and deploys.
+
+    Returns:
+        Warm-up status: ready flag, per-stage durations, pending stages and the last error.
+    """
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get(
+    "/metrics",
+    tags=["System"],
+    summary="Prometheus metrics",
+    description="Request latency, MongoDB command and cache metrics in Prometheus text format.",
+    response_class=PlainTextResponse,
+)
+def get_metrics():
+    """Expose collected metrics for Prometheus scraping."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get(
     "/books",
     response_model=BooksResponse,
@@ -67,7 +288,8 @@ def health():
     summary="List books",
     description=(
         "Search and filter books. Supports text search on title, numeric price filters, "
-        "availability match, sorting, and pagination. Returns a `total` and a page of `items`."
+        "availability match, sorting, and pagination. Returns a `total` and a page of `items`, "
+        "plus availability and price-range counts over the filtered books when `facets` is set."
     ),
 )
 def get_books(
@@ -78,6 +300,10 @@ def get_books(
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
     sort: Optional[str] = Query(None, pattern="^(price_asc|price_desc|title_asc|title_desc)$"),
+    facets: Optional[str] = Query(None, pattern="^(availability|price)(,(availability|price))*$"),
+    facet_bucket_size: float = Query(10.0, gt=0),
+    match: str = Query("substring", pattern="^(substring|fuzzy)$"),
+    accept: Optional[str] = Header(None),
 ):
     """Get books with optional search and filtering.
 
@@ -88,56 +314,54 @@ def get_books(
         - limit: Number of books per page (1–100)  
         - offset: Number of books to skip (for pagination)  
         - sort: Sort order - price_asc, price_desc, title_asc or title_desc  
+        - facets: Comma-separated facets to count over the filtered books (availability, price)  
+        - facet_bucket_size: Width of each price facet range  
+        - match: How q matches titles - substring, or fuzzy to tolerate typos and rank by relevance  
+        - accept: `application/vnd.apache.arrow.stream` for an Arrow stream instead of JSON  
 
     Returns:
-        Dictionary with total count and list of matching books.
+        Dictionary with total count, list of matching books and the requested facet counts;
+        as an Arrow stream, the books are the rows and total and facets are schema metadata.
     """
-    try:
-        if USE_MONGO: 
-            total, items = list_books_mongo(
-                q=q,
-                price_min=price_min,
-                price_max=price_max,
-                availability=availability,
+    wanted = [f for f in FACETS if f in facets.split(",")] if facets else []
+    filters = BookFilter.normalise(q, availability, price_min, price_max)
+
+    def compute():
+        if match == "fuzzy" and filters.q:
+            # Relevance order unless an explicit sort is asked for
+            if USE_MONGO:
+                items = fuzzy_books_mongo(filters.q, filters.availability, filters.price_min, filters.price_max)
+            else:
+                items = fuzzy_books(load_books(), filters.q, filters.availability, filters.price_min, filters.price_max)
+            counts = book_facets(items, wanted, facet_bucket_size) if wanted else None
+            total = len(items)
+            if sort:
+                items = sort_books(items, sort)
+            return {"total": total,
+                    "items": items[offset: offset + limit],
+                    "facets": counts}
+        if USE_SQLITE or USE_MONGO:
+            query = dict(
+                q=filters.q,
+                price_min=filters.price_min,
+                price_max=filters.price_max,
+                availability=filters.availability,
                 limit=limit,
                 offset=offset,
                 sort=sort,
             )
-            return {"total": total, "items": [BookOut(**it) for it in items]}
+            if wanted:
+                faceted = list_books_faceted_sqlite if USE_SQLITE else list_books_faceted_mongo
+                total, items, counts = faceted(**query, facets=wanted, bucket_size=facet_bucket_size)
+            else:
+                listing = list_books_sqlite if USE_SQLITE else list_books_mongo
+                (total, items), counts = listing(**query), None
+            return {"total": total, "items": items, "facets": counts}
         
-        items = load_books()
-        if q: 
-            q_l = q.lower()
-            items = [item for item in items if q_l in item.get("title", "").lower()]
-
-        # Availability Filter
-        if availability:
-            wanted = availability.strip().lower()
-            items = [item for item in items if (item.get("availability") or "").strip().lower() == wanted]
-
-        # Price Filters
-        if price_min is not None:
-            items = [item for item in items if (item.get("price") is not None and item.get("price") >= price_min)]
-        if price_max is not None:
-            items = [item for item in items if (item.get("price") is not None and item.get("price") <= price_max)]
-
+        items = _filtered_books(filters)
+        counts = book_facets(items, wanted, facet_bucket_size) if wanted else None
         total = len(items)
-
-        # Sorting 
-        if sort: 
-            if sort.startswith("price_"):
-                priced_items = [item for item in items if item.get("price") is not None]
-                items = sorted(
-                    priced_items, 
-                    key=lambda x: x["price"], 
-                    reverse=(sort == "price_desc")
-                )
-            elif sort.startswith("title_"):
-                items = sorted(
-                    items, 
-                    key=lambda x: x.get("title", "").lower(), 
-                    reverse=(sort == "title_desc")
-                )
+        items = sort_books(items, sort)
        
         # Pagination
         items = items[offset: offset + limit]
@@ -145,14 +369,176 @@ def get_books(
         
         # Return formatted response
         return {"total": total,
-                "items": [BookOut(**item) for item in items],
+                "items": items,
+                "facets": counts,
                 } 
+
+    to_arrow = _negotiate(accept, arrow.books_stream)
+    # Canonical form of the request: equal keys always give equal responses
+    key = (USE_MONGO, filters, match if filters.q else "substring", sort or None, limit, offset, tuple(wanted),
+           facet_bucket_size if "price" in wanted else None, to_arrow is not None)
+    try:
+        payload = books_cache.get_or_compute(
+            key, lambda: _computed(compute, BooksResponse, to_arrow), version=dataset_version()
+        )
+        return PayloadResponse(payload, headers=VARY_ACCEPT)
     except DataLoadError as e: 
         raise HTTPException(status_code=503, detail=str(e))
     
 
     
 
+@app.get(
+    "/books/suggest",
+    response_model=SuggestResponse,
+    tags=["Books"],
+    summary="Autocomplete titles and title words",
+    description=(
+        "Titles starting with `prefix`, and title words completing its last word, from an in-memory "
+        "sorted index. Ordered alphabetically (`by=title`) or by number of books (`by=popularity`)."
+    ),
+)
+def suggest_books(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    k: int = Query(10, ge=1, le=50),
+    by: str = Query("title", pattern="^(title|popularity)$"),
+):
+    """Autocomplete a search box.
+
+    Args:
+        prefix: Text typed so far
+        k: Maximum suggestions of each kind (1-50)
+        by: title (alphabetical) or popularity (most books first)
+
+    Returns:
+        Matching titles and words with how many books each covers
+    """
+    try:
+        if USE_MONGO:
+            index = suggest_index_mongo()
+        else:
+            index = dataset_index(load_books(), "suggest", SuggestIndex.from_books)
+    except DataLoadError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"prefix": prefix, **index.suggest(prefix, k, by)}
+
+@app.get(
+    "/books/export",
+    tags=["Books"],
+    summary="Export books",
+    description=(
+        "Stream every book matching the `/books` filters as NDJSON, CSV, Parquet or an Arrow IPC stream, "
+        "in constant memory. Parquet and Arrow need `pyarrow` on the server."
+    ),
+    response_class=StreamingResponse,
+)
+def export_books(
+    format: str = Query("ndjson", pattern="^(ndjson|csv|parquet|arrow)$"),
+    q: Optional[str] = Query(None, max_length=100),
+    price_min: Optional[float] = Query(None, ge=0),
+    price_max: Optional[float] = Query(None, ge=0),
+    availability: Optional[str] = Query(None, max_length=50),
+    sort: Optional[str] = Query(None, pattern="^(price_asc|price_desc|title_asc|title_desc)$"),
+):
+    """Stream all matching books.
+
+    Args:
+        - format: ndjson, csv, parquet or arrow (one record batch per batch of books)
+        - q, price_min, price_max, availability, sort: Same as `/books`
+
+    Returns:
+        Streaming response with one chunk per batch of books, or the stored
+        export when the same one was made recently.
+    """
+    headers = {"Content-Disposition": f'attachment; filename="books.{format}"'}
+    key = (USE_MONGO, USE_SQLITE, format, BookFilter.normalise(q, availability, price_min, price_max), sort or None)
+    version = dataset_version()
+    cached = export_cache.get(key, version)
+    if cached is not None:
+        return PayloadResponse(cached, headers=headers)
+    try:
+        export.check_available(format)
+        if USE_MONGO:
+            batches = iter_books_mongo(
+                q=q,
+                price_min=price_min,
+                price_max=price_max,
+                availability=availability,
+                sort=sort,
+            )
+        else:
+            items = sort_books(filter_books(load_books(), q, availability, price_min, price_max), sort)
+            batches = (items[i:i + EXPORT_BATCH_SIZE] for i in range(0, len(items), EXPORT_BATCH_SIZE))
+    except export.ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except DataLoadError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    # Compressing the copy for the cache runs after the last chunk is sent, so the client doesn't wait on it
+    copy = {"chunks": [], "complete": False}
+    return StreamingResponse(
+        _tee_export(export.ENCODERS[format](batches), copy),
+        media_type=export.MEDIA_TYPES[format],
+        headers=headers,
+        background=BackgroundTask(_store_export, copy, key, version, export.MEDIA_TYPES[format]),
+    )
+
+def _tee_export(chunks, copy: dict):
+    """Pass export chunks through, keeping a copy in copy["chunks"] while it is within EXPORT_CACHE_ENTRY_MAX_MB."""
+    limit = min(int(config.EXPORT_CACHE_ENTRY_MAX_MB * 1024 * 1024), export_cache.max_bytes)
+    size = 0
+    for chunk in chunks:
+        if copy["chunks"] is not None:
+            size += len(chunk)
+            if size > limit:
+                copy["chunks"] = None
+            else:
+                copy["chunks"].append(chunk)
+        yield chunk
+    copy["complete"] = True
+
+def _store_export(copy: dict, key, version, media_type) -> None:
+    """Precompress and cache an export once it has been sent in full."""
+    if copy["complete"] and copy["chunks"] is not None:
+        payload = Payload(b"".join(copy["chunks"]), media_type)
+        payload.precompress()
+        export_cache.put(key, payload, version)
+
+@app.post(
+    "/books/batch",
+    response_model=BatchLookupResponse,
+    tags=["Books"],
+    summary="Look up books by id or URL",
+    description=(
+        "Resolve up to `BATCH_LOOKUP_MAX_KEYS` book ids or URLs in one call. "
+        "Results come back in request order, with `found: false` for misses."
+    ),
+)
+def batch_lookup(body: BatchLookupRequest):
+    """Look up many books at once.
+
+    Args:
+        - keys: Book ids or URLs
+
+    Returns:
+        One entry per requested key, in order, plus found/missing counts.
+    """
+    try:
+        with profiling.phase("db"):
+            if USE_MONGO:
+                found = lookup_books_mongo(body.keys)
+            else:
+                found = lookup_books(load_books(), body.keys)
+    except DataLoadError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    items = []
+    for key in body.keys:
+        book = found.get(key)
+        items.append({"key": key, "found": book is not None, "book": BookOut.model_validate(book) if book else None})
+    hits = sum(1 for item in items if item["found"])
+    return {"found": hits, "missing": len(items) - hits, "items": items}
+
 @app.get(
     "/analytics/availability",
     response_model=AvailabilityResponse,
@@ -160,25 +546,41 @@ def get_books(
     summary="Availability distribution",
     description="Availability label."
 )
-def get_availability():
+def get_availability(
+    filters: BookFilter = Depends(book_filter),
+    approx: bool = APPROX_QUERY,
+    dedupe: bool = DEDUPE_QUERY,
+):
     """Get count of books for each availability status. 
 
+    Args:
+        filters: q, availability, price_min and price_max, as on /books
+        approx: Read the counts kept with the sketches (they are exact)
+        dedupe: Count each near-duplicate cluster once
+
     Returns:
         Dictionary with total books and breakdown by availability
         (e.g., "in stock", "out of stock", etc.)
     """
-    try:
+    def compute():
+        if USE_SQLITE:
+            return availability_sqlite(filters, dedupe)
         if USE_MONGO:
-            return availability_mongo()
+            return availability_mongo(filters, dedupe)
         
-        items = load_books()
         availability_counts = Counter(
-        (item.get("availability") or "unknown").strip().lower() for item in items
+        (availability or "unknown").strip().lower()
+        for availability in book_column(_filtered_books(filters, dedupe), "availability")
         )
 
         total = sum(availability_counts.values())
         buckets = [{"label": label, "count": count} for label, count in availability_counts.items()]
         return {"total": total, "buckets": buckets}
+
+    try:
+        if approx and filters.empty and not dedupe:
+            return _sketches().availability_counts()
+        return _cached("availability", filters, (dedupe,), compute, AvailabilityResponse)
     except DataLoadError as e:
         raise HTTPException(status_code=503, detail=str(e))
    
@@ -190,17 +592,27 @@ def get_availability():
     summary="Price summary stats",
     description="Minimum, maximum, average, and count over prices."
 )
-def get_price_stats():
+def get_price_stats(
+    filters: BookFilter = Depends(book_filter),
+    approx: bool = APPROX_QUERY,
+    dedupe: bool = DEDUPE_QUERY,
+):
     """Get basic price statistics for all books.
 
+    Args:
+        filters: q, availability, price_min and price_max, as on /books
+        approx: Read count, min, max and sum from the price sketch (they are exact)
+        dedupe: Count each near-duplicate cluster once
+
     Returns:
         Dictionary with count, minimum, maximum and average price.
     """
-    try:
+    def compute():
+        if USE_SQLITE:
+            return price_stats_sqlite(filters, dedupe)
         if USE_MONGO:
-            return price_stats_mongo()
-        items = load_books()
-        prices = [item["price"] for item in items if item.get("price") is not None]
+            return price_stats_mongo(filters, dedupe)
+        prices = [price for price in book_column(_filtered_books(filters, dedupe), "price") if price is not None]
         count = len(prices)
         if count == 0:
             return {"count": 0, "min": None, "max": None, "average": None}
@@ -208,62 +620,256 @@ def get_price_stats():
         max_price = max(prices)
         average_price = sum(prices) / count
         return {"count": count, "min": min_price, "max": max_price, "average": average_price}
-    
+
+    try:
+        if approx and filters.empty and not dedupe:
+            return _sketches().price_stats()
+        return _cached("price-stats", filters, (dedupe,), compute, PriceStats)
     except DataLoadError as e:
         raise HTTPException(status_code=503, detail=str(e))
 
 @app.get("/analytics/price-buckets", response_model=PriceBucketsResponse)
-def get_price_buckets(bucket_size: float = Query(10.0, gt=0)):
+def get_price_buckets(
+    bucket_size: float = Query(10.0, gt=0),
+    filters: BookFilter = Depends(book_filter),
+    approx: bool = APPROX_QUERY,
+    dedupe: bool = DEDUPE_QUERY,
+    accept: Optional[str] = Header(None),
+):
     """Get price distribution in histogram buckets. 
 
     Args: 
         bucket_size: Width of each price range (e.g., 10.0 for £10 buckets)
+        filters: q, availability, price_min and price_max, as on /books
+        approx: Estimate counts from the price sketch; each count is within
+            2 * rank_error * total of the exact one
+        dedupe: Count each near-duplicate cluster once
+        accept: `application/vnd.apache.arrow.stream` for an Arrow stream instead of JSON
 
     Returns: 
-        List of price ranges with count of books in each range
+        List of price ranges with count of books in each range; as an Arrow
+        stream, one row per range with lower, upper and count columns
     """
-    try: 
+    def compute():
+        if USE_SQLITE:
+            return price_buckets_sqlite(bucket_size, filters, dedupe)
         if USE_MONGO:
-            return price_buckets_mongo(bucket_size)
-        items = load_books()
+            return price_buckets_mongo(bucket_size, filters, dedupe)
+        prices = [price for price in book_column(_filtered_books(filters, dedupe), "price") if price is not None]
+        buckets = []
+        if not prices:
+            return {"buckets": []}
+        min_price = min(prices)
+        max_price = max(prices)
+        num_buckets = int((max_price - min_price) / bucket_size)
+        for i in range(num_buckets + 1):
+            lower = min_price + i * bucket_size
+            upper = lower + bucket_size
+            count = sum(1 for price in prices if lower <= price < upper)
+            buckets.append({"lower": lower, "upper": upper, "count": count})
+        return {"buckets": buckets}
+
+    to_arrow = _negotiate(accept, arrow.price_buckets_stream)
+    try: 
+        if approx and filters.empty and not dedupe:
+            return PayloadResponse(_payload(PriceBucketsResponse, _sketches().price_buckets(bucket_size), to_arrow),
+                                   headers=VARY_ACCEPT)
+        return _cached("price-buckets", filters, (bucket_size, dedupe), compute, PriceBucketsResponse, to_arrow,
+                       VARY_ACCEPT)
     except DataLoadError as e:
         raise HTTPException(status_code=503, detail=str(e))
 
-    prices = [item["price"] for item in items if item.get("price") is not None]
-    buckets = []
-    if not prices:
-        return {"buckets": []}
-    min_price = min(prices)
-    max_price = max(prices)
-    num_buckets = int((max_price - min_price) / bucket_size)
-    for i in range(num_buckets + 1):
-        lower = min_price + i * bucket_size
-        upper = lower + bucket_size
-        count = sum(1 for price in prices if lower <= price < upper)
-        buckets.append({"lower": lower, "upper": upper, "count": count})
-    return {"buckets": buckets}
-
 @app.get("/analytics/title-words", response_model=WordsResponse)
-def get_title_words(top_n: int = Query(10, ge=1, le=100)):
+def get_title_words(
+    top_n: int = Query(10, ge=1, le=100),
+    filters: BookFilter = Depends(book_filter),
+    approx: bool = APPROX_QUERY,
+    dedupe: bool = DEDUPE_QUERY,
+):
     """Get most common words used in book titles.
 
     Args:
         top_n: Number of top words to return (1-100)
+        filters: q, availability, price_min and price_max, as on /books
+        approx: Take the heavy hitters from the Count-Min sketch; counts never
+            undercount and overcount by at most 0.1% of all title words
+        dedupe: Count each near-duplicate cluster once
 
     Returns:
         List of words and their frequency counts
     """
+    def compute():
+        if USE_SQLITE:
+            return title_words_sqlite(top_n, filters, dedupe)
+        if USE_MONGO:
+            return title_words_mongo(top_n, filters, dedupe)
+        word_counter = Counter()
+        for title in book_column(_filtered_books(filters, dedupe), "title"):
+            word_counter.update(title_words(title))
+        most_common = word_counter.most_common(top_n)
+        top = [{"word": word, "count": count} for word, count in most_common]
+        return {"top": top}
 
     try:
+        if approx and filters.empty and not dedupe:
+            return _sketches().title_words(top_n)
+        return _cached("title-words", filters, (top_n, dedupe), compute, WordsResponse)
+    except DataLoadError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@app.get(
+    "/analytics/price-quantiles",
+    response_model=PriceQuantilesResponse,
+    tags=["Analytics"],
+    summary="Price quantiles",
+    description=(
+        "Nearest-rank price quantiles. By default they come from the KLL sketch kept at ingest, "
+        "where each answer's rank is within `rank_error` (about 1.7%) of the requested quantile; "
+        "`approx=false`, or any filter, computes them exactly."
+    ),
+)
+def get_price_quantiles(
+    quantile: List[float] = Query([0.25, 0.5, 0.75, 0.9, 0.99], description="Quantiles between 0 and 1"),
+    filters: BookFilter = Depends(book_filter),
+    approx: bool = Query(True, description="Answer from the price sketch instead of sorting every price"),
+    dedupe: bool = DEDUPE_QUERY,
+):
+    """Get price quantiles.
+
+    Args:
+        quantile: Quantiles to report, each between 0 and 1
+        filters: Search text and availability/price filters, as on /books
+        approx: Use the price sketch instead of an exact sort
+        dedupe: Count each near-duplicate cluster once
+
+    Returns:
+        Count of priced books and the price at each quantile
+    """
+    if any(not 0 <= x <= 1 for x in quantile):
+        raise HTTPException(status_code=422, detail="Quantiles must be between 0 and 1")
+
+    def compute():
+        if USE_MONGO:
+            return {"approx": False, **price_quantiles_mongo(quantile, filters, dedupe)}
         items = load_books()
+        if filters.empty and not dedupe:
+            prices = dataset_index(items, "sorted_prices",
+                                   lambda books: sorted(p for p in book_column(books, "price") if p is not None))
+        else:
+            prices = sorted(p for p in book_column(_filtered_books(filters, dedupe), "price") if p is not None)
+        n = len(prices)
+        quantiles = [{"q": x, "price": prices[min(n - 1, max(0, math.ceil(x * n) - 1))] if n else None} for x in quantile]
+        return {"count": n, "approx": False, "quantiles": quantiles}
+
+    try:
+        if approx and filters.empty and not dedupe:
+            sketches = _sketches()
+            return {"count": sketches.prices.n, "approx": True, "rank_error": sketches.prices.rank_error,
+                    "quantiles": sketches.price_quantiles(quantile)}
+        return _cached("price-quantiles", filters, (tuple(quantile), dedupe), compute, PriceQuantilesResponse)
+    except DataLoadError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@app.get(
+    "/analytics/distinct-titles",
+    response_model=DistinctTitlesResponse,
+    tags=["Analytics"],
+    summary="Distinct titles",
+    description=(
+        "Number of distinct titles, ignoring case. `approx=true` reads the HyperLogLog sketch kept at ingest, "
+        "with a standard error of `relative_error` (about 0.8%)."
+    ),
+)
+def get_distinct_titles(
+    filters: BookFilter = Depends(book_filter),
+    approx: bool = APPROX_QUERY,
+    dedupe: bool = DEDUPE_QUERY,
+):
+    """Count distinct titles.
+
+    Args:
+        filters: q, availability, price_min and price_max, as on /books
+        approx: Estimate from the HyperLogLog sketch instead of an exact count
+        dedupe: Count each near-duplicate cluster once, i.e. the number of distinct books
+
+    Returns:
+        The distinct title count and, when approximate, its relative standard error
+    """
+    def compute():
+        if USE_MONGO:
+            return {"distinct": distinct_titles_mongo(filters, dedupe), "approx": False}
+        titles = book_column(_filtered_books(filters, dedupe), "title")
+        return {"distinct": len({(title or "").strip().lower() for title in titles}), "approx": False}
+
+    try:
+        if approx and filters.empty and not dedupe:
+            sketches = _sketches()
+            return {"distinct": sketches.distinct_titles(), "approx": True, "relative_error": sketches.titles.relative_error}
+        return _cached("distinct-titles", filters, (dedupe,), compute, DistinctTitlesResponse)
     except DataLoadError as e:
         raise HTTPException(status_code=503, detail=str(e))
-    word_counter = Counter()
-    for item in items:
-        title = (item.get("title") or "").lower()
-        # remove punctuation, then split
-        cleaned = title.translate(str.maketrans("", "", string.punctuation))
-        word_counter.update(cleaned.split())
-    most_common = word_counter.most_common(top_n)
-    top = [{"word": word, "count": count} for word, count in most_common]
-    return {"top": top}
+
+@app.get(
+    "/admin/slow-queries",
+    response_model=SlowQueryLogResponse,
+    tags=["Admin"],
+    summary="Slow-query log",
+    description=(
+        "Recent `/books` and `/analytics/*` requests slower than `SLOW_QUERY_MS`, newest first, "
+        "with the query shapes they ran and their explain plans. Requires `X-Admin-Token`."
+    ),
+    dependencies=[Depends(require_admin)],
+)
+def get_slow_queries():
+    """Get the slow-query ring buffer.
+
+    Returns:
+        Threshold in milliseconds and the recorded slow requests.
+    """
+    return {"threshold_ms": config.SLOW_QUERY_MS, "records": slowlog.records()}
+
+@app.get(
+    "/admin/profiles",
+    response_model=ProfileLogResponse,
+    tags=["Admin"],
+    summary="Request profiles",
+    description=(
+        "Recent profiled requests, newest first: those sent with `X-Profile: 1` and a valid `X-Admin-Token`, "
+        "and a `PROFILE_SAMPLE_RATE` share of `/books` and `/analytics/*` requests. Requires `X-Admin-Token`."
+    ),
+    dependencies=[Depends(require_admin)],
+)
+def get_profiles():
+    """List stored request profiles.
+
+    Returns:
+        Sampling settings and the stored profiles, without their stacks.
+    """
+    return {"sample_rate": config.PROFILE_SAMPLE_RATE, "interval_ms": config.PROFILE_INTERVAL_MS,
+            "records": profiling.records()}
+
+@app.get(
+    "/admin/profiles/{profile_id}",
+    tags=["Admin"],
+    summary="Request profile as folded stacks",
+    description=(
+        "One profile in the folded-stack format (`frame;frame;frame count` per line) read by flamegraph.pl, "
+        "inferno and speedscope. The id comes from the profiled response's `X-Profile-Id` header. "
+        "Requires `X-Admin-Token`."
+    ),
+    response_class=PlainTextResponse,
+    dependencies=[Depends(require_admin)],
+)
+def get_profile(profile_id: str):
+    """Get one profile's sampled stacks.
+
+    Args:
+        profile_id: X-Profile-Id of the profiled response
+
+    Returns:
+        Folded stacks, one line per distinct stack with its sample count.
+    """
+    profile = profiling.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"No profile {profile_id}")
+    return PlainTextResponse(profiling.folded(profile["stacks"]))
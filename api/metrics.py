@@ -0,0 +1,275 @@
+"""
+Lightweight request and query instrumentation.
+
+Keeps counters and histograms in process and renders them in the Prometheus
+text exposition format for the /metrics endpoint. Also provides the ASGI
+middleware that times every request by route, and a pymongo command listener
+that times every command sent to MongoDB (pymongo is only imported once that
+listener is first used, so file and SQLite mode start without it).
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set_total(self, *labels: str, value: float) -> None:
+        """Overwrite a total kept elsewhere, e.g. functools cache statistics."""
+        with self._lock:
+            self._values[labels] = value
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}"
+            for labels, v in sorted(items)
+        ]
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds, as Prometheus expects."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._series.items()]
+        lines = []
+        bucket_labels = self.labelnames + ("le",)
+        for labels, (counts, total, n) in sorted(items):
+            running = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                running += c
+                le = _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels, labels + (le,))} {running}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {n}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def on_collect(self, fn: Callable[[], None]) -> Callable[[], None]:
+        """Register a callback that refreshes metrics right before rendering."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        for fn in self._collectors:
+            fn()
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template, method and status code.",
+    ("route", "method", "status"),
+))
+MONGO_COMMAND_DURATION = REGISTRY.register(Histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command latency by command name.",
+    ("command",),
+))
+MONGO_COMMAND_FAILURES = REGISTRY.register(Counter(
+    "mongo_command_failures_total",
+    "MongoDB commands that returned an error.",
+    ("command",),
+))
+MONGO_DOCS_RETURNED = REGISTRY.register(Counter(
+    "mongo_docs_returned_total",
+    "Documents returned to the API by MongoDB, by command name.",
+    ("command",),
+))
+MONGO_DOCS_EXAMINED = REGISTRY.register(Counter(
+    "mongo_docs_examined_total",
+    "Documents examined by MongoDB, by explained command name (from explain executionStats).",
+    ("command",),
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "cache_requests_total",
+    "Cache lookups by cache name and result (hit or miss).",
+    ("cache", "result"),
+))
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count one cache lookup."""
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                getattr(route, "path", "unmatched"),
+                scope["method"],
+                status,
+            )
+
+
+def _docs_returned(reply: dict) -> Optional[int]:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+        if batch is not None:
+            return len(batch)
+    n = reply.get("n")
+    return n if isinstance(n, int) else None
+
+
+def _docs_examined(reply: dict) -> Optional[int]:
+    stats = reply.get("executionStats")
+    if isinstance(stats, dict):
+        return stats.get("totalDocsExamined")
+    for stage in reply.get("stages") or ():
+        found = _docs_examined(stage.get("$cursor") or {})
+        if found is not None:
+            return found
+    return None
+
+
+def _mongo_command_listener_class() -> type:
+    from pymongo import monitoring
+
+    class MongoCommandListener(monitoring.CommandListener):
+        """pymongo listener recording per-command latency and document counts."""
+
+        def started(self, event):
+            pass
+
+        def succeeded(self, event):
+            name = event.command_name
+            MONGO_COMMAND_DURATION.observe(event.duration_micros / 1e6, name)
+            reply = event.reply or {}
+            returned = _docs_returned(reply)
+            if returned:
+                MONGO_DOCS_RETURNED.inc(name, amount=returned)
+            if name == "explain":
+                examined = _docs_examined(reply)
+                if examined:
+                    explained = next(iter(reply.get("command") or {}), "unknown")
+                    MONGO_DOCS_EXAMINED.inc(explained, amount=examined)
+
+        def failed(self, event):
+            MONGO_COMMAND_DURATION.observe(event.duration_micros / 1e6, event.command_name)
+            MONGO_COMMAND_FAILURES.inc(event.command_name)
+
+    return MongoCommandListener
+
+
+def __getattr__(name: str):
+    # MongoCommandListener subclasses a pymongo class, so it is built on first access
+    if name == "MongoCommandListener":
+        cls = globals()[name] = _mongo_command_listener_class()
+        return cls
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
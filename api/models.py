@@ -1,7 +1,51 @@
-"""Pydantic models for API responses."""
+"""Dataset records and Pydantic models for API responses."""
 
+from dataclasses import dataclass
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from api import config
+from typing import Any, Dict, List, Optional
+
+# Dataset records
+@dataclass(slots=True)
+class Book:
+    """Compact in-memory book record, one per book in the loaded dataset."""
+    id: str
+    title: str
+    url: str
+    price: Optional[float]
+    availability: str
+
+@dataclass(frozen=True, slots=True)
+class BookFilter:
+    """The /books filters in normal form, so equal filters hash equal."""
+    q: Optional[str] = None
+    availability: Optional[str] = None
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+
+    @classmethod
+    def normalise(
+        cls,
+        q: Optional[str],
+        availability: Optional[str],
+        price_min: Optional[float],
+        price_max: Optional[float],
+    ) -> "BookFilter":
+        # q is a regex in Mongo mode, so only an empty search is dropped;
+        # availability is matched case-insensitively after stripping
+        availability = (availability or "").strip().lower()
+        return cls(
+            q=q or None,
+            availability=availability or None,
+            price_min=None if price_min is None else float(price_min),
+            price_max=None if price_max is None else float(price_max),
+        )
+
+    @property
+    def empty(self) -> bool:
+        return self == NO_FILTER
+
+NO_FILTER = BookFilter()
 
 # Book models
 class BookOut(BaseModel):
@@ -13,6 +57,7 @@ class BookOut(BaseModel):
 
     model_config = ConfigDict(
         populate_by_name=True,
+        from_attributes=True,
         extra="ignore",
         json_schema_extra={
             "example": {
@@ -28,6 +73,29 @@ class BookOut(BaseModel):
 class BooksResponse(BaseModel):
     total: int
     items: List[BookOut]
+    facets: Optional["BookFacets"] = None
+
+class Suggestion(BaseModel):
+    text: str
+    count: int
+
+class SuggestResponse(BaseModel):
+    prefix: str
+    titles: List[Suggestion]
+    words: List[Suggestion]
+
+class BatchLookupRequest(BaseModel):
+    keys: List[str] = Field(..., min_length=1, max_length=config.BATCH_LOOKUP_MAX_KEYS)
+
+class BatchLookupItem(BaseModel):
+    key: str
+    found: bool
+    book: Optional[BookOut]
+
+class BatchLookupResponse(BaseModel):
+    found: int
+    missing: int
+    items: List[BatchLookupItem]
 
 # Analytics Models
 class AvailabilityBucket(BaseModel):
@@ -52,6 +120,25 @@ class PriceBucket(BaseModel):
 class PriceBucketsResponse(BaseModel):
     buckets: List[PriceBucket]
 
+class PriceQuantile(BaseModel):
+    q: float
+    price: Optional[float]
+
+class PriceQuantilesResponse(BaseModel):
+    count: int
+    approx: bool
+    rank_error: Optional[float] = None
+    quantiles: List[PriceQuantile]
+
+class DistinctTitlesResponse(BaseModel):
+    distinct: int
+    approx: bool
+    relative_error: Optional[float] = None
+
+class BookFacets(BaseModel):
+    availability: Optional[List[AvailabilityBucket]] = None
+    price: Optional[List[PriceBucket]] = None
+
 class WordCount(BaseModel):
     word: str
     count: int
@@ -59,5 +146,41 @@ class WordCount(BaseModel):
 class WordsResponse(BaseModel):
     top: List[WordCount]
 
+# Admin models
+class SlowQuery(BaseModel):
+    shape: Dict[str, Any]
+    plan: List[Optional[str]] = []
+    index: Optional[str] = None
+    collscan: bool = False
+    docs_examined: Optional[int] = None
+    keys_examined: Optional[int] = None
+    returned: Optional[int] = None
+    execution_ms: Optional[int] = None
+    error: Optional[str] = None
+
+class SlowRequest(BaseModel):
+    time: str
+    route: str
+    params: Dict[str, str]
+    duration_ms: float
+    queries: List[SlowQuery]
+
+class SlowQueryLogResponse(BaseModel):
+    threshold_ms: float
+    records: List[SlowRequest]
+
+class ProfileRecord(BaseModel):
+    id: str
+    time: str
+    route: str
+    params: Dict[str, str]
+    duration_ms: float
+    samples: int
+    phases_ms: Dict[str, float]
+
+class ProfileLogResponse(BaseModel):
+    sample_rate: float
+    interval_ms: float
+    records: List[ProfileRecord]
 
-    
\ No newline at end of file
+BooksResponse.model_rebuild()
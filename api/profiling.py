@@ -0,0 +1,230 @@
+"""
+Per-request phase timings and opt-in sampling profiles.
+
+Every request gets a Server-Timing header that splits the time before the
+response starts into phases, so browser devtools and load-test logs show where
+a slow /books or /analytics call went:
+
+- db: querying the configured store (the in-memory filter in file mode)
+- normalise: turning raw documents into Book records (_normalise_items)
+- serialise: Pydantic validation, JSON encoding and precompression
+- total: everything, including request parsing and the cache lookup
+
+Phases nest: time spent normalising inside a db call counts as normalise only.
+
+A request is also profiled when it carries `X-Profile: 1` with a valid
+X-Admin-Token, or at random for a PROFILE_SAMPLE_RATE share of /books and
+/analytics requests. A sampler thread reads the stack of the thread serving
+the request every PROFILE_INTERVAL_MS, while it is inside one of the
+request's phases, and counts identical stacks. Other requests to the same
+route run on other threads and are left out.
+The result is kept in an in-memory ring buffer, served at /admin/profiles,
+and the response names it in X-Profile-Id. Profiles are rendered in the
+folded-stack format that flamegraph.pl, inferno and speedscope read.
+"""
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import parse_qsl
+
+from api import config
+
+PHASES = ("db", "normalise", "serialise")
+SAMPLED_ROUTE_PREFIXES = ("/books", "/analytics")
+
+_timings: ContextVar[Optional["Timings"]] = ContextVar("request_timings", default=None)
+_profiles: deque = deque(maxlen=config.PROFILE_LOG_SIZE)
+
+
+class Timings:
+    """
+    Seconds spent in each phase of one request; the innermost open phase gets the time.
+
+    Also records which threads are inside a phase, for the sampler.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.threads: Set[int] = set()
+        self._open: List[list] = []  # [name, started] per open phase, innermost last
+
+    def enter(self, name: str) -> None:
+        self.threads.add(threading.get_ident())
+        now = time.perf_counter()
+        if self._open:
+            outer = self._open[-1]
+            self.phases[outer[0]] = self.phases.get(outer[0], 0.0) + now - outer[1]
+        self._open.append([name, now])
+
+    def exit(self) -> None:
+        now = time.perf_counter()
+        name, started = self._open.pop()
+        self.phases[name] = self.phases.get(name, 0.0) + now - started
+        if self._open:
+            self._open[-1][1] = now
+        else:
+            # The thread may go on to serve another request
+            self.threads.discard(threading.get_ident())
+
+    def header(self, total: float) -> str:
+        """Server-Timing value with durations in milliseconds."""
+        parts = [f"{name};dur={self.phases[name] * 1000:.3f}" for name in PHASES if name in self.phases]
+        parts.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(parts)
+
+
+@contextmanager
+def phase(name: str):
+    """Attribute the time spent in the block to a phase of the current request, if any."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    timings.enter(name)
+    try:
+        yield
+    finally:
+        timings.exit()
+
+
+def _frame_label(code, labels: Dict[Any, str]) -> str:
+    label = labels.get(code)
+    if label is None:
+        path = code.co_filename
+        marker = path.rfind("site-packages" + os.sep)
+        if marker >= 0:
+            path = path[marker + len("site-packages") + 1:]
+        else:
+            path = os.sep.join(path.split(os.sep)[-2:])
+        # ";" separates frames in the folded format
+        label = labels[code] = f"{code.co_qualname} ({path}:{code.co_firstlineno})".replace(";", ",")
+    return label
+
+
+class Sampler(threading.Thread):
+    """
+    Samples the stack of the thread serving one request.
+
+    Only threads in timings.threads are read, and only while they are inside
+    the route's endpoint. Stacks are cut at the endpoint function, so
+    threadpool frames below it don't appear.
+    """
+
+    def __init__(self, scope: Dict[str, Any], timings: Timings, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.scope = scope
+        self.timings = timings
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._done = threading.Event()
+        self._labels: Dict[Any, str] = {}
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        endpoint = getattr(self.scope.get("route"), "endpoint", None)
+        code = getattr(endpoint, "__code__", None)
+        if code is None:
+            return
+        frames = sys._current_frames()
+        for ident in list(self.timings.threads):
+            frame = frames.get(ident)
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                if frame.f_code is code:
+                    break
+                frame = frame.f_back
+            if frame is not None:
+                self.stacks[";".join(_frame_label(c, self._labels) for c in reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+def folded(stacks: Dict[str, int]) -> str:
+    """Render stack counts as folded stacks, one `frame;frame;frame count` line each."""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+
+
+def records() -> List[Dict[str, Any]]:
+    """Stored profiles without their stacks, newest first."""
+    return [{k: v for k, v in p.items() if k != "stacks"} for p in reversed(_profiles)]
+
+
+def get(profile_id: str) -> Optional[Dict[str, Any]]:
+    for profile in _profiles:
+        if profile["id"] == profile_id:
+            return profile
+    return None
+
+
+def clear() -> None:
+    _profiles.clear()
+
+
+def _wants_profile(scope) -> bool:
+    headers = dict(scope.get("headers") or ())
+    if headers.get(b"x-profile", b"").strip() in (b"1", b"true") and config.ADMIN_TOKEN:
+        return headers.get(b"x-admin-token", b"").decode("latin-1") == config.ADMIN_TOKEN
+    rate = config.PROFILE_SAMPLE_RATE
+    return rate > 0 and scope["path"].startswith(SAMPLED_ROUTE_PREFIXES) and random.random() < rate
+
+
+class ProfilingMiddleware:
+    """ASGI middleware adding Server-Timing to every response and profiling requests that opt in."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = Timings()
+        token = _timings.set(timings)
+        profile_id = sampler = None
+        if _wants_profile(scope):
+            profile_id = uuid.uuid4().hex[:16]
+            sampler = Sampler(scope, timings, config.PROFILE_INTERVAL_MS / 1000)
+            sampler.start()
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers") or [])
+                headers.append((b"server-timing", timings.header(time.perf_counter() - start).encode("latin-1")))
+                if profile_id is not None:
+                    headers.append((b"x-profile-id", profile_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _timings.reset(token)
+            if sampler is not None:
+                sampler.stop()
+                route = scope.get("route")
+                _profiles.append({
+                    "id": profile_id,
+                    "time": datetime.now(timezone.utc).isoformat(),
+                    "route": getattr(route, "path", scope["path"]),
+                    "params": dict(parse_qsl(scope.get("query_string", b"").decode("latin-1"))),
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                    "samples": sum(sampler.stacks.values()),
+                    "phases_ms": {name: round(s * 1000, 3) for name, s in timings.phases.items()},
+                    "stacks": dict(sampler.stacks),
+                })
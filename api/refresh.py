@@ -0,0 +1,191 @@
+"""
+Precomputed analytics, kept fresh by a background worker.
+
+Once an unfiltered analytics result has been computed, its key and the
+function that computes it are registered with a PrecomputedStore. A daemon
+thread then recomputes every registered result whenever the dataset version
+changes (checked every poll_s seconds) and every interval seconds, which
+also catches Mongo collections changing underneath a fixed version.
+
+Reads follow stale-while-revalidate: a stored result is returned at once even
+when it is out of date, and the worker is woken to replace it. Request
+latency for these results therefore doesn't depend on catalogue size. When
+the worker is not running (scripts, tests without the app lifespan), an out
+of date result is treated as a miss so callers compute it themselves.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from api import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("compute", "value", "version", "refreshed_at", "failed_at")
+
+    def __init__(self, compute: Callable[[], Any], value: Any, version: Any):
+        self.compute = compute
+        self.value = value
+        self.version = version
+        self.refreshed_at = time.monotonic()
+        self.failed_at: Optional[float] = None
+
+
+class PrecomputedStore:
+    """Results recomputed in the background and served stale while they are."""
+
+    def __init__(
+        self,
+        name: str,
+        version: Callable[[], Any],
+        interval: float,
+        poll_s: float,
+        max_keys: int,
+        retry_s: float,
+    ):
+        """
+        Args:
+            name: Label for the cache metrics
+            version: Returns the current dataset version
+            interval: Seconds after which a result is recomputed even if the version is unchanged
+            poll_s: Seconds between checks for a new dataset version
+            max_keys: Most results kept; the least recently read is dropped first
+            retry_s: Seconds before a result whose recomputation failed is tried again
+        """
+        self.name = name
+        self.version = version
+        self.interval = interval
+        self.poll_s = poll_s
+        self.max_keys = max_keys
+        self.retry_s = retry_s
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def _stale(self, entry: _Entry, version: Any, now: float) -> bool:
+        return entry.version != version or now - entry.refreshed_at >= self.interval
+
+    def get(self, key: Hashable) -> Any:
+        """
+        The stored result for key, or None if there is none.
+
+        An out-of-date result is still returned while the worker runs, and the
+        worker is woken to recompute it.
+        """
+        version = self.version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            metrics.record_cache(self.name, False)
+            return None
+        if self._stale(entry, version, time.monotonic()):
+            if not self.running:
+                metrics.record_cache(self.name, False)
+                return None
+            metrics.CACHE_REQUESTS.inc(self.name, "stale")
+            self._wake.set()
+        else:
+            metrics.record_cache(self.name, True)
+        return entry.value
+
+    def put(self, key: Hashable, compute: Callable[[], Any], value: Any, version: Any) -> None:
+        """
+        Store a result computed for version and keep it fresh from now on.
+
+        Args:
+            key: Hashable result key
+            compute: Recomputes the result; called from the worker thread
+            value: The result just computed
+            version: Dataset version value was computed from
+        """
+        with self._lock:
+            self._entries[key] = _Entry(compute, value, version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Recompute the results that are out of date, or all of them with force.
+
+        A failed recomputation is logged and the old result kept.
+
+        Returns:
+            Number of results recomputed
+        """
+        version = self.version()
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                (key, entry) for key, entry in self._entries.items()
+                if force or (self._stale(entry, version, now)
+                             and (entry.failed_at is None or now - entry.failed_at >= self.retry_s))
+            ]
+        refreshed = 0
+        for key, entry in due:
+            if self._stop.is_set():
+                break
+            try:
+                value = entry.compute()
+            except Exception as e:
+                entry.failed_at = time.monotonic()
+                logger.warning("Refreshing %s result %r failed, serving the stale one: %s", self.name, key, e)
+                continue
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    entry.value = value
+                    entry.version = version
+                    entry.refreshed_at = time.monotonic()
+                    entry.failed_at = None
+            refreshed += 1
+        return refreshed
+
+    def start(self) -> None:
+        """Start the refresh worker; does nothing if it is running."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the worker, waiting up to timeout for the result being computed."""
+        self._stop.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._lock:
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_s)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            start = time.monotonic()
+            refreshed = self.refresh()
+            if refreshed:
+                logger.info("Refreshed %d %s results in %.2fs", refreshed, self.name, time.monotonic() - start)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
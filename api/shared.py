@@ -0,0 +1,393 @@
+"""
+Shared-memory dataset for multi-worker deployments.
+
+A loader (run once, before or alongside the workers) packs the normalised books
+into a columnar snapshot file, ideally on a tmpfs such as /dev/shm. Every worker
+maps the same file read-only, so the dataset lives in the page cache once no
+matter how many workers are running. Filters, sorts and facet counts read the
+mapped columns directly and produce views of row numbers; Book records are only
+decoded for the rows a response returns.
+
+Derived indexes (suggest, trigram, key lookup, sketches, clusters) are still
+built by each worker from the mapped rows.
+
+Snapshots are published as numbered generations. The loader writes a new
+generation file, then atomically repoints CURRENT at it; workers notice the new
+generation on their next load_books() call and map it, while requests already
+holding the previous generation keep reading it until they finish.
+
+Usage:
+    python -m api.shared publish [directory]
+    SHARED_DATASET_DIR=/dev/shm/books uvicorn api.main:app --workers 8
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from api.models import Book
+
+# Version 2 stores availability codes as uint32, lower-cased titles and title ranks
+MAGIC = b"BOOKSHM2"
+POINTER_NAME = "CURRENT"
+KEEP_GENERATIONS = 2
+
+_PREFIX = struct.Struct("<8sI")
+_STRING_FIELDS = ("id", "title", "url")
+
+
+def _pack_strings(values: List[str]) -> Tuple[bytes, bytes]:
+    """Pack strings into one UTF-8 blob plus uint64 offsets (n + 1 entries)."""
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = array("Q", [0])
+    total = 0
+    for b in encoded:
+        total += len(b)
+        offsets.append(total)
+    return offsets.tobytes(), b"".join(encoded)
+
+
+def write_snapshot(books: List[Book], path: Path, generation: int) -> None:
+    """
+    Write books to a snapshot file.
+
+    Layout: magic, header length, JSON header (count, availability labels and
+    section offsets), then 8-byte aligned column sections.
+
+    Args:
+        books: Normalised book records
+        path: File to write
+        generation: Generation number recorded in the header
+    """
+    labels: Dict[str, int] = {}
+    codes = array("I", (labels.setdefault(b.availability, len(labels)) for b in books))
+    prices = array("d", (math.nan if b.price is None else b.price for b in books))
+
+    sections: Dict[str, bytes] = {"price": prices.tobytes(), "availability": codes.tobytes()}
+    for field in _STRING_FIELDS:
+        offsets, blob = _pack_strings([getattr(b, field) for b in books])
+        sections[f"{field}_offsets"] = offsets
+        sections[f"{field}_blob"] = blob
+    # Lower-cased titles, searched in place for ?q= without decoding any row
+    lowered = [b.title.lower() for b in books]
+    offsets, blob = _pack_strings(lowered)
+    sections["title_lower_offsets"] = offsets
+    sections["title_lower_blob"] = blob
+    # Each row's rank in title order, so title sorts compare integers; equal titles share a rank
+    ranks = array("I", bytes(4 * len(books)))
+    rank, previous = 0, None
+    for position, row in enumerate(sorted(range(len(books)), key=lowered.__getitem__)):
+        if lowered[row] != previous:
+            rank, previous = position, lowered[row]
+        ranks[row] = rank
+    sections["title_rank"] = ranks.tobytes()
+
+    layout = {}
+    position = 0
+    for name, data in sections.items():
+        layout[name] = [position, len(data)]
+        position += len(data) + (-len(data) % 8)
+
+    header = json.dumps({
+        "generation": generation,
+        "count": len(books),
+        "labels": list(labels),
+        "sections": layout,
+    }).encode("utf-8")
+    header += b" " * (-(_PREFIX.size + len(header)) % 8)
+
+    with open(path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, len(header)))
+        f.write(header)
+        for data in sections.values():
+            f.write(data)
+            f.write(b"\0" * (-len(data) % 8))
+
+
+class SharedRows(Sequence):
+    """
+    Some rows of a snapshot, in a chosen order, usable anywhere a list of Book is.
+
+    Only row numbers are held. Filters and sorts return new views, and column()
+    reads single fields for counting, so Book records are built only for the
+    rows that are indexed, sliced or iterated.
+    """
+
+    def __init__(self, books: "SharedBooks", rows: Sequence[int]):
+        self._books = books
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Book, List[Book]]:
+        row = self._books._row
+        if isinstance(index, slice):
+            return [row(i) for i in self._rows[index]]
+        try:
+            return row(self._rows[index])
+        except IndexError:
+            raise IndexError("book index out of range") from None
+
+    def __iter__(self) -> Iterator[Book]:
+        row = self._books._row
+        for i in self._rows:
+            yield row(i)
+
+    def column(self, field: str) -> Iterator[Any]:
+        """The values of one Book field, in view order, without building Books."""
+        books = self._books
+        if field == "price":
+            prices = books.prices
+            return (None if prices[i] != prices[i] else prices[i] for i in self._rows)
+        if field == "availability":
+            labels, codes = books._labels, books._codes
+            return (labels[codes[i]] for i in self._rows)
+        string = books._string
+        return (string(field, i) for i in self._rows)
+
+    def subset(self, positions: Iterable[int]) -> "SharedRows":
+        """The view's rows at the given positions."""
+        rows = self._rows
+        return SharedRows(self._books, array("I", (rows[p] for p in positions)))
+
+    def where(
+            self,
+            q: Optional[str],
+            availability: Optional[str],
+            price_min: Optional[float],
+            price_max: Optional[float],
+    ) -> "SharedRows":
+        """
+        Rows matching the /books filters, as filter_books applies them, in view order.
+
+        Titles are searched in the mapped lower-cased copy, availability is
+        compared by label code and prices in the mapped column.
+        """
+        books = self._books
+        rows: Iterable[int] = self._rows
+        if q:
+            hits = books.title_matches(q)
+            if rows is not books._rows:
+                hits = set(hits)
+                rows = (i for i in rows if i in hits)
+            else:
+                rows = hits
+        if availability:
+            wanted = availability.strip().lower()
+            codes = {code for code, label in enumerate(books._labels) if label.strip().lower() == wanted}
+            column = books._codes
+            rows = (i for i in rows if column[i] in codes)
+        if price_min is not None or price_max is not None:
+            low = price_min if price_min is not None else -math.inf
+            high = price_max if price_max is not None else math.inf
+            prices = books.prices
+            # NaN (unpriced) fails both comparisons
+            rows = (i for i in rows if low <= prices[i] <= high)
+        return SharedRows(books, array("I", rows))
+
+    def sorted(self, sort: str) -> "SharedRows":
+        """Rows ordered by a /books sort parameter, as sort_books orders Books."""
+        books = self._books
+        if sort.startswith("price_"):
+            prices = books.prices
+            rows = sorted((i for i in self._rows if prices[i] == prices[i]), key=prices.__getitem__,
+                          reverse=(sort == "price_desc"))
+        elif sort.startswith("title_"):
+            rank = books._title_ranks
+            rows = sorted(self._rows, key=rank.__getitem__, reverse=(sort == "title_desc"))
+        else:
+            return self
+        return SharedRows(books, array("I", rows))
+
+
+class SharedBooks(SharedRows):
+    """
+    Read-only view of a whole snapshot file.
+
+    Rows are decoded into Book records on access; nothing per-book is kept in
+    the worker's own heap.
+    """
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mm)
+        magic, header_len = _PREFIX.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a books snapshot of this version; publish it again")
+        start = _PREFIX.size + header_len
+        header = json.loads(bytes(view[_PREFIX.size:start]))
+
+        def section(name: str) -> memoryview:
+            offset, length = header["sections"][name]
+            return view[start + offset:start + offset + length]
+
+        self.path = Path(path)
+        self.generation: int = header["generation"]
+        self._count: int = header["count"]
+        self._labels: List[str] = [sys.intern(label) for label in header["labels"]]
+        self.prices = section("price").cast("d")
+        self._codes = section("availability").cast("I")
+        self._strings = {
+            field: (section(f"{field}_offsets").cast("Q"), section(f"{field}_blob"))
+            for field in _STRING_FIELDS
+        }
+        # Offsets, and where the blob starts in the file for mmap.find
+        self._title_lower = (section("title_lower_offsets").cast("Q"), start + header["sections"]["title_lower_blob"][0])
+        self._title_ranks = section("title_rank").cast("I")
+        super().__init__(self, range(self._count))
+
+    def _string(self, field: str, i: int) -> str:
+        offsets, blob = self._strings[field]
+        return str(blob[offsets[i]:offsets[i + 1]], "utf-8")
+
+    def _row(self, i: int) -> Book:
+        price = self.prices[i]
+        return Book(
+            id=self._string("id", i),
+            title=self._string("title", i),
+            url=self._string("url", i),
+            price=None if price != price else price,
+            availability=self._labels[self._codes[i]],
+        )
+
+    def title_matches(self, q: str) -> array:
+        """
+        Rows whose title contains q, case-insensitively, in row order.
+
+        Searches the mapped lower-cased titles with mmap.find and maps each hit
+        back to its row, so no title is decoded.
+        """
+        needle = q.lower().encode("utf-8")
+        offsets, base = self._title_lower
+        end = base + offsets[self._count]
+        rows = array("I")
+        find = self._mm.find
+        position, row = base, -1
+        while True:
+            position = find(needle, position, end)
+            if position < 0:
+                return rows
+            # Frequent substrings hit the next row; otherwise bisect for it
+            row += 1
+            if position - base >= offsets[row + 1]:
+                row = bisect_right(offsets, position - base, row) - 1
+            row_end = base + offsets[row + 1]
+            if position + len(needle) <= row_end:
+                rows.append(row)
+                position = row_end
+            else:
+                # Spans two titles; look again from the start of the next one
+                position = row_end
+
+
+def _generation_path(directory: Path, generation: int) -> Path:
+    return directory / f"books.{generation}.bin"
+
+
+_pointer_cache: Dict[Path, Tuple[int, int, int]] = {}
+
+
+def current_generation(directory: Union[str, Path]) -> Optional[int]:
+    """
+    Generation CURRENT points at, or None if nothing has been published.
+
+    The pointer file is only re-read when its inode or mtime changes, so this
+    is cheap enough to call on every request.
+    """
+    pointer = Path(directory) / POINTER_NAME
+    try:
+        st = os.stat(pointer)
+    except FileNotFoundError:
+        return None
+    cached = _pointer_cache.get(pointer)
+    if cached and cached[:2] == (st.st_ino, st.st_mtime_ns):
+        return cached[2]
+    generation = int(pointer.read_text().strip())
+    _pointer_cache[pointer] = (st.st_ino, st.st_mtime_ns, generation)
+    return generation
+
+
+def attach(directory: Union[str, Path], generation: Optional[int] = None) -> SharedBooks:
+    """
+    Map a published generation read-only.
+
+    Args:
+        directory: Snapshot directory
+        generation: Generation to map; defaults to the current one
+
+    Raises:
+        FileNotFoundError: If no snapshot has been published
+    """
+    directory = Path(directory)
+    for _ in range(3):
+        gen = current_generation(directory) if generation is None else generation
+        if gen is None:
+            break
+        try:
+            return SharedBooks(_generation_path(directory, gen))
+        except FileNotFoundError:
+            # Superseded and removed between reading CURRENT and opening it
+            generation = None
+    raise FileNotFoundError(f"No shared dataset published in {directory}")
+
+
+def publish(books: List[Book], directory: Union[str, Path]) -> int:
+    """
+    Publish books as the next generation and repoint CURRENT at it.
+
+    Older generations beyond the last KEEP_GENERATIONS are unlinked; workers
+    that still map them keep a valid mapping until they drop it.
+
+    Returns:
+        int: The new generation number
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    generation = (current_generation(directory) or 0) + 1
+
+    path = _generation_path(directory, generation)
+    tmp = path.with_suffix(".tmp")
+    write_snapshot(books, tmp, generation)
+    os.replace(tmp, path)
+
+    pointer_tmp = directory / f"{POINTER_NAME}.tmp"
+    pointer_tmp.write_text(str(generation))
+    os.replace(pointer_tmp, directory / POINTER_NAME)
+
+    for old in directory.glob("books.*.bin"):
+        try:
+            old_gen = int(old.name.split(".")[1])
+        except ValueError:
+            continue
+        if old_gen <= generation - KEEP_GENERATIONS:
+            old.unlink(missing_ok=True)
+    return generation
+
+
+def main(argv: List[str]) -> int:
+    from api.db import SHARED_DATASET_DIR, load_books_from_source
+
+    if len(argv) < 2 or argv[1] != "publish":
+        print(__doc__)
+        return 2
+    directory = argv[2] if len(argv) > 2 else SHARED_DATASET_DIR
+    if not directory:
+        print("No directory given and SHARED_DATASET_DIR is not set")
+        return 2
+    books = load_books_from_source()
+    generation = publish(books, directory)
+    print(f"Published {len(books)} books as generation {generation} in {directory}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
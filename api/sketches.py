@@ -0,0 +1,411 @@
+"""
+Mergeable sketches for approximate analytics over very large catalogues.
+
+- KLLSketch: price quantiles, ranks and histogram counts. Normalised rank error
+  is within about 1.7% (99% confidence) at the default k=200, and min, max,
+  count and sum are tracked exactly.
+- HyperLogLog: distinct normalised titles. Standard error is 1.04/sqrt(2**p),
+  about 0.8% at the default p=14.
+- CountMinSketch: title word frequencies with a bounded candidate set of
+  heavy hitters. Estimates never undercount and overcount by at most
+  epsilon * total words (default 0.1%) with probability 1 - delta (99%).
+
+SketchSet bundles them with exact availability counts. It is updated
+incrementally as books are ingested and serialised to a plain dict, so it can
+be stored next to the data (a Mongo document or a JSON file beside the feed).
+"""
+import base64
+import hashlib
+import math
+import random
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from api.utils import title_words
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class KLLSketch:
+    """KLL quantile sketch (Karnin, Lang and Liberty, 2016)."""
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.c = 2 / 3
+        self.compactors: List[List[float]] = [[]]
+        self.n = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._rng = random.Random(seed)
+
+    # Rank error bound at 99% confidence, from the KLL analysis (~1.7% at k=200)
+    @property
+    def rank_error(self) -> float:
+        return 3.3 / self.k
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * self.c ** depth)))
+
+    def _size(self) -> int:
+        return sum(len(c) for c in self.compactors)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _compress(self) -> None:
+        while self._size() >= self._max_size():
+            for h, items in enumerate(self.compactors):
+                if len(items) >= self._capacity(h):
+                    if h + 1 == len(self.compactors):
+                        self.compactors.append([])
+                    items.sort()
+                    offset = self._rng.random() < 0.5
+                    # Keep every other item at double weight; an odd leftover stays
+                    keep = len(items) - (len(items) % 2)
+                    self.compactors[h + 1].extend(items[offset:keep:2])
+                    self.compactors[h] = items[keep:]
+                    break
+
+    def update(self, value: float) -> None:
+        self.compactors[0].append(value)
+        self.n += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if len(self.compactors[0]) >= self._capacity(0):
+            self._compress()
+
+    def update_many(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.update(value)
+
+    def merge(self, other: "KLLSketch") -> None:
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for h, items in enumerate(other.compactors):
+            self.compactors[h].extend(items)
+        self.n += other.n
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _weighted(self) -> List[Tuple[float, int]]:
+        pairs = [(v, 1 << h) for h, items in enumerate(self.compactors) for v in items]
+        pairs.sort()
+        return pairs
+
+    def rank(self, value: float, inclusive: bool = False) -> float:
+        """Estimated number of values < value (or <= value if inclusive)."""
+        if self.n == 0:
+            return 0.0
+        total = 0
+        weight_sum = 0
+        for h, items in enumerate(self.compactors):
+            w = 1 << h
+            weight_sum += w * len(items)
+            if inclusive:
+                total += w * sum(1 for v in items if v <= value)
+            else:
+                total += w * sum(1 for v in items if v < value)
+        # Compaction keeps total weight close to, not exactly, n
+        return total * self.n / weight_sum if weight_sum else 0.0
+
+    def quantiles(self, qs: Iterable[float]) -> List[Optional[float]]:
+        """Nearest-rank quantiles; q=0 and q=1 return the exact min and max."""
+        if self.n == 0:
+            return [None for _ in qs]
+        pairs = self._weighted()
+        weight_sum = sum(w for _, w in pairs)
+        cumulative = []
+        running = 0
+        for v, w in pairs:
+            running += w
+            cumulative.append((running, v))
+        out = []
+        for q in qs:
+            if q <= 0:
+                out.append(self.min)
+                continue
+            if q >= 1:
+                out.append(self.max)
+                continue
+            target = q * weight_sum
+            value = next((v for running, v in cumulative if running >= target), self.max)
+            out.append(value)
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "k": self.k,
+            "n": self.n,
+            "sum": self.sum,
+            "min": self.min if self.n else None,
+            "max": self.max if self.n else None,
+            "compactors": self.compactors,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KLLSketch":
+        sketch = cls(k=data["k"])
+        sketch.n = data["n"]
+        sketch.sum = data["sum"]
+        sketch.min = data["min"] if data["min"] is not None else math.inf
+        sketch.max = data["max"] if data["max"] is not None else -math.inf
+        sketch.compactors = [list(c) for c in data["compactors"]] or [[]]
+        return sketch
+
+
+def _sigma(x: float) -> float:
+    if x == 1:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _tau(x: float) -> float:
+    if x == 0 or x == 1:
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = math.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if z == previous:
+            return z / 3
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with 2**p registers."""
+
+    def __init__(self, p: int = 14):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def update(self, value: str) -> None:
+        x = _hash64(value)
+        index = x >> (64 - self.p)
+        rest = (x << self.p) & ((1 << 64) - 1)
+        rho = (64 - self.p + 1) if rest == 0 else (64 - rest.bit_length() + 1)
+        if rho > self.registers[index]:
+            self.registers[index] = rho
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        # Ertl's improved estimator: unbiased from small to large cardinalities
+        # without the empirical bias tables HyperLogLog++ needs
+        m = self.m
+        q = 64 - self.p
+        histogram = [0] * (q + 2)
+        for r in self.registers:
+            histogram[r] += 1
+        if histogram[0] == m:
+            return 0
+        z = m * _tau(1 - histogram[q + 1] / m)
+        for k in range(q, 0, -1):
+            z = 0.5 * (z + histogram[k])
+        z += m * _sigma(histogram[0] / m)
+        return int(round(m * m / (2 * math.log(2)) / z))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"p": self.p, "registers": base64.b64encode(bytes(self.registers)).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HyperLogLog":
+        sketch = cls(p=data["p"])
+        sketch.registers = bytearray(base64.b64decode(data["registers"]))
+        return sketch
+
+
+class CountMinSketch:
+    """Count-Min sketch with a bounded set of heavy-hitter candidates."""
+
+    def __init__(self, epsilon: float = 0.001, delta: float = 0.01, candidates: int = 200):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = int(math.ceil(math.e / epsilon))
+        self.depth = int(math.ceil(math.log(1 / delta)))
+        self.table = array("Q", bytes(8 * self.width * self.depth))
+        self.total = 0
+        self.max_candidates = candidates
+        self.candidates: Dict[str, int] = {}
+        self._floor = 0
+
+    def _cells(self, key: str) -> List[int]:
+        x = _hash64(key)
+        h1, h2 = x & 0xFFFFFFFF, (x >> 32) | 1
+        w = self.width
+        return [row * w + (h1 + row * h2) % w for row in range(self.depth)]
+
+    def estimate(self, key: str) -> int:
+        table = self.table
+        return min(table[i] for i in self._cells(key))
+
+    def update(self, key: str, count: int = 1) -> None:
+        table = self.table
+        cells = self._cells(key)
+        for i in cells:
+            table[i] += count
+        self.total += count
+        estimate = min(table[i] for i in cells)
+
+        candidates = self.candidates
+        if key in candidates or len(candidates) < self.max_candidates:
+            candidates[key] = estimate
+            return
+        # Candidate counts only grow, so a stale floor is a safe lower bound
+        if estimate <= self._floor:
+            return
+        floor_key = min(candidates, key=candidates.__getitem__)
+        if estimate > candidates[floor_key]:
+            del candidates[floor_key]
+            candidates[key] = estimate
+        self._floor = min(candidates.values())
+
+    def merge(self, other: "CountMinSketch") -> None:
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge Count-Min sketches with different dimensions")
+        self.table = array("Q", (a + b for a, b in zip(self.table, other.table)))
+        self.total += other.total
+        keys = set(self.candidates) | set(other.candidates)
+        ranked = sorted(((self.estimate(k), k) for k in keys), reverse=True)[: self.max_candidates]
+        self.candidates = {k: c for c, k in ranked}
+        self._floor = 0
+
+    def top(self, n: int) -> List[Tuple[str, int]]:
+        """Most frequent candidates with their current estimates, ties broken by word."""
+        ranked = sorted(((k, self.estimate(k)) for k in self.candidates), key=lambda kv: (-kv[1], kv[0]))
+        return ranked[:n]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "epsilon": self.epsilon,
+            "delta": self.delta,
+            "total": self.total,
+            "max_candidates": self.max_candidates,
+            "candidates": self.candidates,
+            "table": base64.b64encode(self.table.tobytes()).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CountMinSketch":
+        sketch = cls(epsilon=data["epsilon"], delta=data["delta"], candidates=data["max_candidates"])
+        sketch.total = data["total"]
+        sketch.candidates = dict(data["candidates"])
+        table = array("Q")
+        table.frombytes(base64.b64decode(data["table"]))
+        sketch.table = table
+        return sketch
+
+
+class SketchSet:
+    """All sketches kept for one catalogue."""
+
+    def __init__(self):
+        self.books = 0
+        self.prices = KLLSketch()
+        self.titles = HyperLogLog()
+        self.words = CountMinSketch()
+        self.availability: Counter = Counter()
+
+    def update(self, title: Optional[str], price: Optional[float], availability: Optional[str]) -> None:
+        """Add one ingested book."""
+        self.books += 1
+        if price is not None:
+            self.prices.update(price)
+        title = (title or "").strip()
+        self.titles.update(title.lower())
+        for word in title_words(title):
+            self.words.update(word)
+        self.availability[(availability or "unknown").strip().lower()] += 1
+
+    def merge(self, other: "SketchSet") -> None:
+        self.books += other.books
+        self.prices.merge(other.prices)
+        self.titles.merge(other.titles)
+        self.words.merge(other.words)
+        self.availability.update(other.availability)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "books": self.books,
+            "prices": self.prices.to_dict(),
+            "titles": self.titles.to_dict(),
+            "words": self.words.to_dict(),
+            "availability": dict(self.availability),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SketchSet":
+        sketches = cls()
+        sketches.books = data["books"]
+        sketches.prices = KLLSketch.from_dict(data["prices"])
+        sketches.titles = HyperLogLog.from_dict(data["titles"])
+        sketches.words = CountMinSketch.from_dict(data["words"])
+        sketches.availability = Counter(data["availability"])
+        return sketches
+
+    # Answers in the same shapes as the exact analytics endpoints
+    def price_stats(self) -> Dict[str, Any]:
+        p = self.prices
+        if p.n == 0:
+            return {"count": 0, "min": None, "max": None, "average": None}
+        return {"count": p.n, "min": p.min, "max": p.max, "average": p.sum / p.n}
+
+    def price_quantiles(self, qs: List[float]) -> List[Dict[str, Any]]:
+        return [{"q": q, "price": price} for q, price in zip(qs, self.prices.quantiles(qs))]
+
+    def price_buckets(self, bucket_size: float) -> Dict[str, Any]:
+        p = self.prices
+        if p.n == 0:
+            return {"buckets": []}
+        buckets = []
+        below = 0.0
+        for i in range(int((p.max - p.min) / bucket_size) + 1):
+            lower = p.min + i * bucket_size
+            upper = lower + bucket_size
+            up_to = p.rank(upper)
+            buckets.append({"lower": lower, "upper": upper, "count": max(0, int(round(up_to - below)))})
+            below = up_to
+        return {"buckets": buckets}
+
+    def availability_counts(self) -> Dict[str, Any]:
+        buckets = [{"label": label, "count": count} for label, count in self.availability.items()]
+        return {"total": sum(self.availability.values()), "buckets": buckets}
+
+    def title_words(self, top_n: int) -> Dict[str, Any]:
+        return {"top": [{"word": word, "count": count} for word, count in self.words.top(top_n)]}
+
+    def distinct_titles(self) -> int:
+        return self.titles.count()
+
+    @classmethod
+    def from_books(cls, books: Iterable[Any]) -> "SketchSet":
+        """Build sketches from already-loaded Book records."""
+        sketches = cls()
+        for book in books:
+            sketches.update(book.title, book.price, book.availability)
+        return sketches
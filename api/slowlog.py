@@ -0,0 +1,175 @@
+"""
+Slow-query log with automatic explain() capture.
+
+The database layer reports the shape of every query it sends (filter, sort and
+paging, or an aggregation pipeline) through capture(). When a /books or
+/analytics request takes longer than SLOW_QUERY_MS to start its response
+(streamed bodies are not timed past their headers), the middleware runs
+explain("executionStats") for each captured query in a worker thread and
+appends a structured record to an in-memory ring buffer, served at
+/admin/slow-queries.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl
+
+from api import config
+
+logger = logging.getLogger(__name__)
+
+SLOW_ROUTE_PREFIXES = ("/books", "/analytics")
+
+_captured: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("slowlog_captured", default=None)
+_records: deque = deque(maxlen=config.SLOW_QUERY_LOG_SIZE)
+
+
+def capture(coll, command: Dict[str, Any]) -> None:
+    """
+    Remember a query sent on behalf of the current request.
+
+    Args:
+        coll: pymongo collection the command runs against
+        command: Explainable command document without the collection name,
+            e.g. {"find": {...filter...}, "sort": {...}} or {"aggregate": [...]}
+    """
+    queries = _captured.get()
+    if queries is not None:
+        queries.append({"collection": coll, "command": command})
+
+
+def records() -> List[Dict[str, Any]]:
+    """Slow-request records, newest first."""
+    return list(reversed(_records))
+
+
+def clear() -> None:
+    _records.clear()
+
+
+def _find(obj: Any, key: str) -> Any:
+    """Depth-first search for the first value stored under key."""
+    if isinstance(obj, dict):
+        if key in obj:
+            return obj[key]
+        values = obj.values()
+    elif isinstance(obj, list):
+        values = obj
+    else:
+        return None
+    for value in values:
+        found = _find(value, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _plan_stages(plan: Optional[dict]) -> List[Dict[str, Any]]:
+    stages = []
+    while isinstance(plan, dict):
+        stages.append({"stage": plan.get("stage"), "index": plan.get("indexName")})
+        inputs = plan.get("inputStages") or []
+        plan = plan.get("inputStage") or (inputs[0] if inputs else None)
+    return stages
+
+
+def summarise_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce an explain("executionStats") reply to the fields worth logging.
+
+    Works for find, count and aggregate explains, which nest the planner output
+    at different depths.
+    """
+    planner = _find(explain, "queryPlanner") or {}
+    stats = _find(explain, "executionStats") or {}
+    stages = _plan_stages(planner.get("winningPlan", {}).get("queryPlan") or planner.get("winningPlan"))
+    indexes = [s["index"] for s in stages if s["index"]]
+    return {
+        "plan": [s["stage"] for s in stages],
+        "index": indexes[0] if indexes else None,
+        "collscan": any(s["stage"] == "COLLSCAN" for s in stages),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "returned": stats.get("nReturned"),
+        "execution_ms": stats.get("executionTimeMillis"),
+    }
+
+
+def _explain(coll, command: Dict[str, Any]) -> Dict[str, Any]:
+    name, body = next(iter(command.items()))
+    cmd: Dict[str, Any] = {name: coll.name}
+    if name == "find":
+        cmd["filter"] = body
+    elif name == "count":
+        cmd["query"] = body
+    elif name == "aggregate":
+        cmd["pipeline"] = body
+        cmd["cursor"] = {}
+    cmd.update({k: v for k, v in command.items() if k != name})
+    # Explain on the member the query was routed to, not the database's default (primary)
+    return coll.database.command(
+        {"explain": cmd, "verbosity": "executionStats"}, read_preference=coll.read_preference
+    )
+
+
+def explain_and_store(record: Dict[str, Any], queries: List[Dict[str, Any]]) -> None:
+    """Explain each captured query and append the finished record to the log."""
+    for query in queries:
+        entry = {"shape": query["command"]}
+        try:
+            entry.update(summarise_explain(_explain(query["collection"], query["command"])))
+        except Exception as e:
+            entry["error"] = str(e)
+        record["queries"].append(entry)
+    _records.append(record)
+    logger.warning(
+        "Slow request %s took %.1f ms (%s)",
+        record["route"],
+        record["duration_ms"],
+        ", ".join(f"{q.get('plan')} via {q.get('index')}" for q in record["queries"]) or "no db queries",
+    )
+
+
+class SlowQueryMiddleware:
+    """ASGI middleware that logs /books and /analytics requests whose response starts after SLOW_QUERY_MS."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(SLOW_ROUTE_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        queries: List[Dict[str, Any]] = []
+        token = _captured.set(queries)
+        start = time.perf_counter()
+        answered: List[float] = []
+
+        async def timed_send(message):
+            # Time to the response headers: a streamed body, such as an export, is then
+            # paced by the client's download rather than by the query
+            if message["type"] == "http.response.start" and not answered:
+                answered.append(time.perf_counter())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            _captured.reset(token)
+            elapsed_ms = ((answered[0] if answered else time.perf_counter()) - start) * 1000
+            if elapsed_ms >= config.SLOW_QUERY_MS:
+                route = scope.get("route")
+                record = {
+                    "time": datetime.now(timezone.utc).isoformat(),
+                    "route": getattr(route, "path", scope["path"]),
+                    "params": dict(parse_qsl(scope.get("query_string", b"").decode("latin-1"))),
+                    "duration_ms": round(elapsed_ms, 3),
+                    "queries": [],
+                }
+                loop = asyncio.get_running_loop()
+                loop.run_in_executor(None, explain_and_store, record, queries)
@@ -0,0 +1,108 @@
+"""
+Background warm-up after the server starts.
+
+The lifespan hook starts a Warmup that runs named stages in order on a daemon
+thread: connect, load the dataset, build indexes, prime the result caches.
+The server accepts requests meanwhile; /ready reports progress and only
+returns 200 once every stage has finished. A failing stage is retried after
+a delay, so the API becomes ready by itself once e.g. MongoDB is reachable.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Stage = Tuple[str, Callable[[], Any]]
+
+
+class Warmup:
+    """Runs startup stages once, in order, retrying the first one that fails."""
+
+    def __init__(self, stages: Callable[[], Sequence[Stage]], retry_s: float):
+        """
+        Args:
+            stages: Returns the (name, function) stages to run; called when the warm-up starts
+            retry_s: Seconds to wait before retrying a failed stage
+        """
+        self._stages = stages
+        self.retry_s = retry_s
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._durations: Dict[str, float] = {}
+        self._pending: List[str] = []
+        self._error: Optional[str] = None
+
+    def start(self) -> None:
+        """Start warming up in the background; does nothing if already started."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._done.clear()
+            self._started_at = time.monotonic()
+            self._finished_at = None
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Abandon the warm-up, waiting up to timeout for the current stage."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._lock:
+            self._thread = None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until warm; returns whether it is."""
+        return self._done.wait(timeout)
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def status(self) -> Dict[str, Any]:
+        """Progress for /ready: finished stage durations, pending stages and the last error."""
+        with self._lock:
+            end = self._finished_at or time.monotonic()
+            return {
+                "ready": self.ready,
+                "elapsed_s": round(end - self._started_at, 3) if self._started_at is not None else None,
+                "stages": {name: round(seconds, 3) for name, seconds in self._durations.items()},
+                "pending": list(self._pending),
+                "error": self._error,
+            }
+
+    def _run(self) -> None:
+        stages = list(self._stages())
+        with self._lock:
+            self._durations = {}
+            self._pending = [name for name, _ in stages]
+        for name, run in stages:
+            while not self._stop.is_set():
+                start = time.monotonic()
+                try:
+                    run()
+                except Exception as e:
+                    logger.warning("Warm-up stage %s failed, retrying in %.0fs: %s", name, self.retry_s, e)
+                    with self._lock:
+                        self._error = f"{name}: {e}"
+                    self._stop.wait(self.retry_s)
+                    continue
+                with self._lock:
+                    self._durations[name] = time.monotonic() - start
+                    self._pending.remove(name)
+                    self._error = None
+                break
+            if self._stop.is_set():
+                return
+        with self._lock:
+            self._finished_at = time.monotonic()
+        logger.info("Warm-up finished in %.2fs", self._finished_at - self._started_at)
+        self._done.set()
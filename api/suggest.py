@@ -0,0 +1,117 @@
+"""
+Prefix autocomplete over titles and title words.
+
+Normalised (lower-cased) titles and words are kept in two sorted arrays, so
+all keys starting with a prefix form one contiguous range found with two
+bisects. Alphabetical top-k is the head of that range. For popularity top-k,
+short prefixes whose range is large are answered once and then served from
+a small memo, so every lookup stays well under a millisecond.
+"""
+import heapq
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from api.utils import title_words
+
+# Ranges longer than this are memoised for popularity lookups
+_MEMO_RANGE = 64
+_MEMO_SIZE = 4096
+
+
+class _SortedKeys:
+    """Sorted unique keys with their counts and display text."""
+
+    __slots__ = ("keys", "counts", "display", "_memo", "_lock")
+
+    def __init__(self, counts: Counter, display: Optional[Dict[str, str]] = None):
+        self.keys: List[str] = sorted(counts)
+        self.counts = array("I", (counts[k] for k in self.keys))
+        self.display = [display[k] for k in self.keys] if display else self.keys
+        self._memo: "OrderedDict[Tuple[str, int], List[Tuple[str, int]]]" = OrderedDict()
+        # Request threads share the memo; the ranking itself runs outside the lock
+        self._lock = threading.Lock()
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\U0010ffff", lo)
+        return lo, hi
+
+    def alphabetical(self, prefix: str, k: int) -> List[Tuple[str, int]]:
+        lo, hi = self._range(prefix)
+        return [(self.display[i], self.counts[i]) for i in range(lo, min(hi, lo + k))]
+
+    def popular(self, prefix: str, k: int) -> List[Tuple[str, int]]:
+        lo, hi = self._range(prefix)
+        memo = hi - lo > _MEMO_RANGE
+        memo_key = (prefix, k)
+        if memo:
+            with self._lock:
+                hit = self._memo.get(memo_key)
+                if hit is not None:
+                    self._memo.move_to_end(memo_key)
+                    return hit
+        counts = self.counts
+        # Highest count first, ties alphabetical (lower index)
+        best = heapq.nsmallest(k, range(lo, hi), key=lambda i: (-counts[i], i))
+        out = [(self.display[i], counts[i]) for i in best]
+        if memo:
+            with self._lock:
+                self._memo[memo_key] = out
+                if len(self._memo) > _MEMO_SIZE:
+                    self._memo.popitem(last=False)
+        return out
+
+
+class SuggestIndex:
+    """Autocomplete index over one dataset's titles and title words."""
+
+    def __init__(self, titles: Iterable[str]):
+        title_counts: Counter = Counter()
+        display: Dict[str, str] = {}
+        word_counts: Counter = Counter()
+        for title in titles:
+            title = (title or "").strip()
+            if not title:
+                continue
+            key = title.lower()
+            title_counts[key] += 1
+            display.setdefault(key, title)
+            word_counts.update(title_words(title))
+        self.titles = _SortedKeys(title_counts, display)
+        self.words = _SortedKeys(word_counts)
+        # One-letter prefixes have the widest ranges; answer them up front
+        for keys in (self.titles, self.words):
+            for first in sorted({key[0] for key in keys.keys}):
+                keys.popular(first, 10)
+
+    @classmethod
+    def from_books(cls, books) -> "SuggestIndex":
+        return cls(b.title for b in books)
+
+    def suggest(self, prefix: str, k: int = 10, by: str = "title") -> Dict[str, List[Dict]]:
+        """
+        Titles and title words starting with prefix.
+
+        Args:
+            prefix: Typed text; matched case-insensitively
+            k: Maximum suggestions of each kind
+            by: "title" for alphabetical order, "popularity" for most books first
+
+        Returns:
+            Dict: {"titles": [{text, count}], "words": [{text, count}]}
+        """
+        lookup = "popular" if by == "popularity" else "alphabetical"
+        title_prefix = prefix.strip().lower()
+        # Words complete the last word being typed, e.g. "dark ni" -> "night"
+        words = title_words(prefix)
+        word_prefix = words[-1] if words and not prefix.endswith(" ") else None
+
+        titles = getattr(self.titles, lookup)(title_prefix, k) if title_prefix else []
+        words = getattr(self.words, lookup)(word_prefix, k) if word_prefix else []
+        return {
+            "titles": [{"text": text, "count": count} for text, count in titles],
+            "words": [{"text": text, "count": count} for text, count in words],
+        }
@@ -1,29 +1,161 @@
 """Utility functions for data processing."""
 
 import math
-from typing import Optional, Union 
+import re
+import string
+from array import array
+from typing import Iterable, List, Optional, Tuple, Union
 
 NumberLike = Union[str, float, int, None]
 
+_CURRENCY = "£$€¥"
+_DROP_CURRENCY = str.maketrans("", "", _CURRENCY)
 
-def parse_price(value: NumberLike) -> Optional[float]:
+# Matched against the stripped text once currency symbols are dropped: an
+# optional sign, a mandatory integer part with optional thousands separators
+# ("1,234" or "1.234.567"), then an optional decimal part using either "." or
+# a locale decimal comma ("12,50"). Each position has one way to match, so
+# long runs of whitespace or garbage fail in linear time.
+_PRICE_RE = re.compile(
+    r"""
+    (?P<sign>[-+])?\s*
+    (?P<int>\d{1,3}(?:(?P<sep>[,.])\d{3})(?:(?P=sep)\d{3})*|\d+)
+    (?:(?P<dec>[.,])(?P<frac>\d+))?
+    """,
+    re.VERBOSE,
+)
+_match_price = _PRICE_RE.fullmatch
+
+
+def _parse_price_text(s: str) -> Optional[float]:
+    # Fast path for the common feed shape: "£51.77", "12", "9.5"
     try:
-        s = "" if value is None else str(value)
-        s = (
-            s.replace("£", "")
-            .replace("$", "")
-            .replace("€", "")
-            .replace(",", "")
-            .strip()
-        )
-
-        if not s: 
-            return None
-        
-        x = float(s)
-        if math.isnan(x) or math.isinf(x):
+        x = float(s.lstrip(_CURRENCY))
+    except ValueError:
+        return _parse_price_slow(s)
+    return x if math.isfinite(x) else None
+
+
+def _parse_price_slow(s: str) -> Optional[float]:
+    m = _match_price(s.translate(_DROP_CURRENCY).strip())
+    if m is None:
+        return None
+    sign, int_part, sep, dec, frac = m.group("sign", "int", "sep", "dec", "frac")
+
+    if sep:
+        if dec == sep:
+            # "1,234,56" uses one separator for both roles, so neither reading is safe
             return None
-        
-        return x
-    except Exception:
+        if sep == "." and dec is None and int_part.count(".") == 1:
+            # A single "." group is a decimal point: "1.234" -> 1.234
+            digits = int_part
+        else:
+            digits = int_part.replace(sep, "")
+    else:
+        digits = int_part
+
+    x = float(f"{digits}.{frac}" if frac else digits)
+    return -x if sign == "-" else x
+
+
+def parse_price(value: NumberLike) -> Optional[float]:
+    """
+    Parse a raw price value into a float.
+
+    Accepts numbers and strings such as "£51.77", "$1,234.50", "12,50 €" or
+    "1.234,56". Currency symbols and thousands separators are dropped and a
+    decimal comma is understood. A lone separator before three digits keeps
+    its float() reading for "." ("1.234" is 1.234) and is a thousands
+    separator for "," ("1,234" is 1234), as the original parser did. Strings
+    using one separator for both roles, like "1,234,56", are rejected, as are
+    booleans.
+
+    Args:
+        value: Raw price from the feed, database or scraper
+
+    Returns:
+        Optional[float]: Parsed price, or None if missing, unparseable or not finite
+    """
+    if type(value) is str:
+        return _parse_price_text(value)
+    if value is None or isinstance(value, bool):
         return None
+    if isinstance(value, (int, float)):
+        x = float(value)
+        return x if math.isfinite(x) else None
+    return _parse_price_text(str(value))
+
+
+# A price inside free text: optional sign and currency symbol, then digits with separators,
+# not part of a longer word or number ("0x10", "A4")
+_PRICE_IN_TEXT_RE = re.compile(r"(?<![\w.,])(?:[-+]\s*)?(?:[£$€¥]\s*)?\d(?:[\d.,]*\d)?(?!\w)")
+
+
+def find_price(value: NumberLike) -> Optional[float]:
+    """
+    Parse a price, falling back to the first price found in noisy text.
+
+    For scraped values that parse_price rejects as a whole, such as
+    "Price: £5" or a mis-decoded "Â£51.77".
+
+    Args:
+        value: Raw price from the scraper
+
+    Returns:
+        Optional[float]: Parsed price, or None if there is none in value
+    """
+    x = parse_price(value)
+    if x is not None or not isinstance(value, str):
+        return x
+    m = _PRICE_IN_TEXT_RE.search(value)
+    return parse_price(m.group()) if m else None
+
+
+def parse_prices(values: Iterable[NumberLike]) -> Tuple[array, bytearray]:
+    """
+    Parse a whole column of raw prices in one pass.
+
+    Repeated strings are only parsed once, which matters for catalogues where
+    most prices recur.
+
+    Args:
+        values: Raw price values, in row order
+
+    Returns:
+        tuple: (prices, missing) where prices is an array('d') holding NaN for
+        every unparseable value and missing is a mask with 1 at those positions
+    """
+    nan = math.nan
+    seen = {}
+    out = []
+    append = out.append
+    for value in values:
+        if isinstance(value, str):
+            x = seen.get(value)
+            if x is None:
+                parsed = _parse_price_text(value)
+                x = seen[value] = nan if parsed is None else parsed
+        else:
+            parsed = parse_price(value)
+            x = nan if parsed is None else parsed
+        append(x)
+
+    prices = array("d", out)
+    missing = bytearray(x != x for x in out)
+    return prices, missing
+
+
+_STRIP_PUNCTUATION = str.maketrans("", "", string.punctuation)
+
+
+def title_words(title: str) -> List[str]:
+    """
+    Split a title into the words counted by title-word analytics.
+
+    Args:
+        title: Book title
+
+    Returns:
+        List[str]: Lower-cased words with punctuation removed
+    """
+    return title.lower().translate(_STRIP_PUNCTUATION).split()
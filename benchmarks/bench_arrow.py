@@ -0,0 +1,100 @@
+"""
+JSON vs Arrow IPC response microbenchmark.
+
+Serialises the same /books page, /analytics/price-buckets histogram and full
+catalogue export both ways, then decodes each into columns as a DataFrame
+client would (json.loads and a pivot for JSON, pyarrow.ipc for Arrow).
+Reports body size and server encode and client decode time per response.
+
+Usage: python -m benchmarks.bench_arrow [rows]
+"""
+
+import json
+import sys
+import timeit
+
+import pyarrow as pa
+
+from api import arrow, export
+from api.db import _normalise_items
+from api.main import _payload
+from api.models import BooksResponse, PriceBucketsResponse
+from benchmarks.catalogue import generate
+
+FIELDS = ("id", "title", "url", "price", "availability")
+
+
+def best(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def json_columns(body: bytes, rows_key: str, fields):
+    rows = json.loads(body)[rows_key]
+    return {field: [row[field] for row in rows] for field in fields}
+
+
+def ndjson_columns(body: bytes):
+    rows = [json.loads(line) for line in body.splitlines()]
+    return {field: [row[field] for row in rows] for field in FIELDS}
+
+
+def arrow_table(body: bytes):
+    return pa.ipc.open_stream(body).read_all()
+
+
+def report(name, encode_json, decode_json, encode_arrow, decode_arrow, number):
+    json_body, arrow_body = encode_json(), encode_arrow()
+    print(f"  {name}")
+    for label, encode, decode, body in (("json", encode_json, decode_json, json_body),
+                                        ("arrow", encode_arrow, decode_arrow, arrow_body)):
+        enc = best(encode, number) * 1000
+        dec = best(lambda: decode(body), number) * 1000
+        print(f"    {label:<6} {len(body):>11,} bytes  encode {enc:9.3f} ms  decode {dec:9.3f} ms  "
+              f"total {enc + dec:9.3f} ms")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    books = _normalise_items(list(generate(rows, seed=0)))
+    print(f"Catalogue of {rows} books, best of 5")
+
+    page = {"total": rows, "items": books[:100], "facets": None}
+    report(
+        "/books page of 100",
+        lambda: _payload(BooksResponse, page).body,
+        lambda body: json_columns(body, "items", FIELDS),
+        lambda: _payload(BooksResponse, page, arrow.books_stream).body,
+        arrow_table,
+        number=200,
+    )
+
+    prices = [b.price for b in books if b.price is not None]
+    low = min(prices)
+    counts = {}
+    for price in prices:
+        i = int((price - low) // 1)
+        counts[i] = counts.get(i, 0) + 1
+    buckets = {"buckets": [{"lower": low + i, "upper": low + i + 1, "count": counts.get(i, 0)}
+                           for i in range(max(counts) + 1)]}
+    report(
+        f"/analytics/price-buckets, {len(buckets['buckets'])} buckets",
+        lambda: _payload(PriceBucketsResponse, buckets).body,
+        lambda body: json_columns(body, "buckets", ("lower", "upper", "count")),
+        lambda: _payload(PriceBucketsResponse, buckets, arrow.price_buckets_stream).body,
+        arrow_table,
+        number=200,
+    )
+
+    batches = [books[i:i + 1000] for i in range(0, len(books), 1000)]
+    report(
+        f"/books/export of {rows} books (ndjson vs arrow)",
+        lambda: b"".join(export.encode_ndjson(batches)),
+        ndjson_columns,
+        lambda: b"".join(export.encode_arrow(batches)),
+        arrow_table,
+        number=1,
+    )
+
+
+if __name__ == "__main__":
+    main()
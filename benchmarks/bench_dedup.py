@@ -0,0 +1,46 @@
+"""
+Near-duplicate clustering microbenchmark.
+
+Clusters a synthetic catalogue in which a share of the books are relisted
+with a one-character typo or changed punctuation, and reports throughput and
+how many of those relistings landed in their original's cluster.
+
+Usage: python -m benchmarks.bench_dedup [rows]
+"""
+
+import random
+import sys
+import time
+
+from api.dedup import NearDuplicateIndex
+from benchmarks.catalogue import generate
+
+
+def relist(title: str, rng: random.Random) -> str:
+    """The same title as another seller might list it."""
+    if rng.random() < 0.5 or len(title) < 8:
+        return title.upper() + "!"
+    i = rng.randrange(1, len(title) - 1)
+    return title[:i] + title[i + 1:]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(0)
+    books = [(row["url"], row["title"]) for row in generate(rows, seed=0)]
+    # 10% of the catalogue is relisted under a near-duplicate title
+    relisted = [(f"{url}#relist", relist(title, rng), url) for url, title in rng.sample(books, rows // 10)]
+
+    index = NearDuplicateIndex()
+    start = time.perf_counter()
+    clusters = {url: index.add(url, title) for url, title in books}
+    found = sum(index.add(key, title) == clusters[original] for key, title, original in relisted)
+    elapsed = time.perf_counter() - start
+
+    total = len(books) + len(relisted)
+    print(f"Clustered {total} titles in {elapsed:.2f} s ({total / elapsed:,.0f} titles/s), {len(index)} clusters")
+    print(f"  relistings found in their original's cluster: {found}/{len(relisted)} ({found / len(relisted):.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Dataset memory benchmark.
+
+Measures resident bytes per book for the previous dict-per-book layout and
+the compact Book records built by api.db._normalise_items.
+
+Usage: python -m benchmarks.bench_memory [rows]
+"""
+
+import random
+import sys
+import tracemalloc
+
+from api.db import _normalise_items
+
+
+def make_feed(rows: int, seed: int = 0) -> list:
+    """Raw feed rows shaped like the scraper output."""
+    rng = random.Random(seed)
+    words = ["light", "attic", "velvet", "night", "secret", "garden", "history", "tale", "road", "house"]
+    feed = []
+    for i in range(rows):
+        slug = "-".join(rng.choice(words) for _ in range(3))
+        feed.append({
+            "url": f"http://books.toscrape.com/catalogue/{slug}_{i}/index.html",
+            "title": " ".join(slug.split("-")).title(),
+            "price": f"£{rng.uniform(10, 60):.2f}",
+            "availability": "In stock" if rng.random() < 0.9 else "Out of stock",
+            "_id": f"{i:064x}",
+        })
+    return feed
+
+
+def as_dicts(raws: list) -> list:
+    """The previous layout: one fresh 5-key dict per book."""
+    return [
+        {"id": b.id, "title": b.title, "url": b.url, "price": b.price, "availability": b.availability}
+        for b in _normalise_items(raws)
+    ]
+
+
+def measure(build, raws: list) -> float:
+    """Bytes retained per book by the structure that build() returns."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    data = build(raws)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(data)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    raws = make_feed(rows)
+    print(f"Resident bytes per book over {rows} books")
+    print(f"  dict records  {measure(as_dicts, raws):8.1f}")
+    print(f"  Book records  {measure(_normalise_items, raws):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Instrumentation overhead microbenchmark.
+
+Times a histogram observation and the MetricsMiddleware wrapped around a
+no-op ASGI app, and fails if either exceeds its budget.
+
+Usage: python -m benchmarks.bench_metrics
+"""
+
+import asyncio
+import sys
+import time
+
+from api import metrics
+
+# Per-call budgets, in microseconds
+OBSERVE_BUDGET_US = 2.0
+MIDDLEWARE_BUDGET_US = 10.0
+
+
+async def _noop_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _noop_send(message):
+    pass
+
+
+async def _time_app(app, calls: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/books"}
+    start = time.perf_counter()
+    for _ in range(calls):
+        await app(dict(scope), None, _noop_send)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    calls = 200_000
+    h = metrics.Histogram("bench_seconds", "bench", ("route",))
+    start = time.perf_counter()
+    for i in range(calls):
+        h.observe(0.003, "/books")
+    observe_us = (time.perf_counter() - start) / calls * 1e6
+
+    bare_us = asyncio.run(_time_app(_noop_app, calls))
+    wrapped_us = asyncio.run(_time_app(metrics.MetricsMiddleware(_noop_app), calls))
+    middleware_us = wrapped_us - bare_us
+
+    print(f"  histogram observe   {observe_us:6.2f} us  (budget {OBSERVE_BUDGET_US})")
+    print(f"  middleware overhead {middleware_us:6.2f} us  (budget {MIDDLEWARE_BUDGET_US})")
+    over = observe_us > OBSERVE_BUDGET_US or middleware_us > MIDDLEWARE_BUDGET_US
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
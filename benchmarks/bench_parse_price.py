@@ -0,0 +1,66 @@
+"""
+Price parser microbenchmark.
+
+Compares the previous chained str.replace parser with api.utils.parse_price
+and the batch parse_prices column parser on a synthetic price column.
+
+Usage: python -m benchmarks.bench_parse_price [rows]
+"""
+
+import math
+import random
+import sys
+import timeit
+
+from api.utils import parse_price, parse_prices
+
+
+def legacy_parse_price(value):
+    """The original parse_price implementation, kept for comparison."""
+    try:
+        s = "" if value is None else str(value)
+        s = s.replace("£", "").replace("$", "").replace("€", "").replace(",", "").strip()
+        if not s:
+            return None
+        x = float(s)
+        if math.isnan(x) or math.isinf(x):
+            return None
+        return x
+    except Exception:
+        return None
+
+
+def make_column(rows: int, seed: int = 0) -> list:
+    """Feed-like price strings, mostly '£NN.NN' with a few odd values."""
+    rng = random.Random(seed)
+    column = []
+    for _ in range(rows):
+        roll = rng.random()
+        if roll < 0.9:
+            column.append(f"£{rng.uniform(10, 60):.2f}")
+        elif roll < 0.97:
+            column.append(f"${rng.uniform(100, 5000):,.2f}")
+        elif roll < 0.99:
+            column.append(None)
+        else:
+            column.append("n/a")
+    return column
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    column = make_column(rows)
+
+    timings = {
+        "legacy (scalar)": lambda: [legacy_parse_price(v) for v in column],
+        "parse_price (scalar)": lambda: [parse_price(v) for v in column],
+        "parse_prices (batch)": lambda: parse_prices(column),
+    }
+    print(f"Parsing {rows} prices, best of 5")
+    for name, fn in timings.items():
+        best = min(timeit.repeat(fn, number=1, repeat=5))
+        print(f"  {name:<22} {best * 1000:8.1f} ms  {rows / best / 1e6:6.2f} M rows/s")
+
+
+if __name__ == "__main__":
+    main()
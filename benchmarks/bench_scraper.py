@@ -0,0 +1,50 @@
+"""
+Listing-page parsing microbenchmark.
+
+Runs every book extractor (scraper/books/books/extractors.py) whose parser
+is installed over saved listing pages and reports pages and books parsed
+per second. Network and Scrapy scheduling are excluded; this is the CPU
+cost a crawler node pays per response.
+
+Usage: python -m benchmarks.bench_scraper [pages ...]
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scraper" / "books"))
+
+from books.extractors import EXTRACTORS  # noqa: E402
+
+# Saved pages and the URLs they were fetched from
+DEFAULT_PAGES = {
+    ROOT / "tests" / "fixtures" / "listing" / "index.html": "http://books.toscrape.com/",
+    ROOT / "tests" / "fixtures" / "listing" / "page-50.html": "http://books.toscrape.com/catalogue/page-50.html",
+}
+
+
+def main():
+    if len(sys.argv) > 1:
+        pages = {Path(p): "http://books.toscrape.com/" for p in sys.argv[1:]}
+    else:
+        pages = DEFAULT_PAGES
+    docs = [(path.read_text(encoding="utf-8"), url) for path, url in pages.items()]
+
+    print(f"Parsing {len(docs)} listing pages, best of 5")
+    for name, extract in EXTRACTORS.items():
+        try:
+            books = sum(len(extract(text, url).books) for text, url in docs)
+        except ImportError as e:
+            print(f"  {name:<6} skipped ({e.name} is not installed)")
+            continue
+        rounds = max(1, 200 // len(docs))
+        best = min(timeit.repeat(lambda: [extract(text, url) for text, url in docs], number=rounds, repeat=5))
+        per_page = best / (rounds * len(docs))
+        print(f"  {name:<6} {per_page * 1000:8.3f} ms/page  {1 / per_page:10,.0f} pages/s  "
+              f"{books * rounds / best:12,.0f} books/s")
+
+
+if __name__ == "__main__":
+    main()
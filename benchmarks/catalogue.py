@@ -0,0 +1,133 @@
+"""
+Synthetic catalogue generator for benchmarks.
+
+Produces books shaped like the scraper output, with skewed title vocabulary,
+a long-tailed price distribution and mostly in-stock availability, and writes
+them as a JSON feed (what file mode loads) and as an NDJSON Mongo dump (what
+the pipeline stores, loadable with `mongoimport --file`).
+
+Usage: python -m benchmarks.catalogue SIZE [OUT_DIR]
+"""
+
+import hashlib
+import itertools
+import json
+import random
+import sys
+from bisect import bisect
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+COMMON_WORDS = [
+    "the", "of", "a", "and", "in", "to", "my", "on", "for", "with", "from", "how",
+    "life", "love", "night", "world", "history", "story", "girl", "house", "secret",
+    "war", "time", "city", "book", "dark", "light", "last", "little", "new", "black",
+    "blood", "heart", "king", "lost", "road", "summer", "water", "wild", "woman",
+]
+SYLLABLES = ["ka", "lo", "mi", "ra", "ten", "vel", "dor", "ish", "an", "ber", "col", "ex", "um", "sta", "qui"]
+
+
+def _vocabulary(size: int, rng: random.Random) -> List[str]:
+    words = list(COMMON_WORDS)
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def generate(size: int, seed: int = 0, vocabulary: int = 5000) -> Iterator[Dict]:
+    """
+    Yield raw feed rows.
+
+    Titles draw 1-8 words from a Zipf-like vocabulary, prices are log-normal
+    around £25 (about 1% missing or malformed), and availability is about 90%
+    "In stock".
+    """
+    rng = random.Random(seed)
+    words = _vocabulary(vocabulary, rng)
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    total = cumulative[-1]
+
+    for i in range(size):
+        n_words = rng.choices((1, 2, 3, 4, 5, 6, 8), weights=(5, 20, 25, 20, 15, 10, 5))[0]
+        title_words = [words[bisect(cumulative, rng.random() * total)] for _ in range(n_words)]
+        title = " ".join(title_words).capitalize()
+        url = f"http://books.toscrape.com/catalogue/{'-'.join(title_words)}_{i}/index.html"
+
+        roll = rng.random()
+        if roll < 0.99:
+            price = f"£{min(max(rng.lognormvariate(3.2, 0.45), 5.0), 250.0):.2f}"
+        elif roll < 0.995:
+            price = ""
+        else:
+            price = "n/a"
+
+        roll = rng.random()
+        if roll < 0.90:
+            availability = "In stock"
+        elif roll < 0.98:
+            availability = "Out of stock"
+        else:
+            availability = f"In stock ({rng.randint(1, 22)} available)"
+
+        yield {
+            "url": url,
+            "price": price,
+            "title": title,
+            "availability": availability,
+            "_id": hashlib.sha256(url.encode("utf-8")).hexdigest(),
+        }
+
+
+def write_feed(rows: Iterator[Dict], path: Path) -> int:
+    """Stream rows to a JSON array file, as the scraper feed export writes it."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for row in rows:
+            if count:
+                f.write(",\n")
+            f.write(json.dumps(row, ensure_ascii=False))
+            count += 1
+        f.write("\n]\n")
+    return count
+
+
+def mongo_documents(rows: Iterator[Dict]) -> Iterator[Dict]:
+    """Rows as the pipeline stores them, with price_num filled in."""
+    from api.utils import parse_price
+
+    for row in rows:
+        yield {**row, "price_num": parse_price(row["price"])}
+
+
+def write_mongo_dump(rows: Iterator[Dict], path: Path) -> int:
+    """Stream pipeline-shaped documents to NDJSON for mongoimport."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for doc in mongo_documents(rows):
+            f.write(json.dumps(doc, ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return 2
+    size = int(sys.argv[1])
+    out = Path(sys.argv[2] if len(sys.argv) > 2 else "benchmarks/data")
+    out.mkdir(parents=True, exist_ok=True)
+
+    write_feed(generate(size), out / f"books_{size}.json")
+    write_mongo_dump(generate(size), out / f"books_{size}.ndjson")
+    print(f"Wrote {size} books to {out}/books_{size}.json and .ndjson")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
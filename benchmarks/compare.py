@@ -0,0 +1,50 @@
+"""
+Compare two benchmark result files.
+
+Prints the median latency of every case present in both runs and exits
+non-zero if any case got slower than the threshold allows.
+
+Usage: python -m benchmarks.compare BASELINE.json CANDIDATE.json [--threshold 0.15]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown, e.g. 0.15 for 15%%")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="Ignore cases faster than this in both runs")
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(args.baseline.read_text())
+    candidate = json.loads(args.candidate.read_text())
+    print(f"{baseline['revision']} -> {candidate['revision']} ({candidate['size']} books)")
+
+    regressions = 0
+    for mode, run in candidate["modes"].items():
+        base_results = baseline["modes"].get(mode, {}).get("results", {})
+        for name, result in run["results"].items():
+            if name not in base_results:
+                continue
+            old, new = base_results[name]["median_ms"], result["median_ms"]
+            if max(old, new) < args.min_ms:
+                continue
+            change = (new - old) / old if old else 0.0
+            flag = ""
+            if change > args.threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"  [{mode}] {name:<70} {old:10.2f} -> {new:10.2f} ms ({change:+.0%}){flag}")
+
+    print(f"{regressions} regression(s) over {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+Load generator replaying dashboard traffic.
+
+Each virtual user behaves like a browser tab on the React dashboard: it loads
+the page (price stats, first /books page, price histogram and title words),
+then picks weighted actions from a scenario file - typing a search with an
+autocomplete request per keystroke and the 300 ms debounce Books.tsx applies,
+paging deep into results, cycling sorts, setting filters and re-bucketing the
+histogram - with think time in between.
+The user keeps its filter/sort/page state across actions, as the UI does.
+
+Reports throughput, latency percentiles and error rate per route.
+
+Usage:
+    python -m benchmarks.loadtest --scenario benchmarks/scenarios/dashboard.json
+        [--url http://localhost:8000] [--concurrency 50] [--duration 60]
+        [--time-scale 1.0] [--out report.json]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+SORTS = ["", "price_asc", "price_desc", "title_asc", "title_desc"]
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(p / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+class Stats:
+    """Latency and error tallies per route."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, route: str, seconds: float, ok: bool) -> None:
+        self.latencies[route].append(seconds * 1000)
+        if not ok:
+            self.errors[route] += 1
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        routes = {}
+        all_latencies: List[float] = []
+        for route, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            all_latencies.extend(values)
+            routes[route] = self._summary(values, self.errors[route], elapsed)
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "total": self._summary(sorted(all_latencies), sum(self.errors.values()), elapsed),
+            "routes": routes,
+        }
+
+    @staticmethod
+    def _summary(values: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+        n = len(values)
+        return {
+            "requests": n,
+            "throughput_rps": round(n / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(errors / n, 4) if n else 0.0,
+            "p50_ms": round(percentile(values, 50), 3),
+            "p90_ms": round(percentile(values, 90), 3),
+            "p99_ms": round(percentile(values, 99), 3),
+            "max_ms": round(values[-1], 3) if values else 0.0,
+        }
+
+
+class VirtualUser:
+    """One dashboard tab, holding the same state as Books.tsx."""
+
+    def __init__(self, client: httpx.AsyncClient, scenario: Dict, stats: Stats, rng: random.Random, time_scale: float):
+        self.client = client
+        self.scenario = scenario
+        self.stats = stats
+        self.rng = rng
+        self.time_scale = time_scale
+        self.state: Dict[str, Any] = {"limit": 10, "offset": 0}
+        self.total = 0
+
+    async def sleep_ms(self, ms: float) -> None:
+        if self.time_scale > 0:
+            await asyncio.sleep(ms / 1000 * self.time_scale)
+
+    async def get(self, path: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        start = time.perf_counter()
+        ok = False
+        data = None
+        try:
+            r = await self.client.get(path, params=params)
+            ok = r.status_code < 400
+            if ok:
+                data = r.json()
+        except httpx.HTTPError:
+            pass
+        self.stats.record(path, time.perf_counter() - start, ok)
+        return data
+
+    async def fetch_books(self) -> None:
+        params = {k: v for k, v in self.state.items() if v not in (None, "")}
+        data = await self.get("/books", params)
+        if data:
+            self.total = data.get("total", 0)
+
+    async def page_load(self, action: Dict) -> None:
+        await asyncio.gather(
+            self.get("/analytics/price-stats"),
+            self.fetch_books(),
+            self.get("/analytics/price-buckets", {"bucket_size": self.rng.choice(action.get("bucket_sizes", [10]))}),
+            self.get("/analytics/title-words", {"top_n": self.rng.choice(action.get("top_n", [10]))}),
+        )
+
+    async def search(self, action: Dict) -> None:
+        term = self.rng.choice(action["terms"])
+        low, high = action.get("keystroke_ms", [80, 350])
+        debounce = action.get("debounce_ms", 300)
+        for i in range(1, len(term) + 1):
+            gap = self.rng.uniform(low, high)
+            await self.sleep_ms(gap)
+            # The search box autocompletes on every keystroke
+            await self.get("/books/suggest", {"prefix": term[:i], "k": 8})
+            # Books.tsx only fires once typing pauses for longer than the debounce
+            if gap >= debounce or i == len(term):
+                self.state.update(q=term[:i], offset=0)
+                await self.fetch_books()
+
+    async def paginate(self, action: Dict) -> None:
+        self.state["limit"] = self.rng.choice(action.get("limit", [10]))
+        low, high = action.get("pages", [1, 5])
+        for _ in range(self.rng.randint(low, high)):
+            if self.total and self.rng.random() < action.get("deep_jump_probability", 0.0):
+                self.state["offset"] = self.rng.randrange(0, max(self.total, 1))
+            else:
+                self.state["offset"] += self.state["limit"]
+            await self.fetch_books()
+            await self.sleep_ms(self.rng.uniform(*action.get("page_ms", [300, 1200])))
+
+    async def sort(self, action: Dict) -> None:
+        self.state.update(sort=self.rng.choice(SORTS), offset=0)
+        await self.fetch_books()
+
+    async def filter(self, action: Dict) -> None:
+        price_min, price_max = self.rng.choice(action.get("price_ranges", [[None, None]]))
+        self.state.update(
+            price_min=price_min,
+            price_max=price_max,
+            availability=self.rng.choice(action.get("availability", [""])),
+            offset=0,
+        )
+        await self.fetch_books()
+
+    async def clear(self, action: Dict) -> None:
+        self.state = {"limit": self.state["limit"], "offset": 0}
+        await self.fetch_books()
+
+    async def rebucket(self, action: Dict) -> None:
+        await self.get("/analytics/price-buckets", {"bucket_size": self.rng.choice(action.get("bucket_sizes", [5, 10, 20]))})
+
+    async def run(self, deadline: float) -> None:
+        actions = self.scenario["actions"]
+        weights = [a.get("weight", 1) for a in actions]
+        think_low, think_high = self.scenario.get("think_time_ms", [500, 2000])
+        await self.page_load(next((a for a in actions if a["type"] == "page_load"), {}))
+        while time.monotonic() < deadline:
+            action = self.rng.choices(actions, weights=weights)[0]
+            await getattr(self, action["type"])(action)
+            await self.sleep_ms(self.rng.uniform(think_low, think_high))
+
+
+async def run(
+    scenario: Dict,
+    url: str,
+    concurrency: int,
+    duration: float,
+    time_scale: float = 1.0,
+    seed: int = 0,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> Dict[str, Any]:
+    """Run the scenario with concurrency virtual users for duration seconds."""
+    stats = Stats()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0, transport=transport) as client:
+        start = time.monotonic()
+        deadline = start + duration
+        users = [
+            VirtualUser(client, scenario, stats, random.Random(seed + i), time_scale)
+            for i in range(concurrency)
+        ]
+        await asyncio.gather(*(u.run(deadline) for u in users))
+        elapsed = time.monotonic() - start
+    report = stats.report(elapsed)
+    report.update(scenario=scenario.get("name"), concurrency=concurrency, url=url)
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"Scenario {report['scenario']} with {report['concurrency']} users for {report['elapsed_s']} s")
+    header = f"  {'route':<28}{'reqs':>8}{'rps':>9}{'err%':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    for route, s in list(report["routes"].items()) + [("TOTAL", report["total"])]:
+        print(
+            f"  {route:<28}{s['requests']:>8}{s['throughput_rps']:>9.1f}{s['error_rate'] * 100:>7.2f}"
+            f"{s['p50_ms']:>9.1f}{s['p90_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay dashboard traffic against a running API.")
+    parser.add_argument("--scenario", type=Path, default=Path(__file__).parent / "scenarios" / "dashboard.json")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiplier for think/typing time; 0 disables it")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=None, help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    scenario = json.loads(args.scenario.read_text())
+    report = asyncio.run(run(scenario, args.url, args.concurrency, args.duration, args.time_scale, args.seed))
+    print_report(report)
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2))
+    return 1 if report["total"]["error_rate"] > scenario.get("max_error_rate", 0.01) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""
+Endpoint benchmark suite.
+
+Generates a synthetic catalogue, serves it through the API in file mode,
+SQLite mode and Mongo mode, times every endpoint and /books filter/sort combination, and
+writes the results as JSON for comparison between commits
+(see benchmarks/compare.py).
+
+Mongo mode uses a real server when --mongo-url is given (the benchmark
+database is dropped and refilled) and falls back to mongomock otherwise.
+mongomock is fine for checking the suite runs but its timings say little
+about a real mongod.
+
+Usage:
+    python -m benchmarks.run --size 10000 [--modes file sqlite mongo] [--repeat 5]
+                             [--quick] [--mongo-url URL] [--out benchmarks/results]
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from fastapi.testclient import TestClient
+
+import api.db
+import api.main
+from api import config
+from benchmarks.catalogue import generate, mongo_documents, write_feed
+
+Case = Tuple[str, str, Dict]
+
+
+def cases(size: int, quick: bool = False) -> List[Case]:
+    """Every endpoint, plus the /books filter, sort and paging matrix."""
+    qs = [None, "the", "zzqx"] if not quick else [None, "the"]
+    availabilities = [None, "in stock"]
+    prices = [None, (20.0, 30.0)]
+    sorts = [None, "price_asc", "price_desc", "title_asc", "title_desc"] if not quick else [None, "price_asc"]
+    offsets = [0, max(size - 100, 0)] if not quick else [0]
+
+    out: List[Case] = []
+    for q, availability, price, sort, offset in itertools.product(qs, availabilities, prices, sorts, offsets):
+        params = {"limit": 20, "offset": offset}
+        if q:
+            params["q"] = q
+        if availability:
+            params["availability"] = availability
+        if price:
+            params["price_min"], params["price_max"] = price
+        if sort:
+            params["sort"] = sort
+        name = "books " + " ".join(f"{k}={v}" for k, v in params.items())
+        out.append((name, "/books", params))
+
+    out += [
+        ("books facets=availability,price", "/books", {"limit": 20, "facets": "availability,price"}),
+        ("books q=the facets=availability,price", "/books", {"limit": 20, "q": "the", "facets": "availability,price"}),
+        ("books q=the match=fuzzy", "/books", {"limit": 20, "q": "the", "match": "fuzzy"}),
+        ("books q=lgiht match=fuzzy", "/books", {"limit": 20, "q": "lgiht", "match": "fuzzy"}),
+        ("books suggest prefix=t", "/books/suggest", {"prefix": "t"}),
+        ("books suggest prefix=the l by=popularity", "/books/suggest", {"prefix": "the l", "by": "popularity"}),
+        ("analytics availability", "/analytics/availability", {}),
+        ("analytics price-stats", "/analytics/price-stats", {}),
+        ("analytics price-buckets size=1", "/analytics/price-buckets", {"bucket_size": 1}),
+        ("analytics price-buckets size=10", "/analytics/price-buckets", {"bucket_size": 10}),
+        ("analytics title-words top=10", "/analytics/title-words", {"top_n": 10}),
+        ("analytics title-words top=100", "/analytics/title-words", {"top_n": 100}),
+        ("analytics price-stats q=the", "/analytics/price-stats", {"q": "the"}),
+        ("analytics price-buckets size=10 availability=in stock", "/analytics/price-buckets",
+         {"bucket_size": 10, "availability": "in stock"}),
+        ("analytics title-words top=10 price=20-30", "/analytics/title-words", {"top_n": 10, "price_min": 20, "price_max": 30}),
+        ("analytics price-quantiles", "/analytics/price-quantiles", {"approx": "false"}),
+        ("analytics distinct-titles", "/analytics/distinct-titles", {}),
+        ("analytics approx price-quantiles", "/analytics/price-quantiles", {}),
+        ("analytics approx price-buckets size=1", "/analytics/price-buckets", {"bucket_size": 1, "approx": "true"}),
+        ("analytics approx title-words top=100", "/analytics/title-words", {"top_n": 100, "approx": "true"}),
+        ("analytics approx distinct-titles", "/analytics/distinct-titles", {"approx": "true"}),
+        ("analytics dedupe availability", "/analytics/availability", {"dedupe": "true"}),
+        ("analytics dedupe price-stats availability=in stock", "/analytics/price-stats",
+         {"dedupe": "true", "availability": "in stock"}),
+        ("analytics dedupe title-words top=10", "/analytics/title-words", {"top_n": 10, "dedupe": "true"}),
+    ]
+    return out
+
+
+def _set_mode(use_mongo: bool, use_sqlite: bool = False) -> None:
+    for module in (api.db, api.main):
+        module.USE_MONGO = use_mongo
+        module.USE_SQLITE = use_sqlite
+    api.db.reload_books()
+
+
+@contextmanager
+def file_mode(feed: Path) -> Iterator[None]:
+    original = api.db.DATA_PATH, api.db.USE_MONGO, api.db.USE_SQLITE
+    api.db.DATA_PATH = feed
+    _set_mode(False)
+    try:
+        yield
+    finally:
+        api.db.DATA_PATH = original[0]
+        _set_mode(*original[1:])
+
+
+@contextmanager
+def sqlite_mode(feed: Path) -> Iterator[None]:
+    """SQLite mode over a store built from feed by the first request."""
+    original = api.db.DATA_PATH, api.db.SQLITE_PATH, api.db.USE_MONGO, api.db.USE_SQLITE
+    api.db.DATA_PATH = feed
+    api.db.SQLITE_PATH = feed.with_suffix(".sqlite")
+    _set_mode(False, True)
+    try:
+        yield
+    finally:
+        api.db.DATA_PATH, api.db.SQLITE_PATH = original[:2]
+        _set_mode(*original[2:])
+
+
+@contextmanager
+def mongo_mode(size: int, seed: int, mongo_url: Optional[str]) -> Iterator[str]:
+    if mongo_url:
+        import pymongo
+        client = pymongo.MongoClient(mongo_url)
+        backend = "mongod"
+    else:
+        import mongomock
+        client = mongomock.MongoClient()
+        backend = "mongomock"
+    coll = client["books_bench"]["books"]
+    coll.drop()
+    batch = []
+    for doc in mongo_documents(generate(size, seed)):
+        batch.append(doc)
+        if len(batch) == 10_000:
+            coll.insert_many(batch)
+            batch = []
+    if batch:
+        coll.insert_many(batch)
+    for field in ("price_num", "title", "availability"):
+        coll.create_index(field)
+    coll.create_index("url", unique=True)
+
+    original = api.db.get_collection, api.db.USE_MONGO, api.db.USE_SQLITE
+    api.db.get_collection = lambda *args, **kwargs: coll
+    _set_mode(True)
+    try:
+        yield backend
+    finally:
+        api.db.get_collection = original[0]
+        _set_mode(*original[1:])
+        if mongo_url:
+            client["books_bench"].drop_collection("books")
+        client.close()
+
+
+def time_case(client: TestClient, path: str, params: Dict, repeat: int) -> Dict:
+    timings = []
+    for _ in range(repeat):
+        # Time the computation, not result cache hits
+        api.main.analytics_cache.clear()
+        api.main.precomputed.clear()
+        api.main.books_cache.clear()
+        api.main.export_cache.clear()
+        start = time.perf_counter()
+        r = client.get(path, params=params)
+        timings.append((time.perf_counter() - start) * 1000)
+        r.raise_for_status()
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "min_ms": round(timings[0], 3),
+        "status": r.status_code,
+    }
+
+
+def time_import(mode: str, repeat: int) -> Dict:
+    """Import time of api.main in a fresh interpreter, as a new worker pays it."""
+    code = "import time; t = time.perf_counter(); import api.main; print(time.perf_counter() - t)"
+    env = {**os.environ, "USE_MONGO": str(mode == "mongo").lower(), "USE_SQLITE": str(mode == "sqlite").lower()}
+    timings = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env)
+        timings.append(float(out.stdout.strip().splitlines()[-1]) * 1000)
+    return {"median_ms": round(statistics.median(timings), 3), "min_ms": round(min(timings), 3)}
+
+
+def time_ready() -> Dict:
+    """Time from app startup until /ready, with the dataset and caches cold."""
+    api.db.reload_books()
+    api.main.analytics_cache.clear()
+    api.main.precomputed.clear()
+    api.main.books_cache.clear()
+    start = time.perf_counter()
+    with TestClient(api.main.app) as client:
+        api.main.warmup.wait()
+        elapsed = (time.perf_counter() - start) * 1000
+        status = client.get("/ready").json()
+    return {"median_ms": round(elapsed, 3), "stages_s": status["stages"]}
+
+
+def run_mode(mode: str, size: int, repeat: int, quick: bool) -> Dict[str, Dict]:
+    client = TestClient(api.main.app)
+    results = {}
+
+    # First request pays for loading the dataset in file mode, or building the store in SQLite mode
+    start = time.perf_counter()
+    client.get("/books", params={"limit": 1}).raise_for_status()
+    results["first request"] = {"median_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+    for name, path, params in cases(size, quick):
+        results[name] = time_case(client, path, params, repeat)
+        print(f"  [{mode}] {name:<70} {results[name]['median_ms']:10.2f} ms")
+
+    # Startup: importing the app, then warming up until /ready
+    results["startup import"] = time_import(mode, repeat)
+    results["startup ready"] = time_ready()
+    for name in ("startup import", "startup ready"):
+        print(f"  [{mode}] {name:<70} {results[name]['median_ms']:10.2f} ms")
+    return results
+
+
+def _git_revision() -> str:
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD"]) != 0
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark every API endpoint in file, SQLite and Mongo mode.")
+    parser.add_argument("--size", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--modes", nargs="+", default=["file", "sqlite", "mongo"], choices=["file", "sqlite", "mongo"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="Smaller filter/sort matrix")
+    parser.add_argument("--mongo-url", default=None)
+    parser.add_argument("--out", type=Path, default=Path("benchmarks/results"))
+    args = parser.parse_args(argv)
+
+    # Keep the slow-query log from running explain() in the middle of timings,
+    # and per-request log lines out of the report
+    config.SLOW_QUERY_MS = float("inf")
+    for name in ("httpx", "api.main"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    revision = _git_revision()
+    report = {
+        "revision": revision,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "size": args.size,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "modes": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        feed = Path(tmp) / "books.json"
+        write_feed(generate(args.size, args.seed), feed)
+
+        if "file" in args.modes:
+            with file_mode(feed):
+                report["modes"]["file"] = {"backend": "file", "results": run_mode("file", args.size, args.repeat, args.quick)}
+        if "sqlite" in args.modes:
+            with sqlite_mode(feed):
+                report["modes"]["sqlite"] = {"backend": "sqlite", "results": run_mode("sqlite", args.size, args.repeat, args.quick)}
+        if "mongo" in args.modes:
+            with mongo_mode(args.size, args.seed, args.mongo_url) as backend:
+                report["modes"]["mongo"] = {"backend": backend, "results": run_mode("mongo", args.size, args.repeat, args.quick)}
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    path = args.out / f"{revision}-{args.size}.json"
+    path.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
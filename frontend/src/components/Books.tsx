@@ -22,6 +22,7 @@ export default function Books() {
 
     // Debounced search input - prevents excessive API calls while user types
     const [qInput, setQInput] = useState<string>("");
+    const [suggestions, setSuggestions] = useState<string[]>([]);
 
     // Cycle through sort states: none -> asc -> desc -> none
     function cycleSort(current: typeof sort, field: "price" | "title") {
@@ -46,7 +47,8 @@ export default function Books() {
                 limit, 
                 offset,
         };
-        if (q) params.q = q;
+        // Typo-tolerant search, best matches first unless a sort is chosen
+        if (q) { params.q = q; params.match = "fuzzy"; }
         if (priceMin !== undefined) params.price_min = priceMin;
         if (priceMax !== undefined) params.price_max = priceMax;
         if (availability) params.availability = availability;
@@ -60,7 +62,8 @@ export default function Books() {
             setLoading(true);
             setError(null);
 
-            const params = buildAPIParams();
+            // Availability counts for the current filter come back with the page
+            const params = { ...buildAPIParams(), facets: "availability" };
             const res = await bookAPI.getBooks(params);
             setData(res.data);
         } catch (e) {
@@ -71,6 +74,12 @@ export default function Books() {
         } 
     }
 
+    // Facet count suffix for a filter option, e.g. " (42)"
+    function facetCount(label: string) {
+        const bucket = data?.facets?.availability?.find((b) => b.label === label);
+        return bucket ? ` (${bucket.count})` : "";
+    }
+
     // Helper to parse URL parameters as numbers
     function numOrUndef(v: string | null) {
         if (v === null || v === "") return undefined
@@ -106,6 +115,20 @@ export default function Books() {
         setQInput(q);
     }, [q]);
 
+    // Autocomplete on every keystroke from the cheap suggest index
+    useEffect(() => {
+        const prefix = qInput.trim();
+        if (!prefix) {
+            setSuggestions([]);
+            return;
+        }
+        let cancelled = false;
+        bookAPI.getSuggestions(prefix, 8)
+            .then((res) => { if (!cancelled) setSuggestions(res.data.titles.map((s) => s.text)); })
+            .catch(() => { if (!cancelled) setSuggestions([]); });
+        return () => { cancelled = true; };
+    }, [qInput]);
+
     // Debounced search: wait 300ms after user stops typing to trigger search
     useEffect( () => {
         const t = setTimeout( () => {
@@ -262,10 +285,14 @@ export default function Books() {
                 <div className="grid grid-cols-2 sm:grid-cols-3 lg:grid-cols-6 gap-3">
                     <input
                         placeholder="Search Title"
+                        list="title-suggestions"
                         value={qInput}
                         onChange={(e) => { setOffset(0); setQInput(e.target.value); }}
                         className="min-w-[100px] border border-gray-300 rounded-md px-3 py-2 text-sm focus:ring-2 focus:ring-violet-500 focus:border-violet-500 outline-none transition-colors"
                     />
+                    <datalist id="title-suggestions">
+                        {suggestions.map((text) => <option key={text} value={text} />)}
+                    </datalist>
                     <input 
                         placeholder="Min price"
                         type="number"
@@ -286,8 +313,8 @@ export default function Books() {
                         className="min-w-[100px] border border-gray-300 rounded-md px-3 py-2 text-sm bg-white focus:ring-2 focus:ring-violet-500 focus:border-violet-500 outline-none transition-colors"
                     >
                         <option value="">Any Availability</option>
-                        <option value="in stock">In Stock</option>
-                        <option value="out of stock">Out of Stock</option>
+                        <option value="in stock">In Stock{facetCount("in stock")}</option>
+                        <option value="out of stock">Out of Stock{facetCount("out of stock")}</option>
                     </select>
                     <select 
                         value={sort}
@@ -1,5 +1,5 @@
 import axios from "axios";
-import { type PriceStats, type AvailabilityResponse, type PriceBucketResponse, type BooksResponse, type WordsResponse } from "../types";
+import { type PriceStats, type AvailabilityResponse, type PriceBucketResponse, type BooksResponse, type WordsResponse, type SuggestResponse } from "../types";
 
 // API configuration with environment-based URL
 const API_BASE_URL = import.meta.env.VITE_API_URL || '/api';
@@ -21,8 +21,15 @@ export const bookAPI = {
     price_max?: number;
     availability?: string;
     sort?: "price_asc" | "price_desc" | "title_asc" | "title_desc" ;
+    facets?: string;
+    facet_bucket_size?: number;
+    match?: "substring" | "fuzzy";
     }) => api.get<BooksResponse>('/books', { params }),
 
+    // Autocomplete titles and title words for a search prefix
+    getSuggestions: (prefix: string, k = 10, by: "title" | "popularity" = "title") =>
+        api.get<SuggestResponse>("/books/suggest", { params: { prefix, k, by } }),
+
     // Get availability statistics
     getAvailability: () => api.get<AvailabilityResponse>("/analytics/availability"),
 
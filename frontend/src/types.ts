@@ -12,7 +12,26 @@ export type Book = {
 
 export type BooksResponse = {
     total: number;
-    items: Book[]
+    items: Book[];
+    facets?: BookFacets | null;
+}
+
+// Facet counts returned by /books?facets=...
+export type BookFacets = {
+    availability?: AvailabilityBucket[];
+    price?: PriceBucket[];
+}
+
+// Autocomplete types
+export type Suggestion = {
+    text: string;
+    count: number;
+}
+
+export type SuggestResponse = {
+    prefix: string;
+    titles: Suggestion[];
+    words: Suggestion[];
 }
 
 // Price analytics types
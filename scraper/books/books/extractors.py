@@ -0,0 +1,149 @@
+"""
+Listing-page extractors for BookSpider.
+
+An extractor turns the HTML of a catalogue listing page into the fields of
+one BooksItem per `article.product_pod`, plus the absolute URL of the next
+page. Both extractors produce identical results (tests/test_extractors.py
+checks this over saved pages):
+
+- "css": the original Scrapy CSS selectors, run through parsel. Every query
+  builds Selector objects, and there are five queries per book.
+- "lxml": one lxml parse, then a single walk over each product_pod that
+  matches the same elements by tag and class, with no selector objects or
+  XPath evaluation. It is the default; lxml ships with Scrapy. Compare the
+  two with benchmarks/bench_scraper.py.
+
+Pick one with the BOOK_EXTRACTOR setting or `scrapy crawl book -a extractor=css`.
+"""
+from typing import Callable, Dict, List, NamedTuple, Optional
+from urllib.parse import urljoin
+
+
+class ListingPage(NamedTuple):
+    books: List[Dict[str, Optional[str]]]
+    next_page: Optional[str]
+
+
+Extractor = Callable[[str, str], ListingPage]
+
+
+def _book(base_url: str, href: Optional[str], title: Optional[str], price: Optional[str], availability: List[str]):
+    return {
+        "url": urljoin(base_url, href) if href is not None else None,
+        "price": price.strip() if price is not None else None,
+        "title": title.strip() if title is not None else None,
+        "availability": " ".join(part.strip() for part in availability if part.strip()),
+    }
+
+
+def extract_css(text: str, base_url: str) -> ListingPage:
+    """
+    Extract books with Scrapy's CSS selectors.
+
+    Args:
+        text: Page HTML
+        base_url: URL the page was fetched from, for resolving links
+
+    Returns:
+        ListingPage with one dict of BooksItem fields per book, and the next page URL if any
+    """
+    from parsel import Selector
+
+    page = Selector(text=text)
+    books = [
+        _book(
+            base_url,
+            book.css("h3 a::attr(href)").get(),
+            book.css("h3 a::attr(title)").get(),
+            book.css("div.product_price p.price_color::text").get(),
+            book.css("p.instock.availability::text").getall(),
+        )
+        for book in page.css("article.product_pod")
+    ]
+    next_page = page.css("li.next a::attr(href)").get()
+    return ListingPage(books, urljoin(base_url, next_page) if next_page else None)
+
+
+def _has_class(el, name: str) -> bool:
+    return name in (el.get("class") or "").split()
+
+
+def _texts(el) -> List[str]:
+    """The text nodes directly inside el, as CSS ::text selects them."""
+    texts = [el.text] if el.text is not None else []
+    texts.extend(child.tail for child in el if child.tail is not None)
+    return texts
+
+
+def _first_link(el, attr: str) -> Optional[str]:
+    for a in el.iter("a"):
+        value = a.get(attr)
+        if value is not None:
+            return value
+    return None
+
+
+def extract_lxml(text: str, base_url: str) -> ListingPage:
+    """
+    Extract books in a single pass over an lxml tree; same arguments and results as extract_css.
+
+    Each product_pod's subtree is walked once, matching the same elements as
+    the CSS selectors by tag and class.
+    """
+    from lxml import etree
+
+    # Parsed as parsel does, so both extractors see the same tree
+    root = etree.fromstring(text.encode("utf-8"), parser=etree.HTMLParser(recover=True, encoding="utf-8"))
+    if root is None:
+        return ListingPage([], None)
+    books = []
+    for article in root.iter("article"):
+        if not _has_class(article, "product_pod"):
+            continue
+        href = title = price = None
+        availability: List[str] = []
+        for el in article.iter("h3", "div", "p"):
+            tag = el.tag
+            if tag == "h3":
+                # h3 a::attr(href), h3 a::attr(title)
+                href = href if href is not None else _first_link(el, "href")
+                title = title if title is not None else _first_link(el, "title")
+            elif tag == "div":
+                # div.product_price p.price_color::text
+                if price is None and _has_class(el, "product_price"):
+                    for p in el.iter("p"):
+                        texts = _texts(p) if _has_class(p, "price_color") else None
+                        if texts:
+                            price = texts[0]
+                            break
+            elif _has_class(el, "instock") and _has_class(el, "availability"):
+                # p.instock.availability::text
+                availability.extend(_texts(el))
+        books.append(_book(base_url, href, title, price, availability))
+
+    next_page = None
+    for li in root.iter("li"):
+        if _has_class(li, "next"):
+            next_page = _first_link(li, "href")
+            if next_page is not None:
+                break
+    return ListingPage(books, urljoin(base_url, next_page) if next_page else None)
+
+
+EXTRACTORS: Dict[str, Extractor] = {
+    "css": extract_css,
+    "lxml": extract_lxml,
+}
+
+
+def get_extractor(name: Optional[str]) -> Extractor:
+    """
+    Look up an extractor by name; None gives the default, lxml.
+
+    Raises:
+        ValueError: If no extractor has that name
+    """
+    try:
+        return EXTRACTORS[name or "lxml"]
+    except KeyError:
+        raise ValueError(f"Unknown book extractor {name!r}; choose one of {', '.join(EXTRACTORS)}") from None
@@ -6,4 +6,5 @@ class BooksItem(scrapy.Item):
     price = scrapy.Field()
     title = scrapy.Field()
     availability = scrapy.Field()
-    price_num = scrapy.Field()
\ No newline at end of file
+    price_num = scrapy.Field()
+    cluster_id = scrapy.Field()
\ No newline at end of file
@@ -1,30 +1,69 @@
 import hashlib
+import json
+from pathlib import Path
+
 import pymongo
-import re
 from itemadapter import ItemAdapter
 
+# Shared with the API so stored price_num, sketches and clusters match it; the
+# repository root must be on PYTHONPATH, as the scraper image sets it
+from api.utils import find_price
+from api.sketches import SketchSet
+from api.dedup import NearDuplicateIndex
+
 class MongoPipeline:
     COLLECTION_NAME = "books"
+    SKETCH_COLLECTION = "analytics_sketches"
+    VERSION_COLLECTION = "dataset_versions"
 
-    def __init__(self, mongo_uri, mongo_db):
+    def __init__(self, mongo_uri, mongo_db, sketches_path=None):
         self.mongo_uri = mongo_uri
         self.mongo_db = mongo_db
+        self.sketches_path = sketches_path
         self.client = None
         self.db = None
+        self.sketches = SketchSet()
+        # Near-duplicate clusters, seeded with those already stored; each book's cluster_id is its cluster's first book
+        self.clusters = NearDuplicateIndex()
 
     @classmethod
     def from_crawler(cls, crawler):
         return cls(
             mongo_uri=crawler.settings.get("MONGO_URI"),
             mongo_db=crawler.settings.get("MONGO_DATABASE"),
+            sketches_path=crawler.settings.get("SKETCHES_PATH"),
         )
 
     def open_spider(self, spider):
         self.client = pymongo.MongoClient(self.mongo_uri)
         self.db = self.client[self.mongo_db]
         self.db[self.COLLECTION_NAME].create_index("url")
+        self.db[self.COLLECTION_NAME].create_index("cluster_id")
+        # Books from earlier crawls lead their clusters, so re-scraped near-duplicates join them
+        leaders = {"$expr": {"$eq": ["$cluster_id", "$_id"]}}
+        for doc in self.db[self.COLLECTION_NAME].find(leaders, {"title": 1}):
+            self.clusters.seed(doc["_id"], doc.get("title"))
 
     def close_spider(self, spider):
+        # Store the analytics sketches built during the crawl next to the data:
+        # in Mongo beside the books collection, and beside the JSON feed
+        if self.db is not None:
+            coll = self.db[self.COLLECTION_NAME]
+            if self.sketches.books != coll.count_documents({}):
+                # A partial or incremental crawl only saw some of the books: sketch the whole collection
+                self.sketches = SketchSet()
+                for d in coll.find({}, {"title": 1, "price_num": 1, "availability": 1}):
+                    self.sketches.update(d.get("title"), d.get("price_num"), d.get("availability"))
+            self.db[self.SKETCH_COLLECTION].replace_one(
+                {"_id": self.COLLECTION_NAME}, self.sketches.to_dict(), upsert=True
+            )
+            # Tells the API the collection changed, so it drops results cached under the old version
+            self.db[self.VERSION_COLLECTION].update_one(
+                {"_id": self.COLLECTION_NAME}, {"$inc": {"version": 1}}, upsert=True
+            )
+        data = self.sketches.to_dict()
+        if self.sketches_path:
+            Path(self.sketches_path).write_text(json.dumps(data), encoding="utf-8")
         if self.client:
             self.client.close()
 
@@ -33,23 +72,13 @@ class MongoPipeline:
         adapter = ItemAdapter(item)
 
 
-        raw = adapter.get("price", "")
-        price_num = None
-        if isinstance(raw, (int, float)):
-            price_num = float(raw)
-        elif isinstance(raw, str):
-            s = raw.replace(",", "")
-            m = re.search(r"\d+(\.\d+)?", s)
-            if m:
-                try:
-                    price_num = float(m.group(0))
-                except ValueError:
-                    price_num = None
-        adapter["price_num"] = price_num
+        adapter["price_num"] = find_price(adapter.get("price"))
 
         url = adapter["url"]
         _id = hashlib.sha256(url.encode("utf-8")).hexdigest()
         adapter["_id"] = _id
+        adapter["cluster_id"] = self.clusters.add(_id, adapter.get("title"))
+        self.sketches.update(adapter.get("title"), adapter["price_num"], adapter.get("availability"))
 
         self.db[self.COLLECTION_NAME].update_one(
             {"_id": _id},
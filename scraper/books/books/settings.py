@@ -46,6 +46,9 @@ DOWNLOAD_DELAY = 1
 #    "scrapy.extensions.telnet.TelnetConsole": None,
 #}
 
+# Listing-page parser: "lxml" (single pass, default) or "css" (Scrapy selectors); see books/extractors.py
+BOOK_EXTRACTOR = os.getenv("BOOK_EXTRACTOR", "lxml")
+
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 
@@ -83,6 +86,9 @@ FEED_EXPORT_ENCODING = "utf-8"
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 MONGO_DATABASE = os.getenv("MONGO_DATABASE", "books_db")
 
+# Analytics sketches written beside the feed at the end of a crawl
+SKETCHES_PATH = "../../data/sample_run.sketches.json"
+
 LOG_LEVEL = "INFO"
 #LOG_FILE = "book_scraper.log"
 LOG_ENABLED = True
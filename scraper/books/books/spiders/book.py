@@ -1,5 +1,6 @@
 import scrapy
 
+from books.extractors import get_extractor
 from books.items import BooksItem
 
 
@@ -8,6 +9,13 @@ class BookSpider(scrapy.Spider):
     allowed_domains = ["books.toscrape.com"]
     start_urls = ["http://books.toscrape.com/"]
 
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        # `-a extractor=css` overrides the BOOK_EXTRACTOR setting
+        spider.extract = get_extractor(kwargs.get("extractor") or crawler.settings.get("BOOK_EXTRACTOR"))
+        return spider
+
     def start_requests(self):
         for url in self.start_urls:
             yield scrapy.Request(
@@ -23,20 +31,12 @@ class BookSpider(scrapy.Spider):
         @returns request 1 50
         @scrapes url title price
         """
-        for book in response.css("article.product_pod"):
-            item = BooksItem()
-            item['url'] = response.urljoin(book.css("h3 a::attr(href)").get())
-            item['price'] = book.css("div.product_price p.price_color::text").get().strip()
-            item['title'] = book.css("h3 a::attr(title)").get().strip()
-
-            availability_parts = book.css("p.instock.availability::text").getall()
-            item["availability"] = " ".join(part.strip() for part in availability_parts if part.strip())
-            
-            yield item
-
-        next_page = response.css("li.next a::attr(href)").get()
-        if next_page:
-            next_page_url = response.urljoin(next_page)
+        page = self.extract(response.text, response.url)
+        for fields in page.books:
+            yield BooksItem(**fields)
+
+        if page.next_page:
+            next_page_url = page.next_page
             self.logger.info(
                 f"Navigating to next page with URL {next_page_url}."
             )
@@ -0,0 +1,53 @@
+"""
+Database setup script: assigns near-duplicate cluster_id fields and indexes them.
+Run once for collections loaded before the scraper pipeline set cluster_id,
+or after changing DEDUP_THRESHOLD.
+"""
+
+import os
+import pymongo
+import sys
+
+#Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from api.dedup import NearDuplicateIndex
+
+#Database configuration
+MONGO_URI = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+DB_NAME = os.getenv("MONGODB_DB", "books_db")
+COLLECTION_NAME = os.getenv("MONGODB_COLLECTION", "books")
+VERSION_COLLECTION = os.getenv("MONGODB_VERSION_COLLECTION", "dataset_versions")
+BATCH_SIZE = 1000
+
+def main():
+    client = pymongo.MongoClient(MONGO_URI)
+    db = client[DB_NAME]
+    coll = db[COLLECTION_NAME]
+
+    print("Assigning cluster_id to all documents")
+
+    index = NearDuplicateIndex()
+    updates = []
+    updated = 0
+    for doc in coll.find({}, {"_id": 1, "title": 1}):
+        cluster_id = index.add(doc["_id"], doc.get("title"))
+        updates.append(pymongo.UpdateOne({"_id": doc["_id"]}, {"$set": {"cluster_id": cluster_id}}))
+        if len(updates) == BATCH_SIZE:
+            coll.bulk_write(updates, ordered=False)
+            updated += len(updates)
+            updates = []
+    if updates:
+        coll.bulk_write(updates, ordered=False)
+        updated += len(updates)
+
+    print(f"Updated {updated} documents in {len(index)} clusters.")
+
+    coll.create_index("cluster_id")
+
+    print("Index created")
+
+    # Deduplicated results cached by the API were computed from the old clusters
+    db[VERSION_COLLECTION].update_one({"_id": COLLECTION_NAME}, {"$inc": {"version": 1}}, upsert=True)
+
+if __name__ == "__main__":
+    main()
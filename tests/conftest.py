@@ -6,24 +6,62 @@ from fastapi.testclient import TestClient
 os.environ["USE_MONGO"] = "false"
 
 import api.db
-api.db.load_books.cache_clear()
+api.db.reload_books()
 
+import api.main
 from api.main import app 
+from api.models import Book
 
 
 @pytest.fixture
 def sample_books():
     return [
-        {"id": "1", "title": "The Cat",              "url": "u1", "price": 10.0, "availability": "In stock"},
-        {"id": "2", "title": "Dog Days",             "url": "u2", "price": 25.5, "availability": "In stock"},
-        {"id": "3", "title": "Bird Box",             "url": "u3", "price": 40.0, "availability": "Out of stock"},
-        {"id": "4", "title": "Another Cat Tale",     "url": "u4", "price": None, "availability": "In stock"},
+        Book(id="1", title="The Cat",              url="u1", price=10.0, availability="In stock"),
+        Book(id="2", title="Dog Days",             url="u2", price=25.5, availability="In stock"),
+        Book(id="3", title="Bird Box",             url="u3", price=40.0, availability="Out of stock"),
+        Book(id="4", title="Another Cat Tale",     url="u4", price=None, availability="In stock"),
     ]
 
 @pytest.fixture(autouse=True)
 def patch_loader(monkeypatch, sample_books):
     monkeypatch.setattr("api.main.load_books", lambda: sample_books, raising=True)
+    # Tests swap datasets without bumping the dataset version
+    api.main.analytics_cache.clear()
+    api.main.precomputed.clear()
+    api.main.books_cache.clear()
+    api.main.export_cache.clear()
 
 @pytest.fixture
 def client():
-    return TestClient(app)
\ No newline at end of file
+    return TestClient(app)
+
+@pytest.fixture
+def mongo_books(monkeypatch, sample_books):
+    """Serve sample_books from an in-memory mongomock collection in Mongo mode."""
+    mongomock = pytest.importorskip("mongomock")
+    coll = mongomock.MongoClient()["books_db"]["books"]
+    coll.insert_many([
+        {"_id": b.id, "url": b.url, "title": b.title, "price": None if b.price is None else f"£{b.price:.2f}",
+         "price_num": b.price, "availability": b.availability}
+        for b in sample_books
+    ])
+    monkeypatch.setattr("api.db.get_collection", lambda *args, **kwargs: coll)
+    monkeypatch.setattr("api.db.USE_MONGO", True)
+    monkeypatch.setattr("api.main.USE_MONGO", True)
+    return coll
+
+@pytest.fixture
+def sqlite_books(monkeypatch, tmp_path, sample_books):
+    """Serve sample_books from a SQLite store in a temporary directory in SQLite mode."""
+    path = tmp_path / "books.sqlite"
+    api.db.build_sqlite(sample_books, path)
+    monkeypatch.setattr("api.db.SQLITE_PATH", path)
+    monkeypatch.setattr("api.db.DATA_PATH", tmp_path / "no-feed.json")
+    for module in ("api.db", "api.main"):
+        monkeypatch.setattr(f"{module}.USE_SQLITE", True)
+        monkeypatch.setattr(f"{module}.USE_MONGO", False)
+    api.main.analytics_cache.clear()
+    api.main.precomputed.clear()
+    api.main.books_cache.clear()
+    api.main.export_cache.clear()
+    return path
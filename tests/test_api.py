@@ -1,3 +1,8 @@
+from api import slowlog
+from api.db import list_books_faceted_mongo
+from api.main import analytics_cache
+from api.models import Book
+
 # Test helper functions
 def get_items(response):
     data = response.json()
@@ -83,10 +88,10 @@ def test_book_pricemin_greater_than_pricemax(client):
 # Analytics tests
 def test_price_buckets_tiny_and_large(client, monkeypatch):
     custom = [
-        {"id": "a", "title": "A", "url": "ua", "price": 0.0,  "availability": "in stock"},
-        {"id": "b", "title": "B", "url": "ub", "price": 5.0,  "availability": "in stock"},
-        {"id": "c", "title": "C", "url": "uc", "price": 10.0, "availability": "in stock"},
-        {"id": "d", "title": "D", "url": "ud", "price": 15.0, "availability": "in stock"},
+        Book(id="a", title="A", url="ua", price=0.0,  availability="in stock"),
+        Book(id="b", title="B", url="ub", price=5.0,  availability="in stock"),
+        Book(id="c", title="C", url="uc", price=10.0, availability="in stock"),
+        Book(id="d", title="D", url="ud", price=15.0, availability="in stock"),
     ]
     
     monkeypatch.setattr("api.main.load_books", lambda: custom,  raising=True)
@@ -108,9 +113,9 @@ def test_price_buckets_tiny_and_large(client, monkeypatch):
 
 def test_title_words_top1_with_punctuation(client, monkeypatch):
     custom = [
-        {"id": "1", "title": "Cats & Dogs!!!",       "url": "u1", "price": 12.0, "availability": "in stock"},
-        {"id": "2", "title": "Cats: A Tale",         "url": "u2", "price": 9.0,  "availability": "in stock"},
-        {"id": "3", "title": "Dogs? Yes, dogs.",     "url": "u3", "price": 7.0,  "availability": "in stock"},
+        Book(id="1", title="Cats & Dogs!!!",       url="u1", price=12.0, availability="in stock"),
+        Book(id="2", title="Cats: A Tale",         url="u2", price=9.0,  availability="in stock"),
+        Book(id="3", title="Dogs? Yes, dogs.",     url="u3", price=7.0,  availability="in stock"),
     ]
     monkeypatch.setattr("api.main.load_books", lambda: custom, raising=True)
 
@@ -119,4 +124,86 @@ def test_title_words_top1_with_punctuation(client, monkeypatch):
     data = r.json()
     assert "top" in data and len(data["top"]) == 1
     assert data["top"][0]["word"] == "dogs"
-    assert data["top"][0]["count"] == 3
\ No newline at end of file
+    assert data["top"][0]["count"] == 3
+
+def test_books_facets_follow_the_filter(client):
+    r = client.get("/books", params={"q": "cat", "facets": "availability,price", "facet_bucket_size": 20})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["total"] == 2
+    assert data["facets"] == {
+        "availability": [{"label": "in stock", "count": 2}],
+        "price": [{"lower": 0.0, "upper": 20.0, "count": 1}],
+    }
+
+    assert client.get("/books").json()["facets"] is None
+    assert client.get("/books", params={"facets": "colour"}).status_code == 422
+
+def test_books_facets_mongo_page_through_find(client, mongo_books):
+    params = {"facets": "price,availability", "sort": "price_desc", "limit": 2}
+    mongo = client.get("/books", params=params).json()
+    assert mongo["total"] == 3
+    assert [b["title"] for b in mongo["items"]] == ["Bird Box", "Dog Days"]
+    assert mongo["facets"]["availability"] == [{"label": "in stock", "count": 3}, {"label": "out of stock", "count": 1}]
+    assert mongo["facets"]["price"] == [
+        {"lower": 10.0, "upper": 20.0, "count": 1},
+        {"lower": 20.0, "upper": 30.0, "count": 1},
+        {"lower": 40.0, "upper": 50.0, "count": 1},
+    ]
+
+    queries = []
+    token = slowlog._captured.set(queries)
+    try:
+        list_books_faceted_mongo(None, None, None, None, 2, 0, "price_desc", ["price", "availability"], 10)
+    finally:
+        slowlog._captured.reset(token)
+    # Counts come from one $facet aggregation; the sorted page from an indexed find
+    commands = [query["command"] for query in queries]
+    assert [next(iter(command)) for command in commands] == ["aggregate", "find"]
+    assert set(commands[0]["aggregate"][-1]["$facet"]) == {"total", "availability", "price"}
+    assert commands[1]["sort"] == {"price_num": -1}
+
+def _check_filtered_analytics(client):
+    stats = client.get("/analytics/price-stats", params={"q": "cat"}).json()
+    assert stats == {"count": 1, "min": 10.0, "max": 10.0, "average": 10.0}
+
+    availability = client.get("/analytics/availability", params={"q": "cat"}).json()
+    assert availability == {"total": 2, "buckets": [{"label": "in stock", "count": 2}]}
+
+    words = client.get("/analytics/title-words", params={"q": "cat", "top_n": 2}).json()
+    assert words["top"][0] == {"word": "cat", "count": 2}
+
+    buckets = client.get("/analytics/price-buckets", params={"price_min": 20, "bucket_size": 10}).json()["buckets"]
+    assert [(b["lower"], b["count"]) for b in buckets] == [(25.5, 1), (35.5, 1)]
+
+    quantiles = client.get("/analytics/price-quantiles", params={"availability": "In Stock", "quantile": [0, 1]}).json()
+    assert quantiles["approx"] is False
+    assert [x["price"] for x in quantiles["quantiles"]] == [10.0, 25.5]
+
+    assert client.get("/analytics/distinct-titles", params={"price_max": 30}).json()["distinct"] == 2
+
+def test_analytics_accept_books_filters(client):
+    _check_filtered_analytics(client)
+
+def test_analytics_filters_pushed_into_mongo_match(client, mongo_books):
+    _check_filtered_analytics(client)
+
+def test_analytics_cache_keyed_by_normalised_filter(client):
+    first = client.get("/analytics/availability", params={"availability": "In Stock"}).json()
+    again = client.get("/analytics/availability", params={"availability": " in stock "}).json()
+    assert first == again
+    assert len(analytics_cache) == 1
+
+    client.get("/analytics/availability", params={"availability": "out of stock"})
+    client.get("/analytics/availability")
+    assert len(analytics_cache) == 3
+
+def test_mongo_crawl_bumps_the_dataset_version(client, mongo_books, monkeypatch):
+    monkeypatch.setattr("api.db.VERSION_POLL_S", 0)
+    params = {"q": "cat"}
+    assert client.get("/analytics/availability", params=params).json()["total"] == 2
+    mongo_books.delete_one({"title": {"$regex": "cat", "$options": "i"}})
+    # Cached until the pipeline records the change, as close_spider does
+    assert client.get("/analytics/availability", params=params).json()["total"] == 2
+    mongo_books.database["dataset_versions"].update_one({"_id": "books"}, {"$inc": {"version": 1}}, upsert=True)
+    assert client.get("/analytics/availability", params=params).json()["total"] == 1
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from api import arrow
+
+pa = pytest.importorskip("pyarrow")
+
+ARROW = {"Accept": arrow.MEDIA_TYPE}
+
+
+def read(response):
+    assert response.status_code == 200
+    assert response.headers["content-type"] == arrow.MEDIA_TYPE
+    return pa.ipc.open_stream(response.content).read_all()
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, "json"),
+    ("*/*", "json"),
+    ("application/json", "json"),
+    (arrow.MEDIA_TYPE, "arrow"),
+    (f"application/json;q=0.5, {arrow.MEDIA_TYPE}", "arrow"),
+    (f"application/json, {arrow.MEDIA_TYPE};q=0.9", "json"),
+    (f"{arrow.MEDIA_TYPE};q=0", "json"),
+    ("text/html", "json"),
+])
+def test_negotiate(accept, expected):
+    assert arrow.negotiate(accept) == expected
+
+
+def test_negotiate_without_pyarrow(monkeypatch):
+    monkeypatch.setattr(arrow, "available", lambda: False)
+    assert arrow.negotiate(f"{arrow.MEDIA_TYPE}, */*;q=0.1") == "json"
+    with pytest.raises(arrow.ArrowUnavailable):
+        arrow.negotiate(arrow.MEDIA_TYPE)
+
+
+def test_books_as_arrow_match_json(client):
+    params = {"sort": "price_desc", "facets": "availability"}
+    expected = client.get("/books", params=params).json()
+    r = client.get("/books", params=params, headers=ARROW)
+    assert "Accept" in r.headers["vary"]
+    table = read(r)
+    assert table.to_pylist() == expected["items"]
+    assert table.schema.field("price").type == pa.float64()
+    metadata = table.schema.metadata
+    assert int(metadata[b"total"]) == expected["total"]
+    # Only the facets asked for, where JSON lists the others as null
+    assert json.loads(metadata[b"facets"]) == {"availability": expected["facets"]["availability"]}
+
+    # JSON and Arrow pages are cached apart
+    assert client.get("/books", params=params).json() == expected
+
+
+def test_books_as_arrow_in_mongo_mode(client, mongo_books):
+    expected = client.get("/books", params={"q": "cat"}).json()
+    assert read(client.get("/books", params={"q": "cat"}, headers=ARROW)).to_pylist() == expected["items"]
+
+
+@pytest.mark.parametrize("params", [{"bucket_size": 10}, {"bucket_size": 5, "availability": "in stock"}])
+def test_price_buckets_as_arrow_match_json(client, params):
+    expected = client.get("/analytics/price-buckets", params=params).json()["buckets"]
+    table = read(client.get("/analytics/price-buckets", params=params, headers=ARROW))
+    assert table.column_names == ["lower", "upper", "count"]
+    assert table.to_pylist() == expected
+
+
+def test_approx_price_buckets_as_arrow(client):
+    params = {"bucket_size": 10, "approx": "true"}
+    expected = client.get("/analytics/price-buckets", params=params).json()["buckets"]
+    assert read(client.get("/analytics/price-buckets", params=params, headers=ARROW)).to_pylist() == expected
+
+
+def test_arrow_only_client_without_pyarrow_gets_406(client, monkeypatch):
+    monkeypatch.setattr(arrow, "available", lambda: False)
+    assert client.get("/books", headers=ARROW).status_code == 406
+    assert client.get("/analytics/price-buckets", headers=ARROW).status_code == 406
+
+
+def test_export_arrow_streams_cursor_batches(client, mongo_books, monkeypatch, sample_books):
+    monkeypatch.setattr("api.db.EXPORT_BATCH_SIZE", 2)
+    r = client.get("/books/export", params={"format": "arrow", "sort": "title_asc"})
+    assert r.headers["content-type"] == arrow.MEDIA_TYPE
+    reader = pa.ipc.open_stream(r.content)
+    batches = list(reader)
+    assert [b.num_rows for b in batches] == [2, 2]
+    rows = pa.Table.from_batches(batches).to_pylist()
+    assert [row["title"] for row in rows] == sorted(b.title for b in sample_books)
@@ -0,0 +1,52 @@
+from api import config
+
+
+def test_batch_lookup_preserves_order_and_marks_misses(client):
+    r = client.post("/books/batch", json={"keys": ["3", "missing", "u1", "3"]})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["found"] == 3 and data["missing"] == 1
+    assert [item["key"] for item in data["items"]] == ["3", "missing", "u1", "3"]
+    assert [item["found"] for item in data["items"]] == [True, False, True, True]
+    assert data["items"][0]["book"]["title"] == "Bird Box"
+    assert data["items"][1]["book"] is None
+    assert data["items"][2]["book"]["id"] == "1"
+
+
+def test_batch_lookup_validates_size(client):
+    assert client.post("/books/batch", json={"keys": []}).status_code == 422
+    too_many = ["k"] * (config.BATCH_LOOKUP_MAX_KEYS + 1)
+    assert client.post("/books/batch", json={"keys": too_many}).status_code == 422
+
+
+def test_batch_lookup_mongo_single_query(client, mongo_books):
+    r = client.post("/books/batch", json={"keys": ["u2", "nope", "4"]})
+    data = r.json()
+    assert [item["found"] for item in data["items"]] == [True, False, True]
+    assert data["items"][0]["book"]["title"] == "Dog Days"
+    assert data["items"][2]["book"]["price"] is None
+
+
+def test_lookup_index_holds_rows_not_books(tmp_path, sample_books):
+    from api import db, shared
+
+    shared.publish(sample_books, tmp_path)
+    items = shared.attach(tmp_path)
+    found = db.lookup_books(items, ["u3", "2", "missing"])
+    assert found == {"u3": sample_books[2], "2": sample_books[1]}
+    index = db.dataset_index(items, "keys", db._build_key_index)
+    assert index["u3"] == 2 and all(isinstance(row, int) for row in index.values())
+
+
+def test_duplicate_ids_and_urls_resolve_to_the_first_book():
+    from api import db
+    from api.models import Book
+
+    items = [
+        Book(id="1", title="First", url="u1", price=1.0, availability="In stock"),
+        Book(id="1", title="Second", url="u1", price=2.0, availability="In stock"),
+        Book(id="2", title="Third", url="u1", price=3.0, availability="In stock"),
+    ]
+    found = db.lookup_books(items, ["1", "u1", "2"])
+    assert found["1"] is items[0] and found["u1"] is items[0]
+    assert found["2"] is items[2]
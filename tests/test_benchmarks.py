@@ -0,0 +1,20 @@
+from benchmarks.catalogue import generate
+from benchmarks.run import cases
+from api.db import _normalise_items
+
+
+def test_catalogue_is_deterministic_and_loadable():
+    rows = list(generate(500, seed=3))
+    assert rows == list(generate(500, seed=3))
+    assert len({row["url"] for row in rows}) == 500
+
+    books = _normalise_items(rows)
+    priced = [b.price for b in books if b.price is not None]
+    assert 0.95 * len(books) < len(priced) < len(books)
+    assert all(5.0 <= p <= 250.0 for p in priced)
+    assert sum(b.availability == "In stock" for b in books) > 0.8 * len(books)
+
+
+def test_benchmark_cases_are_valid_requests(client):
+    for name, path, params in cases(size=4, quick=True):
+        assert client.get(path, params=params).status_code == 200, name
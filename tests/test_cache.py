@@ -0,0 +1,101 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import api.db
+import api.main
+from api.cache import ResultCache
+
+
+def test_lru_eviction_and_version_invalidation():
+    cache = ResultCache("test", maxsize=2, ttl=60)
+    for key in ("a", "b", "a", "c"):
+        cache.get_or_compute(key, lambda: key.upper(), version=1)
+    # "b" was least recently used when "c" arrived
+    assert cache.get_or_compute("b", lambda: "recomputed", version=1) == "recomputed"
+    assert cache.get_or_compute("c", lambda: "stale", version=1) == "C"
+
+    assert cache.get_or_compute("c", lambda: "new dataset", version=2) == "new dataset"
+    assert len(cache) == 1
+
+
+def test_ttl_expiry():
+    cache = ResultCache("test", maxsize=10, ttl=0)
+    calls = []
+    for _ in range(3):
+        cache.get_or_compute("k", lambda: calls.append(1))
+    assert len(calls) == 3
+
+
+def test_memory_bound():
+    cache = ResultCache("test", maxsize=100, ttl=60, max_bytes=250, weigh=len)
+    for key in "abc":
+        cache.get_or_compute(key, lambda: "x" * 100)
+    assert len(cache) == 2 and cache.bytes == 200
+    cache.get_or_compute("too big", lambda: "x" * 300)
+    assert len(cache) == 2
+
+
+def test_concurrent_misses_run_once():
+    cache = ResultCache("test", maxsize=10, ttl=60)
+    calls = []
+    gate = threading.Event()
+
+    def compute():
+        calls.append(1)
+        gate.wait(5)
+        return "value"
+
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(cache.get_or_compute, "k", compute) for _ in range(8)]
+        time.sleep(0.05)
+        gate.set()
+        assert [f.result() for f in futures] == ["value"] * 8
+    assert len(calls) == 1
+
+
+def test_failed_computation_reaches_waiters_and_is_not_stored():
+    cache = ResultCache("test", maxsize=10, ttl=60)
+    gate = threading.Event()
+
+    def compute():
+        gate.wait(5)
+        raise RuntimeError("boom")
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(cache.get_or_compute, "k", compute) for _ in range(4)]
+        time.sleep(0.05)
+        gate.set()
+        for f in futures:
+            with pytest.raises(RuntimeError):
+                f.result()
+    assert len(cache) == 0
+
+
+def test_books_requests_coalesce_into_one_mongo_query(client, mongo_books, monkeypatch):
+    real = api.main.list_books_mongo
+    calls = []
+
+    def slow_list_books(**kwargs):
+        calls.append(kwargs)
+        time.sleep(0.2)
+        return real(**kwargs)
+
+    monkeypatch.setattr("api.main.list_books_mongo", slow_list_books)
+    params = [{"q": "cat", "availability": "In Stock"}, {"q": "cat", "availability": " in stock"}] * 4
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(lambda p: client.get("/books", params=p).json(), params))
+
+    assert len(calls) == 1
+    assert all(r == responses[0] for r in responses)
+    assert responses[0]["total"] == 2
+
+
+def test_books_cache_follows_dataset_version(client, monkeypatch, sample_books):
+    assert client.get("/books").json()["total"] == 4
+    monkeypatch.setattr("api.main.load_books", lambda: sample_books[:1])
+    assert client.get("/books").json()["total"] == 4
+    api.db.reload_books()
+    assert client.get("/books").json()["total"] == 1
@@ -0,0 +1,136 @@
+import gzip
+import json
+import zlib
+
+import pytest
+
+import api.compression
+import api.main
+from api.compression import CODINGS, Payload, negotiate
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("GZIP;q=0.5", "gzip"),
+    ("x-gzip", "gzip"),
+    ("deflate, gzip;q=0", None),
+    ("*", next(iter(CODINGS))),
+    ("*, gzip;q=0", next((c for c in CODINGS if c != "gzip"), None)),
+    ("gzip;q=bogus", None),
+])
+def test_negotiate(header, expected):
+    assert negotiate(header) == expected
+
+
+def test_negotiate_prefers_client_rating_then_server_order(monkeypatch):
+    monkeypatch.setattr(api.compression, "CODINGS", {"br": None, "zstd": None, "gzip": None})
+    assert negotiate("gzip, br, zstd") == "br"
+    assert negotiate("gzip;q=1, br;q=0.5") == "gzip"
+    assert negotiate("zstd, gzip") == "zstd"
+
+
+def test_payload_skips_small_and_incompressible_bodies(monkeypatch):
+    monkeypatch.setattr("api.config.COMPRESS_MIN_BYTES", 100)
+    small = Payload(b"x" * 10, "application/json")
+    assert small.variant("gzip") == (None, small.body) and small.encoded == {}
+    parquet = Payload(b"x" * 1000, "application/vnd.apache.parquet")
+    assert parquet.variant("gzip") == (None, parquet.body) and parquet.encoded == {}
+
+
+def test_payload_compresses_each_coding_when_first_asked(monkeypatch):
+    monkeypatch.setattr("api.config.COMPRESS_MIN_BYTES", 100)
+    payload = Payload(b"x" * 1000, "application/json")
+    assert payload.encoded == {}
+    coding, body = payload.variant("gzip")
+    assert coding == "gzip" and gzip.decompress(body) == b"x" * 1000
+    assert payload.encoded == {"gzip": body} and not payload.final("gzip")
+    assert payload.variant("identity") == (None, payload.body)
+
+    # Remade at the stored level once, then reused
+    stored = payload.encode("gzip", stored=True)
+    assert payload.final("gzip") and gzip.decompress(stored) == b"x" * 1000
+    assert payload.variant("gzip") == ("gzip", stored)
+    # The cache counts every variant the payload may still make
+    assert payload.size == 1000 * (1 + len(CODINGS))
+
+
+def test_cached_analytics_hit_sends_stored_gzip_bytes(client, monkeypatch):
+    monkeypatch.setattr("api.config.COMPRESS_MIN_BYTES", 0)
+    calls = []
+    compress = api.compression.compress
+    monkeypatch.setattr(
+        api.compression, "compress", lambda data, coding, stored=False: calls.append((coding, stored)) or compress(data, coding, stored)
+    )
+
+    first = client.get("/analytics/title-words", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["vary"] == "Accept-Encoding"
+    # Only the coding asked for: at the fast level for this response, then at the stored level after it
+    assert calls == [("gzip", False), ("gzip", True)]
+    compressed = len(calls)
+
+    with client.stream("GET", "/analytics/title-words", headers={"Accept-Encoding": "gzip"}) as second:
+        raw = b"".join(second.iter_raw())
+    # The hit is served from the variant stored with the cached result, not recompressed
+    assert len(calls) == compressed
+    payload = next(iter(api.main.analytics_cache._entries.values()))[2]
+    assert raw == payload.encoded["gzip"]
+    assert json.loads(gzip.decompress(raw)) == first.json()
+
+    plain = client.get("/analytics/title-words", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == first.json()
+
+
+def test_small_responses_are_not_compressed(client):
+    r = client.get("/analytics/price-stats", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+    assert r.json()["count"] == 3
+
+
+def test_uncached_responses_are_compressed_by_middleware(client):
+    r = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert int(r.headers["content-length"]) < len(r.content)
+    assert "/books" in r.json()["paths"]
+
+
+def test_streamed_export_is_gzipped_per_chunk_then_cached(client, monkeypatch):
+    monkeypatch.setattr("api.config.COMPRESS_MIN_BYTES", 10)
+    monkeypatch.setattr("api.main.EXPORT_BATCH_SIZE", 1)
+    with client.stream("GET", "/books/export", headers={"Accept-Encoding": "gzip"}) as r:
+        assert r.headers["content-encoding"] == "gzip"
+        assert "content-length" not in r.headers
+        chunks = list(r.iter_raw())
+    decoder = zlib.decompressobj(31)
+    body = b"".join(decoder.decompress(chunk) for chunk in chunks)
+    assert [json.loads(line)["id"] for line in body.decode().splitlines()] == ["1", "2", "3", "4"]
+    assert len(api.main.export_cache) == 1
+
+    hit = client.get("/books/export", headers={"Accept-Encoding": "gzip"})
+    assert hit.headers["content-encoding"] == "gzip"
+    assert "books.ndjson" in hit.headers["content-disposition"]
+    assert hit.content == body
+
+
+def test_export_larger_than_cache_is_only_streamed(client, monkeypatch):
+    monkeypatch.setattr(api.main.export_cache, "max_bytes", 10)
+    r = client.get("/books/export")
+    assert len(r.text.splitlines()) == 4
+    assert len(api.main.export_cache) == 0
+
+
+def test_export_copy_stops_at_the_entry_limit(client, monkeypatch):
+    monkeypatch.setattr(api.main.config, "EXPORT_CACHE_ENTRY_MAX_MB", 10 / (1024 * 1024))
+    copy = {"chunks": [], "complete": False}
+    assert list(api.main._tee_export(iter([b"12345", b"67890", b"x"]), copy)) == [b"12345", b"67890", b"x"]
+    # Dropped as soon as it outgrows the limit, not held until the end
+    assert copy == {"chunks": None, "complete": True}
+
+    r = client.get("/books/export")
+    assert len(r.text.splitlines()) == 4
+    assert len(api.main.export_cache) == 0
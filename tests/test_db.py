@@ -1,4 +1,8 @@
-from api.utils import parse_price
+import time
+
+from hypothesis import given, strategies as st
+
+from api.utils import find_price, parse_price, parse_prices
 
 def test_parse_prices_valid():
     assert parse_price("$10.50") == 10.5
@@ -10,4 +14,98 @@ def test_parse_prices_nan():
     assert parse_price("nan") == None
 
 def test_parse_prices_none():
-    assert parse_price(None) == None
\ No newline at end of file
+    assert parse_price(None) == None
+
+def test_parse_prices_currency_and_separators():
+    assert parse_price("£51.77") == 51.77
+    assert parse_price("$1,234.50") == 1234.5
+    assert parse_price("1.234,56 €") == 1234.56
+    assert parse_price("12,50") == 12.5
+    assert parse_price("1.234") == 1.234
+    assert parse_price("-£5") == -5.0
+
+
+def test_find_price_in_noisy_scraped_text():
+    assert find_price("Â£51.77") == 51.77
+    assert find_price("Price: £5") == 5.0
+    assert find_price("now -£1,234.50!") == -1234.5
+    assert find_price("£51.77") == 51.77
+    assert find_price(12) == 12.0
+    assert find_price("free") is None
+    assert find_price(None) is None
+    # Digits inside a longer word or number aren't a price
+    assert find_price("0x10") is None
+    assert find_price("A4 paper £3") == 3.0
+
+
+def test_parse_prices_lone_separator_and_bools():
+    # As the original parser: "." keeps its float() reading, "," separates thousands
+    assert parse_price("1.234") == 1.234
+    assert parse_price("1,234") == 1234.0
+    assert parse_price("1.234.567") == 1234567.0
+    assert parse_price(True) is None
+    assert find_price(False) is None
+
+
+def test_parse_price_is_linear_on_hostile_input():
+    inputs = [" " * 5000 + "x", "-" + " " * 5000 + "x", "£ " * 5000, "1," * 5000, "1" * 5000 + "x", "- " * 5000]
+    start = time.perf_counter()
+    for text in inputs:
+        assert parse_price(text) is None
+        find_price(text)
+    assert time.perf_counter() - start < 0.5
+
+
+def test_parse_prices_rejects_garbage():
+    assert parse_price("free") is None
+    # One separator in both roles is ambiguous (the original parser read 123456)
+    assert parse_price("1,234,56") is None
+    assert parse_price(",5") is None
+    assert parse_price(float("inf")) is None
+
+
+# Property tests
+prices = st.decimals(min_value=0, max_value=10**9, places=2, allow_nan=False, allow_infinity=False)
+raw_values = st.one_of(
+    st.none(),
+    st.text(max_size=12),
+    st.floats(allow_nan=True, allow_infinity=True),
+    st.integers(min_value=-10**6, max_value=10**6),
+    prices.map(lambda d: f"£{d:,.2f}"),
+)
+
+@given(prices, st.sampled_from(["£", "$", "€", ""]))
+def test_parse_price_roundtrips_formatted(value, symbol):
+    assert parse_price(f"{symbol}{value:,.2f}") == float(value)
+
+@given(prices)
+def test_parse_price_decimal_comma(value):
+    text = f"{value:,.2f}".replace(",", " ").replace(".", ",").replace(" ", ".")
+    assert parse_price(f"{text} €") == float(value)
+
+@given(st.lists(raw_values, max_size=50))
+def test_parse_prices_batch_matches_scalar(values):
+    column, missing = parse_prices(values)
+    assert len(column) == len(missing) == len(values)
+    for value, x, is_missing in zip(values, column, missing):
+        expected = parse_price(value)
+        if expected is None:
+            assert is_missing and x != x
+        else:
+            assert not is_missing and x == expected
+
+
+def test_normalise_items_builds_compact_records():
+    from api.db import _normalise_items
+    from api.models import Book
+
+    raws = [
+        {"_id": "x1", "url": " u1 ", "title": "A ", "price": "£5.00", "availability": "In stock"},
+        {"_id": "x2", "title": "B", "price": "£9.00", "price_num": 7.5, "availability": "In stock"},
+        {"_id": "x3", "title": "C", "price": "n/a"},
+    ]
+    books = _normalise_items(raws)
+    assert books[0] == Book(id="u1", title="A", url="u1", price=5.0, availability="In stock")
+    assert books[1].id == "x2" and books[1].price == 7.5
+    assert books[2].price is None and books[2].availability == ""
+    assert books[0].availability is books[1].availability
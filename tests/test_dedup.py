@@ -0,0 +1,123 @@
+import pytest
+
+from api.dedup import MinHasher, NearDuplicateIndex, cluster_ids, normalise_title, similarity
+from api.models import Book
+
+
+@pytest.fixture
+def sample_books():
+    # Overrides the conftest catalogue: two clusters of near-duplicates plus two singletons
+    return [
+        Book(id="1", title="Harry Potter and the Sorcerer's Stone", url="u1", price=10.0, availability="In stock"),
+        Book(id="2", title="The Cat", url="u2", price=15.0, availability="In stock"),
+        Book(id="3", title="Harry Potter and the Sorcerers Stone", url="u3", price=12.0, availability="Out of stock"),
+        Book(id="4", title="HARRY POTTER AND THE SORCERER'S STONE!", url="u4", price=None, availability="In stock"),
+        Book(id="5", title="Tipping the Velvet", url="u5", price=30.0, availability="In stock"),
+        Book(id="6", title="Tiping the Velvet", url="u6", price=31.0, availability="Out of stock"),
+        Book(id="7", title="Bird Box", url="u7", price=40.0, availability="Out of stock"),
+    ]
+
+
+def test_normalise_title():
+    assert normalise_title("  Sapiens: A Brief   History ") == "sapiens a brief history"
+    assert normalise_title(None) == ""
+
+
+def test_similarity_estimates_trigram_jaccard():
+    hasher = MinHasher()
+    sig = lambda title: hasher.signature(normalise_title(title))
+    assert similarity(sig("The Cat"), sig("The Cat")) == 1.0
+    assert similarity(sig("Tipping the Velvet"), sig("Tiping the Velvet")) > 0.7
+    assert similarity(sig("The Cat"), sig("Bird Box")) < 0.2
+
+
+def test_clusters_are_named_after_their_first_book(sample_books):
+    ids = cluster_ids((b.id, b.title) for b in sample_books)
+    assert ids == ["1", "2", "1", "1", "5", "5", "7"]
+
+
+def test_threshold_controls_clustering():
+    index = NearDuplicateIndex(threshold=1.0)
+    assert index.add("a", "Tipping the Velvet") == "a"
+    assert index.add("b", "Tiping the Velvet") == "b"
+    assert index.add("c", "tipping the velvet.") == "a"
+    assert len(index) == 2
+
+
+def test_seeded_clusters_are_joined_by_later_books():
+    # As the pipeline seeds a new crawl with the clusters already stored
+    index = NearDuplicateIndex()
+    index.seed("old", "Tipping the Velvet")
+    index.seed("old-cat", "The Cat")
+    assert index.add("new", "Tiping the Velvet") == "old"
+    assert index.add("new-cat", "THE CAT!") == "old-cat"
+    assert index.add("other", "Bird Box") == "other"
+    assert len(index) == 3
+
+
+def test_untitled_books_are_their_own_cluster():
+    index = NearDuplicateIndex()
+    assert [index.add(key, title) for key, title in [("a", ""), ("b", None), ("c", "!!")]] == ["a", "b", "c"]
+
+
+def test_analytics_dedupe_counts_each_cluster_once(client):
+    plain = client.get("/analytics/availability").json()
+    deduped = client.get("/analytics/availability", params={"dedupe": "true"}).json()
+    assert plain["total"] == 7
+    assert deduped == {"total": 4, "buckets": [{"label": "in stock", "count": 3}, {"label": "out of stock", "count": 1}]}
+
+    # The first book of each cluster among those matching the filter represents it
+    r = client.get("/analytics/price-stats", params={"dedupe": "true", "availability": "out of stock"}).json()
+    assert r == {"count": 3, "min": 12.0, "max": 40.0, "average": pytest.approx(83 / 3)}
+    r = client.get("/analytics/distinct-titles", params={"dedupe": "true"}).json()
+    assert r["distinct"] == 4
+    r = client.get("/analytics/price-quantiles", params={"dedupe": "true", "quantile": [0, 1]}).json()
+    assert r["count"] == 4 and [q["price"] for q in r["quantiles"]] == [10.0, 40.0]
+
+
+def test_dedupe_ignores_approx(client):
+    r = client.get("/analytics/price-stats", params={"dedupe": "true", "approx": "true"}).json()
+    assert r["count"] == 4
+
+
+DEDUPE_CASES = [
+    ("/analytics/availability", {"dedupe": "true"}),
+    ("/analytics/availability", {"dedupe": "true", "q": "velvet"}),
+    ("/analytics/price-stats", {"dedupe": "true"}),
+    ("/analytics/price-stats", {"dedupe": "true", "availability": "out of stock"}),
+    ("/analytics/price-buckets", {"dedupe": "true", "bucket_size": 10}),
+    ("/analytics/title-words", {"dedupe": "true", "top_n": 20}),
+    ("/analytics/title-words", {"dedupe": "true", "top_n": 20, "price_min": 11}),
+    ("/analytics/distinct-titles", {"dedupe": "true"}),
+    ("/analytics/price-quantiles", {"dedupe": "true", "approx": "false"}),
+]
+
+
+def _responses(client):
+    out = []
+    for path, params in DEDUPE_CASES:
+        r = client.get(path, params=params)
+        assert r.status_code == 200, (path, params)
+        data = r.json()
+        if data.get("average") is not None:
+            data["average"] = pytest.approx(data["average"])
+        if "top" in data:
+            # $group hands clusters on in no particular order, so ties among words can come in any order
+            data["top"].sort(key=lambda w: (-w["count"], w["word"]))
+        out.append(data)
+    return out
+
+
+def test_dedupe_matches_in_sqlite_mode(client, request):
+    expected = _responses(client)
+    request.getfixturevalue("sqlite_books")
+    assert _responses(client) == expected
+
+
+def test_dedupe_matches_in_mongo_mode(client, request, sample_books):
+    expected = _responses(client)
+    coll = request.getfixturevalue("mongo_books")
+    # As the scraper pipeline stores them
+    for book, cluster in zip(sample_books, cluster_ids((b.id, b.title) for b in sample_books)):
+        coll.update_one({"_id": book.id}, {"$set": {"cluster_id": cluster}})
+    assert _responses(client) == expected
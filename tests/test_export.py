@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+
+import pytest
+
+from api import export
+
+
+def ndjson_rows(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_export_ndjson_applies_filters(client):
+    r = client.get("/books/export", params={"q": "cat", "sort": "title_asc"})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/x-ndjson"
+    assert "books.ndjson" in r.headers["content-disposition"]
+    rows = ndjson_rows(r)
+    assert [row["title"] for row in rows] == ["Another Cat Tale", "The Cat"]
+    assert rows[0] == {"id": "4", "title": "Another Cat Tale", "url": "u4", "price": None, "availability": "In stock"}
+
+
+def test_export_csv_streams_in_batches(client, monkeypatch):
+    monkeypatch.setattr("api.main.EXPORT_BATCH_SIZE", 1)
+    r = client.get("/books/export", params={"format": "csv", "price_min": 20})
+    assert r.status_code == 200
+    rows = list(csv.reader(io.StringIO(r.text)))
+    assert rows[0] == ["id", "title", "url", "price", "availability"]
+    assert [row[0] for row in rows[1:]] == ["2", "3"]
+
+
+def test_export_csv_empty_result_has_header(client):
+    r = client.get("/books/export", params={"format": "csv", "q": "no such title"})
+    assert r.text.strip() == "id,title,url,price,availability"
+
+
+def test_export_parquet_roundtrip(client):
+    pq = pytest.importorskip("pyarrow.parquet")
+    r = client.get("/books/export", params={"format": "parquet", "availability": "in stock"})
+    assert r.status_code == 200
+    table = pq.read_table(io.BytesIO(r.content))
+    assert table.column("id").to_pylist() == ["1", "2", "4"]
+    assert table.column("price").to_pylist() == [10.0, 25.5, None]
+
+
+def test_export_parquet_without_pyarrow(client, monkeypatch):
+    def missing():
+        raise export.ExportUnavailable("Parquet export requires the pyarrow package")
+    monkeypatch.setattr(export, "_require_pyarrow", missing)
+    assert client.get("/books/export", params={"format": "parquet"}).status_code == 501
+
+
+def test_export_rejects_unknown_format(client):
+    assert client.get("/books/export", params={"format": "xml"}).status_code == 422
+
+
+def test_export_mongo_uses_cursor_batches(client, mongo_books, monkeypatch):
+    monkeypatch.setattr("api.db.EXPORT_BATCH_SIZE", 2)
+    r = client.get("/books/export", params={"sort": "price_desc"})
+    assert r.status_code == 200
+    assert [row["price"] for row in ndjson_rows(r)] == [40.0, 25.5, 10.0]
+
+
+def test_export_mongo_query_error_is_503_before_streaming(client, mongo_books, monkeypatch):
+    from pymongo.errors import OperationFailure
+
+    class FailingCursor:
+        closed = False
+
+        def __iter__(self):
+            return self
+
+        def __next__(self):
+            raise OperationFailure("Sort exceeded memory limit")
+
+        def close(self):
+            self.closed = True
+
+    cursor = FailingCursor()
+    monkeypatch.setattr(mongo_books, "find", lambda *args, **kwargs: cursor)
+    r = client.get("/books/export", params={"sort": "price_desc"})
+    assert r.status_code == 503
+    assert "Sort exceeded memory limit" in r.json()["detail"]
+    assert cursor.closed
@@ -0,0 +1,81 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scraper" / "books"))
+
+from books.extractors import EXTRACTORS, get_extractor  # noqa: E402
+
+FIXTURES = ROOT / "tests" / "fixtures" / "listing"
+# Saved listing pages and the URLs they were fetched from
+PAGES = {
+    "index.html": "http://books.toscrape.com/",
+    "page-50.html": "http://books.toscrape.com/catalogue/page-50.html",
+}
+
+
+def _extract(name, page):
+    pytest.importorskip("lxml")
+    if name == "css":
+        pytest.importorskip("parsel")
+    return EXTRACTORS[name]((FIXTURES / page).read_text(encoding="utf-8"), PAGES[page])
+
+
+@pytest.mark.parametrize("page", sorted(PAGES))
+def test_extractors_agree(page):
+    assert _extract("lxml", page) == _extract("css", page)
+
+
+def test_first_page_matches_the_saved_crawl():
+    page = _extract("lxml", "index.html")
+    expected = [{k: row[k] for k in ("url", "price", "title", "availability")}
+                for row in json.loads((ROOT / "data" / "sample.json").read_text(encoding="utf-8"))]
+    assert page.books == expected
+    assert page.next_page == "http://books.toscrape.com/catalogue/page-2.html"
+
+
+def test_last_page_edge_cases():
+    page = _extract("lxml", "page-50.html")
+    assert page.next_page is None
+    assert [b["title"] for b in page.books] == [
+        "1,000 Places to See Before You Die",
+        'The "Art" of War & Peace',
+        "Ways of Seeing\xa0(Penguin Modern Classics)",
+        "The Café on the Edge of the World",
+    ]
+    assert page.books[1] == {
+        "url": "http://books.toscrape.com/catalogue/the-art-of-war_2/index.html",
+        "price": "£33.34",
+        "title": 'The "Art" of War & Peace',
+        "availability": "Out of\n        stock",
+    }
+
+
+def test_get_extractor():
+    assert get_extractor(None) is EXTRACTORS["lxml"]
+    assert get_extractor("css") is EXTRACTORS["css"]
+    with pytest.raises(ValueError, match="Unknown book extractor"):
+        get_extractor("regex")
+
+
+def test_extractors_agree_on_irregular_markup():
+    pytest.importorskip("lxml")
+    pytest.importorskip("parsel")
+    html = """
+    <article class="product_pod"><h3><a title=" No Link ">x</a><a href="b.html">y</a></h3>
+      <div class="product_price"><p class="price_color"></p><p class="price_color"><!-- c -->£1.00</p>
+      <p class="availability  instock">In <b>stock</b> today</p></div>
+      <p class="availability">ignored</p></article>
+    <article class="product_pod other"><h3><span><a href="c.html" title="Nested">c</a></span></h3></article>
+    <div class="product_pod">not an article</div>
+    <ul><li class="next previous"><a>no href</a><a href="../page-3.html">next</a></li></ul>
+    """
+    base = "http://books.toscrape.com/catalogue/page-2.html"
+    lxml_page = EXTRACTORS["lxml"](html, base)
+    assert lxml_page == EXTRACTORS["css"](html, base)
+    assert lxml_page.books[0] == {"url": "http://books.toscrape.com/catalogue/b.html", "price": "£1.00",
+                                  "title": "No Link", "availability": "In today"}
+    assert lxml_page.next_page == "http://books.toscrape.com/page-3.html"
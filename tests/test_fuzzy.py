@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from api.fuzzy import TrigramIndex, max_edits, substring_distance
+
+
+def _sellers(pattern, text):
+    # Reference: edit distance from pattern to its closest substring of text
+    column = list(range(len(pattern) + 1))
+    best = column[-1]
+    for c in text:
+        prev, column[0] = column[0], 0
+        for i, p in enumerate(pattern, 1):
+            prev, column[i] = column[i], min(column[i] + 1, column[i - 1] + 1, prev + (p != c))
+        best = min(best, column[-1])
+    return best
+
+
+def test_substring_distance_matches_dynamic_programme():
+    rng = random.Random(7)
+    for _ in range(500):
+        pattern = "".join(rng.choice("abc ") for _ in range(rng.randint(1, 12)))
+        text = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 30)))
+        expected = _sellers(pattern, text)
+        assert substring_distance(pattern, text, 99) == expected
+        assert substring_distance(pattern, text, expected - 1) is None
+
+
+def test_search_tolerates_typos_and_ranks_by_relevance():
+    titles = ["Dog Days", "The Dogs of War", "Dig Deep", "Bird Box", "dog days"]
+    index = TrigramIndex(titles)
+    assert max_edits("dgo days") == 2
+    # Identical normalised titles share one entry but both rows come back
+    assert index.search("Dgo Days")[:2] == [0, 4]
+    assert index.search("dogs")[0] == 1
+    assert index.search("zzzzzz") == []
+    # Short queries get no typo allowance
+    assert index.search("bx") == []
+
+
+@pytest.mark.parametrize("mongo", [False, True])
+def test_books_fuzzy_match(client, request, monkeypatch, mongo):
+    if mongo:
+        request.getfixturevalue("mongo_books")
+        monkeypatch.setattr("api.db._mongo_indexes", {})
+    data = client.get("/books", params={"q": "Dgo Days", "match": "fuzzy", "facets": "availability"}).json()
+    assert [b["title"] for b in data["items"]] == ["Dog Days"]
+    assert data["facets"]["availability"] == [{"label": "in stock", "count": 1}]
+
+    # Substring matching is unchanged and the default
+    assert client.get("/books", params={"q": "Dgo Days"}).json()["total"] == 0
+
+    data = client.get("/books", params={"q": "cat tale", "match": "fuzzy", "availability": "in stock"}).json()
+    assert [b["title"] for b in data["items"]][0] == "Another Cat Tale"
+    assert client.get("/books", params={"q": "cat", "match": "exact"}).status_code == 422
+
+
+def test_fuzzy_mongo_captures_explainable_filters(mongo_books, monkeypatch):
+    import api.db
+    from api import slowlog
+
+    monkeypatch.setattr("api.db._mongo_indexes", {})
+    queries = []
+    token = slowlog._captured.set(queries)
+    try:
+        api.db.fuzzy_books_mongo("cat", None, None, None)
+    finally:
+        slowlog._captured.reset(token)
+    ids = queries[-1]["command"]["find"]["_id"]["$in"]
+    assert isinstance(ids, list) and set(ids) <= {"1", "2", "3", "4"}
+    # The captured filter runs as it is when the slow log explains it
+    assert len(list(mongo_books.find(queries[-1]["command"]["find"]))) == len(ids)
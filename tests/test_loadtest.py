@@ -0,0 +1,29 @@
+import asyncio
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+
+from api.main import app
+from benchmarks import loadtest
+
+SCENARIOS = sorted((Path(__file__).parents[1] / "benchmarks" / "scenarios").glob("*.json"))
+
+
+@pytest.mark.parametrize("path", SCENARIOS, ids=lambda p: p.stem)
+def test_scenarios_replay_without_errors(path):
+    scenario = json.loads(path.read_text())
+    transport = httpx.ASGITransport(app=app)
+    report = asyncio.run(loadtest.run(scenario, "http://testserver", concurrency=3, duration=0.3, time_scale=0, transport=transport))
+
+    assert report["total"]["requests"] > 0
+    assert report["total"]["error_rate"] == 0
+    assert "/books" in report["routes"]
+
+
+def test_percentile():
+    values = [float(v) for v in range(1, 101)]
+    assert loadtest.percentile(values, 50) == 51.0
+    assert loadtest.percentile(values, 99) == 99.0
+    assert loadtest.percentile([], 90) == 0.0
@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+from api import metrics
+
+
+def test_metrics_endpoint_records_route_latency(client):
+    before = metrics.HTTP_REQUEST_DURATION.count("/books", "GET", "200")
+    client.get("/books", params={"q": "cat"})
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert metrics.HTTP_REQUEST_DURATION.count("/books", "GET", "200") == before + 1
+    assert '# TYPE http_request_duration_seconds histogram' in r.text
+    assert 'http_request_duration_seconds_count{route="/books",method="GET",status="200"}' in r.text
+    assert 'cache_requests_total{cache="dataset",result="hit"}' in r.text
+
+
+def test_unmatched_routes_share_one_label(client):
+    client.get("/no-such-page-123")
+    assert metrics.HTTP_REQUEST_DURATION.count("unmatched", "GET", "404") >= 1
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = metrics.Histogram("t_seconds", "test", ("op",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        h.observe(value, "x")
+    assert h.samples() == [
+        't_seconds_bucket{op="x",le="0.1"} 1',
+        't_seconds_bucket{op="x",le="1.0"} 2',
+        't_seconds_bucket{op="x",le="+Inf"} 3',
+        't_seconds_sum{op="x"} 5.55',
+        't_seconds_count{op="x"} 3',
+    ]
+
+
+def test_mongo_listener_counts_commands_and_documents():
+    listener = metrics.MongoCommandListener()
+    before = metrics.MONGO_DOCS_RETURNED.value("find")
+    listener.succeeded(SimpleNamespace(
+        command_name="find",
+        duration_micros=1500,
+        reply={"cursor": {"firstBatch": [{}, {}, {}]}},
+    ))
+    listener.succeeded(SimpleNamespace(
+        command_name="explain",
+        duration_micros=900,
+        reply={"command": {"aggregate": "books"}, "stages": [{"$cursor": {"executionStats": {"totalDocsExamined": 40}}}]},
+    ))
+    assert metrics.MONGO_DOCS_RETURNED.value("find") == before + 3
+    assert metrics.MONGO_DOCS_EXAMINED.value("aggregate") >= 40
+    assert metrics.MONGO_COMMAND_DURATION.count("find") >= 1
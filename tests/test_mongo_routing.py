@@ -0,0 +1,85 @@
+import os
+
+import pytest
+from pymongo import MongoClient, WriteConcern, read_preferences
+
+import api.db
+
+REPLSET_URL = os.getenv("MONGODB_REPLSET_URL")
+
+
+def test_read_preferences_per_route(monkeypatch):
+    listing = api.db.read_preference("listing")
+    assert isinstance(listing, read_preferences.Nearest)
+    assert listing.max_staleness == 90
+
+    analytics = api.db.read_preference("analytics")
+    assert isinstance(analytics, read_preferences.SecondaryPreferred)
+    assert analytics.tag_sets == [{"nodeType": "ANALYTICS"}]
+
+    assert isinstance(api.db.read_preference("primary"), read_preferences.Primary)
+
+    monkeypatch.setitem(api.db.MONGO_READ_ROUTES, "listing", {"mode": "sideways", "tags": "", "max_staleness": -1})
+    with pytest.raises(ValueError):
+        api.db.read_preference("listing")
+
+
+def test_collections_carry_route_and_pool_settings(monkeypatch):
+    client = MongoClient("mongodb://localhost:1", connect=False, maxPoolSize=7)
+    monkeypatch.setattr("api.db.get_client", lambda: client)
+    api.db.get_collection.cache_clear()
+    try:
+        assert api.db.get_collection("listing").read_preference == api.db.read_preference("listing")
+        assert api.db.get_collection("analytics").read_preference == api.db.read_preference("analytics")
+        assert api.db.get_collection().read_preference == read_preferences.Primary()
+    finally:
+        api.db.get_collection.cache_clear()
+        client.close()
+
+
+def test_endpoints_read_through_their_route(client, mongo_books, monkeypatch):
+    routes = []
+
+    def routed(route="primary"):
+        routes.append(route)
+        return mongo_books
+
+    monkeypatch.setattr("api.db.get_collection", routed)
+    # The dataset version poll reads its counter on its own schedule; keep it out of the queries checked here
+    monkeypatch.setattr("api.db._stored_version_mongo", lambda: 0)
+    client.get("/books", params={"q": "cat"})
+    assert set(routes) == {"listing"}
+
+    routes.clear()
+    for path in ("/analytics/price-stats", "/analytics/availability", "/analytics/title-words"):
+        client.get(path, params={"q": "cat"})
+    assert set(routes) == {"analytics"}
+
+
+@pytest.mark.skipif(not REPLSET_URL, reason="set MONGODB_REPLSET_URL to a replica set (see docker-compose.replset.yml)")
+def test_analytics_reads_hit_the_tagged_member(monkeypatch):
+    monkeypatch.setattr("api.db.MONGO_URI", REPLSET_URL)
+    monkeypatch.setattr("api.db.COLLECTION_NAME", "routing_test")
+    api.db.get_client.cache_clear()
+    api.db.get_collection.cache_clear()
+    try:
+        client = api.db.get_client()
+        members = client.admin.command("replSetGetConfig")["config"]["members"]
+        tagged = {m["host"] for m in members if m.get("tags", {}).get("nodeType") == "ANALYTICS"}
+        assert tagged, "the replica set needs a member tagged nodeType:ANALYTICS"
+
+        primary = api.db.get_collection()
+        primary.drop()
+        # Wait for every member, so the analytics member already has the documents
+        primary.with_options(write_concern=WriteConcern(w=len(members))).insert_many(
+            [{"title": f"Book {i}", "price_num": float(i)} for i in range(10)]
+        )
+        api.db.warm_up_mongo(2)
+
+        cursor = api.db.get_collection("analytics").find({})
+        assert len(list(cursor)) == 10
+        assert "%s:%d" % cursor.address in tagged
+        primary.drop()
+    finally:
+        api.db.get_client.cache_clear()
+        api.db.get_collection.cache_clear()
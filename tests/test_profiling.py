@@ -0,0 +1,133 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from api import config, main, profiling
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    profiling.clear()
+    return {"X-Admin-Token": "secret"}
+
+
+def server_timing(response):
+    entries = {}
+    for part in response.headers["server-timing"].split(","):
+        name, dur = part.strip().split(";dur=")
+        entries[name] = float(dur)
+    return entries
+
+
+def test_phases_nest(monkeypatch):
+    clock = iter([0.0, 1.0, 3.0, 3.5, 4.0])
+    monkeypatch.setattr(profiling.time, "perf_counter", lambda: next(clock))
+    timings = profiling.Timings()
+    timings.enter("db")         # 0
+    timings.enter("normalise")  # 1
+    timings.exit()              # 3
+    timings.enter("serialise")  # 3.5
+    timings.exit()              # 4
+    assert timings.phases == {"db": 1.5, "normalise": 2.0, "serialise": 0.5}
+    assert timings.header(5.0) == "db;dur=1500.000, normalise;dur=2000.000, serialise;dur=500.000, total;dur=5000.000"
+
+
+def test_phase_outside_a_request_is_a_no_op():
+    with profiling.phase("db"):
+        pass
+
+
+def test_server_timing_breaks_down_a_cache_miss(client):
+    r = client.get("/books", params={"q": "the"})
+    timing = server_timing(r)
+    assert {"db", "serialise", "total"} <= set(timing)
+    assert timing["db"] + timing["serialise"] <= timing["total"]
+
+    # A cache hit only looks up stored bytes
+    assert set(server_timing(client.get("/books", params={"q": "the"}))) == {"total"}
+    assert "total" in server_timing(client.get("/health"))
+
+
+def test_server_timing_includes_normalise_in_mongo_mode(client, mongo_books):
+    timing = server_timing(client.get("/books", params={"sort": "price_asc"}))
+    assert {"db", "normalise", "serialise"} <= set(timing)
+
+
+def test_profile_on_admin_header(client, admin, monkeypatch):
+    monkeypatch.setattr(config, "PROFILE_INTERVAL_MS", 1)
+    real = main.load_books
+
+    def slow_load_books():
+        time.sleep(0.05)
+        return real()
+
+    monkeypatch.setattr(main, "load_books", slow_load_books)
+    r = client.get("/analytics/price-stats", params={"q": "a"}, headers={**admin, "X-Profile": "1"})
+    assert r.status_code == 200
+    profile_id = r.headers["x-profile-id"]
+
+    listed = client.get("/admin/profiles", headers=admin).json()
+    assert listed["records"][0]["id"] == profile_id
+    assert listed["records"][0]["route"] == "/analytics/price-stats"
+    assert listed["records"][0]["params"] == {"q": "a"}
+    assert listed["records"][0]["samples"] > 0
+    assert "db" in listed["records"][0]["phases_ms"]
+
+    r = client.get(f"/admin/profiles/{profile_id}", headers=admin)
+    assert r.headers["content-type"].startswith("text/plain")
+    lines = r.text.splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    # Stacks start at the endpoint and reach the slow call
+    assert all(line.startswith("get_price_stats (api/main.py:") for line in lines)
+    assert any("slow_load_books" in line for line in lines)
+
+
+def test_profile_needs_a_valid_token(client, admin):
+    r = client.get("/books", headers={"X-Admin-Token": "nope", "X-Profile": "1"})
+    assert "x-profile-id" not in r.headers
+    assert client.get("/admin/profiles", headers=admin).json()["records"] == []
+    assert client.get("/admin/profiles/unknown", headers=admin).status_code == 404
+    assert client.get("/admin/profiles").status_code == 401
+
+
+def test_sample_rate_profiles_without_header(client, admin, monkeypatch):
+    monkeypatch.setattr(config, "PROFILE_SAMPLE_RATE", 1.0)
+    assert "x-profile-id" in client.get("/books").headers
+    assert "x-profile-id" not in client.get("/health").headers
+    assert len(client.get("/admin/profiles", headers=admin).json()["records"]) == 1
+
+
+def test_folded_format():
+    assert profiling.folded({"b;c": 2, "a": 1}) == "a 1\nb;c 2\n"
+
+
+def test_sampler_reads_only_the_serving_thread():
+    def endpoint(work):
+        work()
+
+    def ours():
+        time.sleep(0.1)
+
+    def theirs():
+        time.sleep(0.1)
+
+    timings = profiling.Timings()
+    sampler = profiling.Sampler({"route": SimpleNamespace(endpoint=endpoint)}, timings, 0.001)
+
+    def serve(work, register):
+        if register:
+            timings.threads.add(threading.get_ident())
+        endpoint(work)
+
+    threads = [threading.Thread(target=serve, args=(ours, True)), threading.Thread(target=serve, args=(theirs, False))]
+    for t in threads:
+        t.start()
+    sampler.start()
+    for t in threads:
+        t.join()
+    sampler.stop()
+    assert sampler.stacks
+    assert all("ours" in stack and "theirs" not in stack for stack in sampler.stacks)
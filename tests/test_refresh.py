@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+import api.db
+import api.main
+from api.refresh import PrecomputedStore
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def dataset():
+    state = {"version": 1, "value": "a", "calls": 0}
+
+    def compute():
+        state["calls"] += 1
+        if isinstance(state["value"], Exception):
+            raise state["value"]
+        return state["value"]
+
+    state["compute"] = compute
+    return state
+
+
+def make_store(dataset, **kwargs):
+    options = dict(interval=60, poll_s=0.01, max_keys=10, retry_s=60)
+    options.update(kwargs)
+    return PrecomputedStore("test", lambda: dataset["version"], **options)
+
+
+def test_new_version_is_a_miss_without_the_worker(dataset):
+    store = make_store(dataset)
+    assert store.get("k") is None
+    store.put("k", dataset["compute"], "a", 1)
+    assert store.get("k") == "a"
+    dataset["version"] = 2
+    assert store.get("k") is None
+
+
+def test_stale_result_is_served_while_the_worker_recomputes(dataset):
+    store = make_store(dataset)
+    store.put("k", dataset["compute"], "a", 1)
+    store.start()
+    try:
+        dataset["version"], dataset["value"] = 2, "b"
+        assert store.get("k") in ("a", "b")
+        assert wait_for(lambda: store.get("k") == "b")
+        assert dataset["calls"] == 1
+    finally:
+        store.stop()
+
+
+def test_results_are_recomputed_on_schedule(dataset):
+    store = make_store(dataset, interval=0.05)
+    store.put("k", dataset["compute"], "a", 1)
+    dataset["value"] = "b"
+    store.start()
+    try:
+        assert wait_for(lambda: store.get("k") == "b")
+    finally:
+        store.stop()
+
+
+def test_failed_refresh_keeps_the_stale_result(dataset):
+    store = make_store(dataset)
+    store.put("k", dataset["compute"], "a", 1)
+    dataset["version"], dataset["value"] = 2, RuntimeError("mongo down")
+    assert store.refresh() == 0
+    # Not retried before retry_s
+    assert store.refresh() == 0 and dataset["calls"] == 1
+    dataset["value"] = "b"
+    assert store.refresh(force=True) == 1
+    assert store.get("k") == "b"
+
+
+def test_least_recently_read_result_is_dropped(dataset):
+    store = make_store(dataset, max_keys=2)
+    store.put("a", dataset["compute"], "a", 1)
+    store.put("b", dataset["compute"], "b", 1)
+    store.get("a")
+    store.put("c", dataset["compute"], "c", 1)
+    assert len(store) == 2 and store.get("b") is None
+
+
+def test_unfiltered_analytics_refresh_in_the_background(client, monkeypatch, sample_books):
+    monkeypatch.setattr(api.main.precomputed, "poll_s", 0.01)
+    api.main.precomputed.start()
+    try:
+        assert client.get("/analytics/availability").json()["total"] == 4
+        client.get("/analytics/availability", params={"q": "cat"})
+        # Only the unfiltered result is kept fresh
+        assert len(api.main.precomputed) == 1
+
+        monkeypatch.setattr("api.main.load_books", lambda: sample_books[:2])
+        api.db.reload_books()
+        # Answered at once from the stored result, then replaced by the worker
+        assert client.get("/analytics/availability").json()["total"] in (2, 4)
+        assert wait_for(lambda: client.get("/analytics/availability").json()["total"] == 2)
+    finally:
+        api.main.precomputed.stop()
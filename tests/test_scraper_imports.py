@@ -0,0 +1,54 @@
+import ast
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+PIPELINE = ROOT / "scraper" / "books" / "books" / "pipelines.py"
+# Distribution names in scraper/requirements.txt whose import name differs
+IMPORT_NAMES = {"python-dotenv": "dotenv"}
+
+# Runs in a fresh interpreter that can only import the stdlib, the api package
+# and what the scraper image installs
+CHECK = """
+import importlib, sys
+allowed = set(sys.stdlib_module_names) | {"api", "books"} | set(sys.argv[1].split(","))
+
+class ScraperImage:
+    def find_spec(self, name, path=None, target=None):
+        if name.split(".")[0] not in allowed:
+            raise ModuleNotFoundError(f"{name} is not in scraper/requirements.txt", name=name)
+
+sys.meta_path.insert(0, ScraperImage())
+for module in sys.argv[2].split(","):
+    importlib.import_module(module)
+"""
+
+
+def scraper_requirements():
+    names = []
+    for line in (ROOT / "scraper" / "requirements.txt").read_text().splitlines():
+        name = line.split("#", 1)[0].strip().lower()
+        if name:
+            names.append(IMPORT_NAMES.get(name, name))
+    return names
+
+
+def test_pipeline_imports_with_only_scraper_requirements():
+    requirements = scraper_requirements()
+    try:
+        import itemadapter, scrapy  # noqa: F401
+        modules = ["books.pipelines"]
+    except ImportError:
+        # Without Scrapy here, check the api modules the pipeline pulls in
+        tree = ast.parse(PIPELINE.read_text())
+        modules = [node.module for node in ast.walk(tree)
+                   if isinstance(node, ast.ImportFrom) and node.module and node.module.startswith("api")]
+    assert modules
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(ROOT), str(ROOT / "scraper" / "books")]))
+    result = subprocess.run(
+        [sys.executable, "-c", CHECK, ",".join(requirements), ",".join(modules)],
+        capture_output=True, text=True, env=env,
+    )
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,116 @@
+import pytest
+
+import api.db
+from api import shared
+from api.models import Book
+
+
+def test_publish_and_attach_roundtrip(tmp_path, sample_books):
+    generation = shared.publish(sample_books, tmp_path)
+    view = shared.attach(tmp_path)
+
+    assert generation == 1 and view.generation == 1
+    assert len(view) == len(sample_books)
+    assert list(view) == sample_books
+    assert view[-1] == sample_books[-1]
+    assert view[1:3] == sample_books[1:3]
+    with pytest.raises(IndexError):
+        view[len(sample_books)]
+
+
+def test_snapshot_handles_unicode_and_empty(tmp_path):
+    books = [Book(id="é", title="Ünïcode ☃", url="", price=1.5, availability="")]
+    shared.publish(books, tmp_path)
+    assert list(shared.attach(tmp_path)) == books
+
+    shared.publish([], tmp_path)
+    assert len(shared.attach(tmp_path)) == 0
+
+
+def test_new_generation_swaps_and_prunes(tmp_path, sample_books):
+    shared.publish(sample_books, tmp_path)
+    old = shared.attach(tmp_path)
+    shared.publish(sample_books[:2], tmp_path)
+    shared.publish(sample_books[:1], tmp_path)
+
+    assert shared.current_generation(tmp_path) == 3
+    assert len(shared.attach(tmp_path)) == 1
+    assert not (tmp_path / "books.1.bin").exists()
+    # A worker still holding generation 1 keeps a valid mapping
+    assert list(old) == sample_books
+
+
+def test_load_books_follows_published_generation(tmp_path, monkeypatch, sample_books):
+    monkeypatch.setattr(api.db, "SHARED_DATASET_DIR", str(tmp_path))
+    with pytest.raises(api.db.DataLoadError):
+        api.db.load_books()
+
+    shared.publish(sample_books, tmp_path)
+    assert list(api.db.load_books()) == sample_books
+    assert api.db.dataset_version() == 1
+
+    shared.publish(sample_books[:1], tmp_path)
+    assert list(api.db.load_books()) == sample_books[:1]
+    api.db.reload_books()
+
+
+def test_title_search_stays_within_each_title(tmp_path):
+    titles = ["ab", "", "ca", "Bc", "Ünï"]
+    shared.publish([Book(id=str(i), title=t, url="", price=None, availability="") for i, t in enumerate(titles)], tmp_path)
+    view = shared.attach(tmp_path)
+    for q in ("bc", "c", "a", "ÜN", "abc", "zz"):
+        assert list(view.where(q, None, None, None).column("title")) == [t for t in titles if q.lower() in t.lower()], q
+    assert [b.title for b in view.sorted("title_desc")] == ["Ünï", "ca", "Bc", "ab", ""]
+
+
+@pytest.fixture
+def shared_books(tmp_path, monkeypatch, sample_books):
+    shared.publish(sample_books, tmp_path)
+    monkeypatch.setattr(api.db, "SHARED_DATASET_DIR", str(tmp_path))
+    monkeypatch.setattr("api.main.load_books", api.db.load_books)
+    # Drop a file-mode dataset loaded under the same version number
+    api.db.reload_books()
+    yield tmp_path
+    api.db.reload_books()
+
+
+SHARED_CASES = [
+    ("/books", {"q": "cat", "sort": "title_desc"}),
+    ("/books", {"availability": " In Stock", "sort": "price_asc", "facets": "availability,price"}),
+    ("/books", {"price_min": 20, "limit": 1, "offset": 1}),
+    ("/books", {"sort": "title_asc", "facets": "price", "facet_bucket_size": 20}),
+    ("/analytics/availability", {"dedupe": "true"}),
+    ("/analytics/price-stats", {"q": "a"}),
+    ("/analytics/price-buckets", {"bucket_size": 5}),
+    ("/analytics/price-quantiles", {"quantile": [0.5, 0.9], "price_max": 40}),
+    ("/analytics/title-words", {"top_n": 3, "availability": "in stock"}),
+    ("/analytics/distinct-titles", {"dedupe": "true"}),
+]
+
+
+def test_shared_mode_matches_file_mode(client, request):
+    expected = [client.get(path, params=params).json() for path, params in SHARED_CASES]
+    request.getfixturevalue("shared_books")
+    assert isinstance(api.main.load_books(), shared.SharedBooks)
+    for (path, params), want in zip(SHARED_CASES, expected):
+        assert client.get(path, params=params).json() == want, (path, params)
+
+
+def test_shared_mode_builds_books_only_for_the_page(client, shared_books, monkeypatch):
+    decoded = []
+    row = shared.SharedBooks._row
+    monkeypatch.setattr(shared.SharedBooks, "_row", lambda self, i: decoded.append(i) or row(self, i))
+
+    data = client.get("/books", params={"q": "a", "sort": "price_desc", "limit": 1, "facets": "availability,price"}).json()
+    assert data["total"] > 1 and len(decoded) == 1
+    client.get("/analytics/price-stats", params={"availability": "in stock"})
+    client.get("/analytics/title-words", params={"price_max": 30})
+    assert len(decoded) == 1
+
+
+def test_snapshot_holds_more_than_65535_availability_labels(tmp_path):
+    books = [Book(id=str(i), title="t", url="", price=None, availability=f"label {i}") for i in range(70_000)]
+    shared.publish(books, tmp_path)
+    view = shared.attach(tmp_path)
+    assert view[69_999].availability == "label 69999"
+    assert len(view.where(None, "label 65536", None, None)) == 1
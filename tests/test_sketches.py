@@ -0,0 +1,163 @@
+import bisect
+import json
+import math
+import random
+from collections import Counter
+
+import pytest
+
+import api.db
+from api.db import _normalise_items
+from api.sketches import CountMinSketch, HyperLogLog, KLLSketch, SketchSet
+from api.utils import title_words
+from benchmarks.catalogue import generate
+
+
+@pytest.fixture(scope="module")
+def catalogue():
+    return _normalise_items(list(generate(20_000, seed=3)))
+
+
+@pytest.fixture
+def big_client(client, monkeypatch, catalogue):
+    monkeypatch.setattr("api.main.load_books", lambda: catalogue)
+    return client
+
+
+def _rank_interval(sorted_values, value):
+    n = len(sorted_values)
+    return bisect.bisect_left(sorted_values, value) / n, bisect.bisect_right(sorted_values, value) / n
+
+
+def test_kll_quantiles_within_rank_error():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(3.2, 0.45) for _ in range(50_000)]
+    sketch = KLLSketch()
+    sketch.update_many(values)
+    values.sort()
+
+    for q, estimate in zip([0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99], sketch.quantiles([0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99])):
+        low, high = _rank_interval(values, estimate)
+        assert low - sketch.rank_error <= q <= high + sketch.rank_error
+    assert sketch.quantiles([0, 1]) == [values[0], values[-1]]
+    assert sum(len(c) for c in sketch.compactors) < 3 * sketch.k
+
+
+def test_kll_merge_and_round_trip():
+    a, b = KLLSketch(), KLLSketch(seed=1)
+    a.update_many(range(0, 10_000))
+    b.update_many(range(10_000, 20_000))
+    a.merge(b)
+    restored = KLLSketch.from_dict(json.loads(json.dumps(a.to_dict())))
+
+    assert (restored.n, restored.min, restored.max) == (20_000, 0, 19_999)
+    assert abs(restored.quantiles([0.5])[0] - 10_000) <= restored.rank_error * 20_000
+
+
+def test_hyperloglog_within_three_standard_errors():
+    sketch = HyperLogLog()
+    for i in range(30_000):
+        sketch.update(f"title {i}")
+        sketch.update(f"title {i}")
+    assert abs(sketch.count() / 30_000 - 1) <= 3 * sketch.relative_error
+
+    other = HyperLogLog()
+    for i in range(20_000, 40_000):
+        other.update(f"title {i}")
+    sketch.merge(HyperLogLog.from_dict(other.to_dict()))
+    assert abs(sketch.count() / 40_000 - 1) <= 3 * sketch.relative_error
+
+
+def test_count_min_never_undercounts(catalogue):
+    sketch = CountMinSketch()
+    exact = Counter()
+    for book in catalogue:
+        words = title_words(book.title)
+        exact.update(words)
+        for word in words:
+            sketch.update(word)
+
+    bound = sketch.epsilon * sketch.total
+    for word, count in exact.items():
+        assert count <= sketch.estimate(word) <= count + bound
+    assert [w for w, _ in sketch.top(10)] == [w for w, _ in exact.most_common(10)]
+
+
+def test_sketch_file_is_used_when_it_matches_the_feed(tmp_path, monkeypatch, sample_books):
+    monkeypatch.setattr("api.db.DATA_PATH", tmp_path / "books.json")
+    stored = SketchSet.from_books(sample_books)
+    stored.availability["from file"] = 1
+    api.db.sketches_path().write_text(json.dumps(stored.to_dict()))
+
+    assert "from file" in api.db.build_sketches(sample_books).availability
+    assert "from file" not in api.db.build_sketches(sample_books[:2]).availability
+
+
+def test_price_quantiles_approx_matches_exact(big_client, catalogue):
+    qs = [0.1, 0.5, 0.9, 0.99]
+    approx = big_client.get("/analytics/price-quantiles", params={"quantile": qs}).json()
+    exact = big_client.get("/analytics/price-quantiles", params={"quantile": qs, "approx": "false"}).json()
+    prices = sorted(b.price for b in catalogue if b.price is not None)
+
+    assert approx["approx"] is True and exact["approx"] is False
+    assert approx["count"] == exact["count"] == len(prices)
+    for a, e in zip(approx["quantiles"], exact["quantiles"]):
+        low, high = _rank_interval(prices, a["price"])
+        assert low - approx["rank_error"] <= a["q"] <= high + approx["rank_error"]
+        assert e["price"] == prices[max(0, math.ceil(e["q"] * len(prices)) - 1)]
+
+
+def test_price_quantiles_rejects_out_of_range(client):
+    assert client.get("/analytics/price-quantiles", params={"quantile": 1.5}).status_code == 422
+
+
+def test_approx_analytics_match_exact(big_client, catalogue):
+    total = sum(1 for b in catalogue if b.price is not None)
+
+    stats = [big_client.get("/analytics/price-stats", params={"approx": a}).json() for a in ("true", "false")]
+    assert stats[0]["count"] == stats[1]["count"]
+    assert stats[0]["average"] == pytest.approx(stats[1]["average"])
+
+    availability = [big_client.get("/analytics/availability", params={"approx": a}).json() for a in ("true", "false")]
+    assert sorted(map(str, availability[0]["buckets"])) == sorted(map(str, availability[1]["buckets"]))
+
+    rank_error = KLLSketch().rank_error
+    approx, exact = [big_client.get("/analytics/price-buckets", params={"bucket_size": 10, "approx": a}).json()["buckets"]
+                     for a in ("true", "false")]
+    assert len(approx) == len(exact)
+    for a, e in zip(approx, exact):
+        assert a["lower"] == e["lower"]
+        assert abs(a["count"] - e["count"]) <= 2 * rank_error * total
+
+    approx, exact = [big_client.get("/analytics/title-words", params={"top_n": 10, "approx": a}).json()["top"]
+                     for a in ("true", "false")]
+    assert [w["word"] for w in approx] == [w["word"] for w in exact]
+
+    approx, exact = [big_client.get("/analytics/distinct-titles", params={"approx": a}).json() for a in ("true", "false")]
+    assert abs(approx["distinct"] / exact["distinct"] - 1) <= 3 * approx["relative_error"]
+
+
+def test_mongo_exact_and_sketch_paths(client, mongo_books, monkeypatch):
+    monkeypatch.setattr("api.db._mongo_indexes", {})
+    exact = client.get("/analytics/price-quantiles", params={"quantile": [0, 0.5, 1], "approx": "false"}).json()
+    assert [q["price"] for q in exact["quantiles"]] == [10.0, 25.5, 40.0]
+
+    # No stored sketch yet: built from one scan of the collection
+    approx = client.get("/analytics/price-quantiles", params={"quantile": [0, 0.5, 1]}).json()
+    assert [q["price"] for q in approx["quantiles"]] == [10.0, 25.5, 40.0]
+    assert client.get("/analytics/distinct-titles", params={"approx": "true"}).json()["distinct"] == 4
+    assert client.get("/analytics/distinct-titles").json() == {"distinct": 4, "approx": False, "relative_error": None}
+
+    stored = SketchSet()
+    for title in ("A", "B", "C", "D"):
+        stored.update(title, 99.0, "In stock")
+    mongo_books.database[api.db.SKETCH_COLLECTION].insert_one({"_id": "books", **stored.to_dict()})
+    monkeypatch.setattr("api.db._mongo_indexes", {})
+    assert client.get("/analytics/price-stats", params={"approx": "true"}).json()["max"] == 99.0
+
+    # A sketch covering part of the collection, e.g. from a partial crawl, is rebuilt from it
+    partial = SketchSet()
+    partial.update("Only", 99.0, "In stock")
+    mongo_books.database[api.db.SKETCH_COLLECTION].replace_one({"_id": "books"}, partial.to_dict())
+    monkeypatch.setattr("api.db._mongo_indexes", {})
+    assert client.get("/analytics/price-stats", params={"approx": "true"}).json()["max"] == 40.0
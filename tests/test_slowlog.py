@@ -0,0 +1,130 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from api import config, slowlog
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    slowlog.clear()
+    return {"X-Admin-Token": "secret"}
+
+
+def wait_for_records(n=1, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while len(slowlog.records()) < n and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return slowlog.records()
+
+
+def test_admin_endpoint_requires_token(client, monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "")
+    assert client.get("/admin/slow-queries").status_code == 403
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    assert client.get("/admin/slow-queries", headers={"X-Admin-Token": "nope"}).status_code == 401
+
+
+def test_slow_request_is_recorded(client, admin, monkeypatch):
+    monkeypatch.setattr(config, "SLOW_QUERY_MS", 0)
+    client.get("/books", params={"q": "cat", "sort": "price_asc"})
+    client.get("/health")
+
+    records = wait_for_records()
+    assert len(records) == 1
+    assert records[0]["route"] == "/books"
+    assert records[0]["params"] == {"q": "cat", "sort": "price_asc"}
+
+    r = client.get("/admin/slow-queries", headers=admin)
+    assert r.status_code == 200
+    assert r.json()["records"][0]["route"] == "/books"
+
+
+def test_fast_request_is_not_recorded(client, admin, monkeypatch):
+    monkeypatch.setattr(config, "SLOW_QUERY_MS", 60_000)
+    client.get("/books")
+    assert slowlog.records() == []
+
+
+def test_slow_streamed_body_is_not_recorded(admin, monkeypatch):
+    monkeypatch.setattr(config, "SLOW_QUERY_MS", 50)
+
+    def app(headers_delay, body_delay):
+        async def asgi(scope, receive, send):
+            await asyncio.sleep(headers_delay)
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await asyncio.sleep(body_delay)
+            await send({"type": "http.response.body", "body": b"done"})
+        return asgi
+
+    async def request(asgi, path):
+        scope = {"type": "http", "path": path, "query_string": b""}
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await slowlog.SlowQueryMiddleware(asgi)(scope, None, send)
+        return sent
+
+    # A client downloading an export slowly doesn't make the query slow
+    sent = asyncio.run(request(app(0, 0.2), "/books/export"))
+    assert sent[-1]["body"] == b"done"
+    time.sleep(0.05)
+    assert slowlog.records() == []
+
+    asyncio.run(request(app(0.1, 0), "/books"))
+    records = wait_for_records()
+    assert [r["route"] for r in records] == ["/books"]
+    assert records[0]["duration_ms"] >= 50
+
+
+def test_captured_queries_are_explained(admin):
+    explain_reply = {
+        "queryPlanner": {"winningPlan": {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "price_num_1"}}}},
+        "executionStats": {"nReturned": 20, "totalDocsExamined": 20, "totalKeysExamined": 20, "executionTimeMillis": 3},
+    }
+    sent = []
+    database = SimpleNamespace(command=lambda cmd, read_preference: sent.append((cmd, read_preference)) or explain_reply)
+    coll = SimpleNamespace(name="books", database=database, read_preference="secondaryPreferred")
+
+    record = {"route": "/books", "duration_ms": 900.0, "queries": []}
+    slowlog.explain_and_store(record, [{"collection": coll, "command": {"find": {"price_num": {"$gte": 5}}, "limit": 20}}])
+
+    assert sent == [(
+        {"explain": {"find": "books", "filter": {"price_num": {"$gte": 5}}, "limit": 20}, "verbosity": "executionStats"},
+        "secondaryPreferred",
+    )]
+    query = slowlog.records()[0]["queries"][0]
+    assert query["plan"] == ["LIMIT", "FETCH", "IXSCAN"]
+    assert query["index"] == "price_num_1" and not query["collscan"]
+    assert query["docs_examined"] == 20 and query["returned"] == 20
+
+
+def test_summarise_aggregate_collscan():
+    reply = {"stages": [{"$cursor": {
+        "queryPlanner": {"winningPlan": {"queryPlan": {"stage": "COLLSCAN"}}},
+        "executionStats": {"nReturned": 1000, "totalDocsExamined": 1000},
+    }}, {"$group": {}}]}
+    summary = slowlog.summarise_explain(reply)
+    assert summary["collscan"] and summary["index"] is None
+    assert summary["docs_examined"] == 1000
+
+
+def test_quantile_queries_are_captured_as_they_run(mongo_books):
+    import api.db
+
+    queries = []
+    token = slowlog._captured.set(queries)
+    try:
+        result = api.db.price_quantiles_mongo([0.5])
+    finally:
+        slowlog._captured.reset(token)
+    count, find = (query["command"] for query in queries)
+    assert mongo_books.count_documents(count["count"]) == result["count"]
+    # Replaying the captured find returns the quantile it reported
+    cursor = mongo_books.find(find["find"]).sort(list(find["sort"].items())).skip(find["skip"]).limit(find["limit"])
+    assert [doc["price_num"] for doc in cursor] == [result["quantiles"][0]["price"]]
@@ -0,0 +1,116 @@
+import json
+import threading
+
+import pytest
+
+import api.db
+from api.models import NO_FILTER, Book
+
+# Requests every backend must answer identically
+CASES = [
+    ("/books", {}),
+    ("/books", {"q": "cat"}),
+    ("/books", {"availability": " In Stock"}),
+    ("/books", {"price_min": 20, "price_max": 40}),
+    ("/books", {"sort": "title_asc", "limit": 2, "offset": 1}),
+    ("/books", {"sort": "title_desc"}),
+    ("/books", {"sort": "price_desc", "availability": "in stock"}),
+    ("/books", {"q": "a", "facets": "availability,price", "facet_bucket_size": 20}),
+    ("/analytics/availability", {}),
+    ("/analytics/availability", {"price_max": 30}),
+    ("/analytics/price-stats", {}),
+    ("/analytics/price-stats", {"availability": "in stock"}),
+    ("/analytics/price-buckets", {"bucket_size": 5}),
+    ("/analytics/price-buckets", {"bucket_size": 10, "q": "a"}),
+    ("/analytics/title-words", {"top_n": 4}),
+    ("/analytics/title-words", {"top_n": 2, "availability": "in stock"}),
+]
+
+
+def _comparable(path, data):
+    """Drop what legitimately differs between backends: ids, bucket order, float rounding."""
+    if "items" in data:
+        data["items"] = [(b["title"], b["price"], b["availability"]) for b in data["items"]]
+    if "buckets" in data and path.endswith("availability"):
+        data["buckets"].sort(key=lambda b: b["label"])
+    if data.get("average") is not None:
+        data["average"] = pytest.approx(data["average"])
+    return data
+
+
+def _responses(client):
+    out = []
+    for path, params in CASES:
+        r = client.get(path, params=params)
+        assert r.status_code == 200, (path, params)
+        out.append(_comparable(path, r.json()))
+    return out
+
+
+def test_sqlite_matches_file_mode(client, request):
+    expected = _responses(client)
+    request.getfixturevalue("sqlite_books")
+    for (path, params), want, got in zip(CASES, expected, _responses(client)):
+        if params.get("sort", "").startswith("price_"):
+            # File mode counts unpriced books in total but leaves them off price-sorted pages
+            want.pop("total"), got.pop("total")
+        assert got == want, (path, params)
+
+
+def test_sqlite_matches_mongo_mode(client, request):
+    request.getfixturevalue("mongo_books")
+    expected = _responses(client)
+    request.getfixturevalue("sqlite_books")
+    for (path, params), want, got in zip(CASES, expected, _responses(client)):
+        assert got == want, (path, params)
+
+
+def test_price_sort_total_skips_unpriced_books(client, sqlite_books):
+    data = client.get("/books", params={"sort": "price_asc"}).json()
+    assert data["total"] == 3
+    assert [b["price"] for b in data["items"]] == [10.0, 25.5, 40.0]
+
+
+def test_price_facet_floors_negative_prices(client, monkeypatch, tmp_path):
+    books = [Book(id=str(i), title=f"Book {i}", url=f"/{i}", price=p, availability="In stock")
+             for i, p in enumerate([-15.0, -10.0, -5.0, -0.5, 0.0, 9.99, 10.0])]
+    params = {"facets": "price", "facet_bucket_size": 10}
+    monkeypatch.setattr("api.main.load_books", lambda: books)
+    expected = client.get("/books", params=params).json()["facets"]["price"]
+    assert [(b["lower"], b["count"]) for b in expected] == [(-20.0, 1), (-10.0, 3), (0.0, 2), (10.0, 1)]
+
+    path = tmp_path / "negative.sqlite"
+    api.db.build_sqlite(books, path)
+    monkeypatch.setattr("api.db.SQLITE_PATH", path)
+    monkeypatch.setattr("api.db.DATA_PATH", tmp_path / "no-feed.json")
+    for module in ("api.db", "api.main"):
+        monkeypatch.setattr(f"{module}.USE_SQLITE", True)
+    api.main.books_cache.clear()
+    assert client.get("/books", params=params).json()["facets"]["price"] == expected
+
+
+def test_store_roundtrip_and_rebuild_from_newer_feed(monkeypatch, tmp_path, sample_books):
+    path = tmp_path / "books.sqlite"
+    feed = tmp_path / "books.json"
+    monkeypatch.setattr("api.db.SQLITE_PATH", path)
+    monkeypatch.setattr("api.db.DATA_PATH", feed)
+    with pytest.raises(api.db.DataLoadError):
+        api.db.get_sqlite()
+
+    rows = [{"url": b.url, "title": b.title, "price": b.price, "availability": b.availability} for b in sample_books]
+    feed.write_text(json.dumps(rows))
+    assert [b.title for b in api.db.load_books_sqlite()] == [b.title for b in sample_books]
+    assert api.db.price_stats_sqlite(NO_FILTER)["count"] == 3
+
+    feed.write_text(json.dumps(rows[:1]))
+    api.db.reload_books()
+    assert api.db.load_books_sqlite() == api.db._normalise_items(rows[:1])
+
+
+def test_connections_are_per_thread(sqlite_books):
+    conns = [api.db.get_sqlite()]
+    worker = threading.Thread(target=lambda: conns.append(api.db.get_sqlite()))
+    worker.start()
+    worker.join()
+    assert conns[0] is not conns[1]
+    assert api.db.get_sqlite() is conns[0]
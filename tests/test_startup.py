@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+import api.main
+from api.startup import Warmup
+
+
+def test_warmup_retries_a_failing_stage():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("not yet")
+
+    warmup = Warmup(lambda: [("connect", flaky), ("load", lambda: None)], retry_s=0.01)
+    assert warmup.status()["ready"] is False
+    warmup.start()
+    assert warmup.wait(5)
+    status = warmup.status()
+    assert len(calls) == 3
+    assert status["ready"] and status["pending"] == [] and status["error"] is None
+    assert list(status["stages"]) == ["connect", "load"]
+
+
+def test_ready_turns_green_after_warmup_primes_caches():
+    api.main.warmup.stop()
+    with TestClient(api.main.app) as client:
+        assert client.get("/health").status_code == 200
+        assert api.main.warmup.wait(5)
+        r = client.get("/ready")
+        assert r.status_code == 200
+        assert list(r.json()["stages"]) == ["connect", "load", "indexes", "caches"]
+        assert len(api.main.analytics_cache) == 4
+        assert len(api.main.books_cache) == 1
+
+
+def test_ready_reports_failure_until_the_stage_succeeds(monkeypatch):
+    def broken():
+        raise api.main.DataLoadError("feed missing")
+
+    monkeypatch.setattr("api.main.load_books", broken)
+    warmup = Warmup(api.main._warmup_stages, retry_s=60)
+    monkeypatch.setattr("api.main.warmup", warmup)
+    warmup.start()
+    try:
+        client = TestClient(api.main.app)
+        for _ in range(100):
+            body = client.get("/ready").json()
+            if body["error"]:
+                break
+            warmup.wait(0.01)
+        assert client.get("/ready").status_code == 503
+        assert body["error"] == "load: feed missing"
+        assert body["pending"] == ["load", "indexes", "caches"]
+    finally:
+        warmup.stop(0)
+
+
+def test_pymongo_is_not_imported_outside_mongo_mode():
+    code = "import sys, api.main; print('pymongo' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         env={**os.environ, "USE_MONGO": "false"}, cwd=Path(api.main.__file__).parents[1])
+    assert out.stdout.strip() == "False"
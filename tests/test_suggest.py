@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import api.db
+import api.suggest
+from api.models import Book
+from api.suggest import SuggestIndex
+
+
+def test_prefix_ranges_and_ordering():
+    index = SuggestIndex(["Dark Night", "dark night", "Dark Matter", "Darling", "Night Train", "Day One"])
+
+    result = index.suggest("dar", k=10)
+    assert [s["text"] for s in result["titles"]] == ["Dark Matter", "Dark Night", "Darling"]
+    assert [s["text"] for s in result["words"]] == ["dark", "darling"]
+
+    popular = index.suggest("Dar", k=1, by="popularity")
+    assert popular["titles"] == [{"text": "Dark Night", "count": 2}]
+    assert popular["words"] == [{"text": "dark", "count": 3}]
+
+    # Words complete the last word typed; titles match the whole prefix
+    result = index.suggest("dark ni", k=10)
+    assert [s["text"] for s in result["titles"]] == ["Dark Night"]
+    assert [s["text"] for s in result["words"]] == ["night"]
+    assert index.suggest("zz")["titles"] == []
+
+
+def test_popularity_matches_brute_force():
+    titles = [f"{w} {i % 7}" for i, w in enumerate(["alpha", "alpine", "alps", "altar", "beta"] * 40)]
+    titles += ["alpha"] * 100
+    index = SuggestIndex(titles)
+    for prefix in ("a", "al", "alp", "alpha"):
+        words = {}
+        for t in titles:
+            for w in t.lower().split():
+                if w.startswith(prefix):
+                    words[w] = words.get(w, 0) + 1
+        expected = sorted(words.items(), key=lambda kv: (-kv[1], kv[0]))[:3]
+        assert [(s["text"], s["count"]) for s in index.suggest(prefix, 3, "popularity")["words"]] == expected
+
+
+def test_popularity_memo_is_shared_between_threads(monkeypatch):
+    # A tiny memo makes threads evict each other's entries constantly
+    monkeypatch.setattr(api.suggest, "_MEMO_RANGE", 0)
+    monkeypatch.setattr(api.suggest, "_MEMO_SIZE", 2)
+    index = SuggestIndex(f"title {i}" for i in range(200))
+    prefixes = ["t", "ti", "tit", "titl", "title", "title ", "title 1"] * 300
+    expected = {p: index.suggest(p, 3, "popularity") for p in set(prefixes)}
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda p: index.suggest(p, 3, "popularity"), prefixes))
+    assert results == [expected[p] for p in prefixes]
+
+
+def test_suggest_endpoint_rebuilds_on_reload(client, monkeypatch, sample_books):
+    r = client.get("/books/suggest", params={"prefix": "the c"})
+    assert r.status_code == 200
+    assert r.json() == {"prefix": "the c", "titles": [{"text": "The Cat", "count": 1}],
+                        "words": [{"text": "cat", "count": 2}]}
+
+    assert client.get("/books/suggest", params={"prefix": ""}).status_code == 422
+    assert client.get("/books/suggest", params={"prefix": "a", "by": "views"}).status_code == 422
+
+    monkeypatch.setattr("api.main.load_books", lambda: [Book(id="9", title="Catch-22", url="u9", price=None, availability="")])
+    assert client.get("/books/suggest", params={"prefix": "cat"}).json()["titles"] == [{"text": "Catch-22", "count": 1}]
+
+
+def test_suggest_endpoint_mongo(client, mongo_books, monkeypatch):
+    monkeypatch.setattr("api.db._mongo_indexes", {})
+    r = client.get("/books/suggest", params={"prefix": "b", "by": "popularity"})
+    assert r.json()["titles"] == [{"text": "Bird Box", "count": 1}]
+
+    mongo_books.insert_one({"_id": "5", "url": "u5", "title": "Bird Song", "price_num": None, "availability": ""})
+    api.db.reload_books()
+    titles = client.get("/books/suggest", params={"prefix": "bird"}).json()["titles"]
+    assert [t["text"] for t in titles] == ["Bird Box", "Bird Song"]